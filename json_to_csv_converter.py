@@ -3,6 +3,19 @@ import argparse
 from pathlib import Path
 import pandas as pd
 
+from src.tracking_io import frames_from_json, iter_tracking_frames
+
+# Rows buffered before each write, so large inputs are converted in bounded memory
+CHUNK_ROWS = 10000
+
+TRACKING_COLUMNS = [
+    'frame_id', 'timestamp', 'player_id', 'x', 'y', 'orientation',
+    'bbox_x1', 'bbox_y1', 'bbox_x2', 'bbox_y2'
+]
+HOMOGRAPHY_COLUMNS = ['frame_id', 'timestamp', 'homography_success'] + [
+    f'h{i}{j}' for i in range(3) for j in range(3)
+]
+
 
 def load_json_data(json_path):
     """Load tracking data from JSON file."""
@@ -10,15 +23,42 @@ def load_json_data(json_path):
         return json.load(f)
 
 
-def create_player_tracking_csv(json_data, output_path):
+def iter_frames(frames):
+    """Accept a parsed JSON document (either layout) or an iterable of frames."""
+    if isinstance(frames, dict):
+        return frames_from_json(frames)
+    return frames
+
+
+def write_csv_chunks(rows, output_path, columns):
+    """Write rows to a CSV file in chunks of CHUNK_ROWS, with a fixed header."""
+    chunk = []
+    header = True
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_ROWS:
+            pd.DataFrame(chunk, columns=columns).to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+            chunk = []
+            header = False
+    if chunk or header:
+        pd.DataFrame(chunk, columns=columns).to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+
+
+def create_player_tracking_csv(frames, output_path):
     """
     Convert player tracking data to CSV format.
     Each row contains: frame_id, timestamp, player_id, x, y, orientation, bbox
     """
-    rows = []
-    
+    write_csv_chunks(iter_player_rows(frames), output_path, TRACKING_COLUMNS)
+    print(
+        f"Created player tracking CSV at: {output_path}"
+    )
+
+
+def iter_player_rows(frames):
+    """Yield one player tracking row per player per frame."""
     # Extract data for each frame and player
-    for frame_id, frame_data in json_data.items():
+    for frame_data in iter_frames(frames):
         timestamp = frame_data.get('timestamp', '')
         
         for player in frame_data.get('players', []):
@@ -26,7 +66,7 @@ def create_player_tracking_csv(json_data, output_path):
             bbox = player.get('bbox', [None]*4)
             
             row = {
-                'frame_id': frame_data.get('frame_id', frame_id),
+                'frame_id': frame_data.get('frame_id'),
                 'timestamp': timestamp,
                 'player_id': player.get('id', ''),
                 'x': rink_pos[0] if rink_pos else None,
@@ -37,27 +77,24 @@ def create_player_tracking_csv(json_data, output_path):
                 'bbox_x2': bbox[2],
                 'bbox_y2': bbox[3]
             }
-            rows.append(row)
-    
-    # Convert to DataFrame and save to CSV
-    df = pd.DataFrame(rows)
-    df.to_csv(output_path, index=False)
-    print(
-        f"Created player tracking CSV at: {output_path}"
-    )
+            yield row
 
 
-def create_homography_csv(json_data, output_path):
+def create_homography_csv(frames, output_path):
     """
     Convert homography data to CSV format.
     Each row contains: frame_id, timestamp, homography_success, homography_matrix
     """
-    rows = []
-    
+    write_csv_chunks(iter_homography_rows(frames), output_path, HOMOGRAPHY_COLUMNS)
+    print(f"Created homography CSV at: {output_path}")
+
+
+def iter_homography_rows(frames):
+    """Yield one homography row per frame."""
     # Extract homography data for each frame
-    for frame_id, frame_data in json_data.items():
+    for frame_data in iter_frames(frames):
         row = {
-            'frame_id': frame_data.get('frame_id', frame_id),
+            'frame_id': frame_data.get('frame_id'),
             'timestamp': frame_data.get('timestamp', ''),
             'homography_success': frame_data.get('homography_success', False)
         }
@@ -69,19 +106,14 @@ def create_homography_csv(json_data, output_path):
                 for j in range(3):
                     row[f'h{i}{j}'] = matrix[i][j] if matrix else None
         
-        rows.append(row)
-    
-    # Convert to DataFrame and save to CSV
-    df = pd.DataFrame(rows)
-    df.to_csv(output_path, index=False)
-    print(f"Created homography CSV at: {output_path}")
+        yield row
 
 
 def main():
     parser = argparse.ArgumentParser(
         description='Convert player tracking JSON to CSV format'
     )
-    parser.add_argument('json_path', help='Path to input JSON file')
+    parser.add_argument('json_path', help='Path to input tracking data (.json, .jsonl, .jsonl.gz or .jsonl.zst)')
     parser.add_argument(
         '--output-dir',
         default='output',
@@ -100,20 +132,19 @@ def main():
     output_dir = Path(args.output_dir)
     output_dir.mkdir(exist_ok=True)
     
-    # Load JSON data
-    json_data = load_json_data(args.json_path)
-    
     # Generate base output filename
     base_name = Path(args.json_path).stem
+    if base_name.endswith('.jsonl'):
+        base_name = base_name[:-len('.jsonl')]
     
-    # Convert data based on specified type
+    # Convert data based on specified type; frames are streamed from the file for each pass
     if args.type in ['all', 'tracking']:
         tracking_path = output_dir / f"{base_name}_tracking.csv"
-        create_player_tracking_csv(json_data, tracking_path)
+        create_player_tracking_csv(iter_tracking_frames(args.json_path), tracking_path)
         
     if args.type in ['all', 'homography']:
         homography_path = output_dir / f"{base_name}_homography.csv"
-        create_homography_csv(json_data, homography_path)
+        create_homography_csv(iter_tracking_frames(args.json_path), homography_path)
 
 
 if __name__ == '__main__':
@@ -53,7 +53,9 @@ python src/process_clip.py \
   --start-second $START_SECOND \
   --num-seconds $NUM_SECONDS \
   --frame-step $FRAME_STEP \
-  --max-frames $MAX_FRAMES
+  --max-frames $MAX_FRAMES \
+  --pipelined \
+  --headless
 
 # Wait for the tracking data file to be created and get its name
 TRACKING_DATA=$(ls $OUTPUT_DIR/player_detection_data_*.json | head -n 1)
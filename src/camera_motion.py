@@ -0,0 +1,297 @@
+import cv2
+import numpy as np
+import logging
+from typing import Dict, Optional, Tuple
+
+
+class CameraMotionGate:
+    """
+    Decides when the rink segmentation can be reused instead of re-run.
+
+    Global camera motion between consecutive frames is estimated with phase
+    correlation on downscaled grayscale frames. While the camera stays still
+    (per-frame shift and accumulated drift below their limits), frames reuse
+    the features and homography of the last keyframe, shifted by the
+    accumulated motion. A new keyframe is requested when motion exceeds a
+    limit, the estimate is unreliable, or keyframe_interval frames have been
+    reused in a row.
+    """
+
+    def __init__(
+        self,
+        max_motion: float = 2.0,
+        max_drift: Optional[float] = None,
+        keyframe_interval: int = 30,
+        downscale_width: int = 320,
+        min_response: float = 0.1
+    ):
+        """
+        Initialize the gate.
+
+        Args:
+            max_motion: Largest per-frame shift (frame pixels) that still reuses the keyframe
+            max_drift: Largest accumulated shift since the keyframe (default: 5 * max_motion)
+            keyframe_interval: Maximum number of consecutive frames that reuse one keyframe
+            downscale_width: Width frames are resized to for motion estimation
+            min_response: Minimum phase correlation response to trust an estimate
+        """
+        self.max_motion = max_motion
+        self.max_drift = max_drift if max_drift is not None else 5 * max_motion
+        self.keyframe_interval = keyframe_interval
+        self.downscale_width = downscale_width
+        self.min_response = min_response
+
+        self.prev_small = None
+        self.window = None
+        self.scale = 1.0
+        self.offset = np.zeros(2, dtype=np.float64)
+        self.frames_since_keyframe = 0
+
+        self.logger = logging.getLogger(__name__)
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        self.scale = frame.shape[1] / self.downscale_width
+        height = max(1, int(round(frame.shape[0] / self.scale)))
+        return cv2.resize(gray, (self.downscale_width, height), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def estimate_motion(self, frame: np.ndarray) -> Optional[Tuple[float, float, float]]:
+        """
+        Estimate the global shift from the previous frame to this one.
+
+        Args:
+            frame: Current frame (BGR or grayscale)
+
+        Returns:
+            (dx, dy, response) in frame pixels, or None for the first frame
+            or a change of frame size
+        """
+        small = self._prepare(frame)
+        prev_small, self.prev_small = self.prev_small, small
+        if prev_small is None or prev_small.shape != small.shape:
+            return None
+
+        if self.window is None or self.window.shape != small.shape:
+            self.window = cv2.createHanningWindow((small.shape[1], small.shape[0]), cv2.CV_32F)
+
+        (dx, dy), response = cv2.phaseCorrelate(prev_small, small, self.window)
+        return dx * self.scale, dy * self.scale, response
+
+    def update(self, frame: np.ndarray) -> Optional[Tuple[float, float]]:
+        """
+        Feed the next frame and decide whether it can reuse the keyframe.
+
+        Args:
+            frame: Current frame (BGR or grayscale)
+
+        Returns:
+            Accumulated (dx, dy) shift from the keyframe to this frame if the
+            keyframe can be reused, or None if this frame must be processed
+            (it then becomes the new keyframe)
+        """
+        motion = self.estimate_motion(frame)
+
+        if motion is not None and self.frames_since_keyframe < self.keyframe_interval:
+            dx, dy, response = motion
+            offset = self.offset + (dx, dy)
+            if (
+                response >= self.min_response
+                and np.hypot(dx, dy) <= self.max_motion
+                and np.hypot(*offset) <= self.max_drift
+            ):
+                self.offset = offset
+                self.frames_since_keyframe += 1
+                return float(offset[0]), float(offset[1])
+
+        # This frame becomes the keyframe
+        self.offset = np.zeros(2, dtype=np.float64)
+        self.frames_since_keyframe = 0
+        return None
+
+    def mark_keyframe(self) -> None:
+        """Make the last frame passed to update the keyframe."""
+        self.offset = np.zeros(2, dtype=np.float64)
+        self.frames_since_keyframe = 0
+
+    def reset(self) -> None:
+        """Forget the previous frame, so the next frame becomes a keyframe."""
+        self.prev_small = None
+        self.offset = np.zeros(2, dtype=np.float64)
+        self.frames_since_keyframe = 0
+
+
+class HomographyTracker:
+    """
+    Follows the camera between segmentation keyframes by tracking features.
+
+    Corners are tracked frame to frame with pyramidal Lucas-Kanade optical
+    flow on downscaled grayscale frames, and a RANSAC homography is solved
+    for each step. The steps are chained into a single current-frame to
+    keyframe transform. Every step adds its RMS reprojection error (in frame
+    pixels) to a drift estimate; a new keyframe is requested once the drift
+    exceeds drift_bound, tracking gets too sparse, or keyframe_interval
+    frames have passed. Only past frames are used, so it works on live input.
+    """
+
+    def __init__(
+        self,
+        drift_bound: float = 3.0,
+        keyframe_interval: int = 150,
+        downscale_width: int = 640,
+        max_corners: int = 400,
+        min_tracked: int = 30,
+        min_inlier_ratio: float = 0.5
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            drift_bound: Accumulated reprojection error (frame pixels) that triggers a keyframe
+            keyframe_interval: Maximum number of consecutive frames tracked from one keyframe
+            downscale_width: Width frames are resized to for tracking
+            max_corners: Number of corners detected for tracking
+            min_tracked: Minimum number of tracked corners to trust a step
+            min_inlier_ratio: Minimum RANSAC inlier ratio to trust a step
+        """
+        self.drift_bound = drift_bound
+        self.keyframe_interval = keyframe_interval
+        self.downscale_width = downscale_width
+        self.max_corners = max_corners
+        self.min_tracked = min_tracked
+        self.min_inlier_ratio = min_inlier_ratio
+
+        self.prev_small = None
+        self.prev_points = None
+        self.scale = 1.0
+        self.to_keyframe = np.eye(3)
+        self.drift = 0.0
+        self.frames_since_keyframe = 0
+
+        self.logger = logging.getLogger(__name__)
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        self.scale = frame.shape[1] / self.downscale_width
+        height = max(1, int(round(frame.shape[0] / self.scale)))
+        return cv2.resize(gray, (self.downscale_width, height), interpolation=cv2.INTER_AREA)
+
+    def _detect(self, small: np.ndarray) -> Optional[np.ndarray]:
+        return cv2.goodFeaturesToTrack(
+            small, maxCorners=self.max_corners, qualityLevel=0.01, minDistance=8
+        )
+
+    def _track(self, small: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+        """Track the previous corners into this frame and solve the step homography."""
+        if self.prev_points is None or len(self.prev_points) < self.min_tracked:
+            return None
+
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_small, small, self.prev_points, None)
+        tracked = status.ravel() == 1
+        if tracked.sum() < self.min_tracked:
+            return None
+        prev_pts = self.prev_points[tracked].reshape(-1, 2)
+        next_pts = next_points[tracked].reshape(-1, 2)
+
+        # Current frame -> previous frame, in downscaled pixels
+        step, inliers = cv2.findHomography(next_pts, prev_pts, cv2.RANSAC, 1.0)
+        if step is None:
+            return None
+        inliers = inliers.ravel().astype(bool)
+        if inliers.mean() < self.min_inlier_ratio:
+            return None
+
+        projected = cv2.perspectiveTransform(next_pts[inliers].reshape(-1, 1, 2), step).reshape(-1, 2)
+        rms = float(np.sqrt(np.mean(np.sum((projected - prev_pts[inliers]) ** 2, axis=1))))
+        return step, next_pts[inliers].reshape(-1, 1, 2), rms * self.scale
+
+    def update(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Feed the next frame and decide whether it can be tracked from the keyframe.
+
+        Args:
+            frame: Current frame (BGR or grayscale)
+
+        Returns:
+            3x3 transform from this frame's pixels to the keyframe's pixels, or
+            None if this frame must be segmented (it then becomes the keyframe)
+        """
+        small = self._prepare(frame)
+        step = None
+        if self.prev_small is not None and self.prev_small.shape == small.shape:
+            if self.frames_since_keyframe < self.keyframe_interval:
+                step = self._track(small)
+
+        if step is not None:
+            step_matrix, points, rms = step
+            # Express the step in frame pixels and chain it onto the keyframe transform
+            to_small = np.diag([1.0 / self.scale, 1.0 / self.scale, 1.0])
+            step_full = np.linalg.inv(to_small) @ step_matrix @ to_small
+            to_keyframe = self.to_keyframe @ step_full
+            drift = self.drift + rms
+
+            if drift <= self.drift_bound:
+                self.to_keyframe = to_keyframe / to_keyframe[2, 2]
+                self.drift = drift
+                self.frames_since_keyframe += 1
+                self.prev_small = small
+                # Top up the corners when too many have been lost
+                self.prev_points = points if len(points) >= self.max_corners // 2 else self._detect(small)
+                return self.to_keyframe.copy()
+
+        # This frame becomes the keyframe
+        self.prev_small = small
+        self.prev_points = self._detect(small)
+        self.mark_keyframe()
+        return None
+
+    def mark_keyframe(self) -> None:
+        """Make the last frame passed to update the keyframe."""
+        self.to_keyframe = np.eye(3)
+        self.drift = 0.0
+        self.frames_since_keyframe = 0
+
+    def reset(self) -> None:
+        """Forget the previous frame, so the next frame becomes a keyframe."""
+        self.prev_small = None
+        self.prev_points = None
+        self.mark_keyframe()
+
+
+def translation_matrix(offset: Tuple[float, float]) -> np.ndarray:
+    """
+    Build the 3x3 matrix that translates points by (dx, dy).
+
+    Args:
+        offset: (dx, dy) shift in frame pixels
+
+    Returns:
+        3x3 translation matrix
+    """
+    return np.array([[1.0, 0.0, offset[0]], [0.0, 1.0, offset[1]], [0.0, 0.0, 1.0]])
+
+
+def warp_features(features: Dict, matrix: np.ndarray) -> Dict:
+    """
+    Move segmentation feature geometry from one frame into another.
+
+    Args:
+        features: Features from SegmentationProcessor (class name -> list of features)
+        matrix: 3x3 transform from the source frame's pixels to the target frame's pixels
+
+    Returns:
+        New features dictionary with every point transformed (ellipse axes are kept)
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    warped = {}
+    for class_name, class_features in features.items():
+        warped[class_name] = []
+        for feature in class_features:
+            feature = dict(feature)
+            if feature.get("points"):
+                points = np.array([[p["x"], p["y"]] for p in feature["points"]], dtype=np.float64)
+                moved = cv2.perspectiveTransform(points.reshape(-1, 1, 2), matrix).reshape(-1, 2)
+                feature["points"] = [
+                    {"x": int(round(x)), "y": int(round(y))} for x, y in moved.tolist()
+                ]
+            warped[class_name].append(feature)
+    return warped
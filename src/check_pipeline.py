@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Check that batched and pipelined processing give the same output as the
+sequential PlayerTracker.process_frame path.
+
+A short synthetic clip is run through PlayerTracker with stand-in models
+(the real homography, history and pipeline code is used). The camera pans
+across the clip, some frames have no rink features (so their homography
+falls back on the cache), and players move between frames. Every frame's
+output must match the sequential run, and at every frame a batched or
+pipelined run reports as drained, the tracker's checkpoint state must match
+the sequential state after that frame.
+
+Usage:
+    python src/check_pipeline.py [--frames N] [--batch-size N] [--queue-size N] [--drain-every N]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import player_tracker
+from circle_tracker import CircleTracker
+from homography_calculator import HomographyCalculator
+from player_detector import DetectionResult
+from player_tracker import PlayerTracker, NumpyEncoder
+
+
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 360
+
+# Rink points the synthetic camera sees, and where they land in the frame before panning
+RINK_POINTS = np.array([[200, 100], [1200, 100], [1200, 500], [200, 500], [700, 300]], dtype=np.float32)
+FRAME_POINTS = RINK_POINTS * 0.9 + np.array([20, 40], dtype=np.float32)
+
+DEFAULT_RINK_COORDINATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "rink_coordinates.json")
+
+
+def make_frame(frame_idx: int) -> np.ndarray:
+    """
+    Draw one synthetic broadcast frame.
+
+    The camera pan is drawn as a white stripe in the red channel (left out
+    on every 5th frame) and the players as filled boxes in the green channel.
+
+    Args:
+        frame_idx: Frame index
+
+    Returns:
+        BGR frame
+    """
+    frame = np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+    pan = 2 * frame_idx + (frame_idx % 3)
+    if frame_idx % 5 != 4:
+        frame[:, 10 + pan, 2] = 255
+    for i in range(3):
+        x = 120 + 150 * i + 3 * frame_idx * (i + 1) % 200
+        y = 150 + 40 * i + frame_idx % 7
+        frame[y:y + 60, x:x + 25, 1] = 100 + 50 * i
+    return frame
+
+
+def synthetic_clip(num_frames: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (frame_idx, frame) pairs of the synthetic clip."""
+    for frame_idx in range(num_frames):
+        yield frame_idx, make_frame(frame_idx)
+
+
+class SyntheticSegmentation:
+    """Stand-in for SegmentationProcessor that reads the pan stripe of a synthetic frame."""
+
+    def __init__(self, *args, **kwargs):
+        self.circle_tracker = CircleTracker()
+
+    def process_frame(self, frame: np.ndarray, frame_idx: int = None, output_dir: str = None) -> Dict:
+        columns = np.flatnonzero(frame[0, :, 2])
+        features = {"Synthetic": [{"pan": int(columns[0]) - 10}]} if len(columns) else {}
+        return {"features": features}
+
+    def process_batch(self, frames: List[np.ndarray], frame_ids: List[int] = None, output_dir: str = None) -> List[Dict]:
+        return [self.process_frame(frame) for frame in frames]
+
+    def close(self) -> None:
+        pass
+
+
+class SyntheticDetector:
+    """Stand-in for PlayerDetector that finds the player boxes of a synthetic frame."""
+
+    def __init__(self, *args, **kwargs):
+        self.display = True
+        self.class_mapping = {0: "player", 1: "referee"}
+
+    def process_frame(self, frame: np.ndarray, frame_idx: int = None) -> DetectionResult:
+        _, _, stats, _ = cv2.connectedComponentsWithStats((frame[:, :, 1] > 0).astype(np.uint8))
+        boxes = np.array([[x, y, x + w, y + h] for x, y, w, h, _ in stats[1:]], dtype=np.float64).reshape(-1, 4)
+        confidences = np.array([frame[y, x, 1] / 255.0 for x, y, _, _, _ in stats[1:]])
+        class_ids = np.array([int(c > 0.75) for c in confidences], dtype=np.int64)
+        return DetectionResult(boxes, confidences, class_ids, self.class_mapping)
+
+    def process_batch(self, frames: List[np.ndarray], frame_ids: List[int] = None) -> List[DetectionResult]:
+        return [self.process_frame(frame) for frame in frames]
+
+    def close(self) -> None:
+        pass
+
+
+class SyntheticOrientation:
+    """Stand-in for OrientationDetector (facing detection is off in this check)."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+class SyntheticHomographyCalculator(HomographyCalculator):
+    """HomographyCalculator that matches the synthetic pan feature to fixed rink points."""
+
+    def _find_correspondences(self, segmentation_features, frame_idx, geometry):
+        synthetic = segmentation_features.get("Synthetic")
+        if not synthetic:
+            return None
+        source_pts = FRAME_POINTS + np.array([synthetic[0]["pan"], 0], dtype=np.float32)
+        names = [f"point_{i}" for i in range(len(RINK_POINTS))]
+        return names, source_pts, RINK_POINTS.copy()
+
+
+def build_tracker(rink_coordinates_path: str, homography_smoothing: Optional[str]) -> PlayerTracker:
+    """
+    Create a PlayerTracker that uses the stand-in models.
+
+    Args:
+        rink_coordinates_path: Path to the rink coordinates JSON
+        homography_smoothing: None or "causal"
+
+    Returns:
+        The tracker
+    """
+    with mock.patch.object(player_tracker, "SegmentationProcessor", SyntheticSegmentation), \
+            mock.patch.object(player_tracker, "PlayerDetector", SyntheticDetector), \
+            mock.patch.object(player_tracker, "OrientationDetector", SyntheticOrientation), \
+            mock.patch.object(player_tracker, "HomographyCalculator", SyntheticHomographyCalculator):
+        return PlayerTracker(
+            detection_model_path="synthetic",
+            orientation_model_path="synthetic",
+            output_dir=None,
+            segmentation_model_path="synthetic",
+            rink_coordinates_path=rink_coordinates_path,
+            device="cpu",
+            headless=True,
+            homography_smoothing=homography_smoothing
+        )
+
+
+def frame_signature(frame_data: Dict) -> str:
+    """Serialize a frame's output for comparison (the wall-clock timestamp is left out)."""
+    return json.dumps(
+        {key: value for key, value in frame_data.items() if key != "timestamp"},
+        cls=NumpyEncoder, sort_keys=True
+    )
+
+
+def run_mode(
+    rink_coordinates_path: str,
+    homography_smoothing: Optional[str],
+    num_frames: int,
+    process: Callable[[PlayerTracker, Iterator[Tuple[int, np.ndarray]]], Iterator[Tuple[int, np.ndarray, Dict]]]
+) -> Tuple[List[str], Dict[int, str]]:
+    """
+    Run the synthetic clip through a fresh tracker.
+
+    Args:
+        rink_coordinates_path: Path to the rink coordinates JSON
+        homography_smoothing: None or "causal"
+        num_frames: Number of frames in the clip
+        process: Function turning (tracker, frames) into (frame_id, frame, frame_data) results
+
+    Returns:
+        (frame signatures in output order, checkpoint state signature per drained frame id)
+    """
+    tracker = build_tracker(rink_coordinates_path, homography_smoothing)
+    frames = []
+    drained_states = {}
+    try:
+        for frame_id, _, frame_data in process(tracker, synthetic_clip(num_frames)):
+            frames.append(frame_signature(frame_data))
+            if tracker.drained:
+                drained_states[frame_id] = json.dumps(tracker.checkpoint_state(), cls=NumpyEncoder, sort_keys=True)
+    finally:
+        tracker.close()
+    return frames, drained_states
+
+
+def compare(name: str, expected: Tuple[List[str], Dict[int, str]], actual: Tuple[List[str], Dict[int, str]]) -> bool:
+    """
+    Compare a run with the sequential run and report the result.
+
+    Returns:
+        True if every frame and every drained checkpoint state matches
+    """
+    expected_frames, expected_states = expected
+    actual_frames, actual_states = actual
+    problems = []
+    if len(actual_frames) != len(expected_frames):
+        problems.append(f"{len(actual_frames)} frames instead of {len(expected_frames)}")
+    for frame_id, (want, got) in enumerate(zip(expected_frames, actual_frames)):
+        if want != got:
+            problems.append(f"frame {frame_id} differs")
+    for frame_id, state in actual_states.items():
+        if state != expected_states.get(frame_id):
+            problems.append(f"checkpoint state after frame {frame_id} differs")
+
+    if problems:
+        print(f"FAIL {name}: {'; '.join(problems[:5])}")
+        return False
+    print(f"ok   {name}: {len(actual_frames)} frames, {len(actual_states)} drained states match")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check batched and pipelined tracking against sequential tracking on a synthetic clip")
+    parser.add_argument("--frames", type=int, default=40, help="Number of synthetic frames")
+    parser.add_argument("--batch-size", type=int, default=3, help="Batch size of the batched run")
+    parser.add_argument("--queue-size", type=int, default=2, help="Queue size of the pipelined runs")
+    parser.add_argument("--drain-every", type=int, default=4, help="drain_every of the draining pipelined run")
+    parser.add_argument("--rink-coordinates", type=str, default=DEFAULT_RINK_COORDINATES, help="Path to rink coordinates JSON")
+    args = parser.parse_args()
+
+    # The stages log every frame; only the comparison is printed
+    logging.disable(logging.ERROR)
+
+    def sequential(tracker, frames):
+        for frame_id, frame in frames:
+            yield frame_id, frame, tracker.process_frame(frame, frame_id)
+
+    modes = [
+        (f"batched (batch size {args.batch_size})", lambda tracker, frames: tracker.process_frames_batched(frames, args.batch_size)),
+        (f"pipelined (queue size {args.queue_size})", lambda tracker, frames: tracker.process_frames_pipelined(frames, args.queue_size)),
+        (
+            f"pipelined (queue size {args.queue_size}, drain every {args.drain_every})",
+            lambda tracker, frames: tracker.process_frames_pipelined(frames, args.queue_size, args.drain_every)
+        ),
+    ]
+
+    all_match = True
+    for homography_smoothing in (None, "causal"):
+        print(f"Homography smoothing: {homography_smoothing or 'off'}")
+        expected = run_mode(args.rink_coordinates, homography_smoothing, args.frames, sequential)
+        for name, process in modes:
+            actual = run_mode(args.rink_coordinates, homography_smoothing, args.frames, process)
+            all_match = compare(name, expected, actual) and all_match
+
+    sys.exit(0 if all_match else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import os
+import json
+import logging
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class RunCheckpoint:
+    """
+    Append-only checkpoint of a long processing run.
+
+    The checkpoint is a JSON Lines file. Its first line records the run
+    settings. After that each frame's result is appended as the frame
+    completes, and every interval frames a snapshot of the tracker state
+    follows. A snapshot commits the frame results written before it.
+
+    On resume the file is truncated right after the last snapshot. This
+    drops uncommitted results and any line torn by a crash. Processing
+    then continues after the snapshot's frame, appending to the same file.
+    Only the last snapshot is kept in memory; committed results are
+    streamed back from disk with iter_frames.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        settings: Dict[str, Any],
+        interval: int = 100,
+        resume: bool = False,
+        json_encoder: Optional[type] = None
+    ):
+        """
+        Open (or resume) a checkpoint.
+
+        Args:
+            path: Checkpoint file path
+            settings: Run settings; resuming requires the same settings
+            interval: Number of frames between tracker state snapshots
+            resume: Continue from an existing checkpoint instead of starting over
+            json_encoder: JSONEncoder subclass used for results and snapshots
+        """
+        if interval < 1:
+            raise ValueError(f"interval must be at least 1, got {interval}")
+
+        self.path = path
+        self.interval = interval
+        self.json_encoder = json_encoder
+        # Compare settings in their JSON form, as they are read back
+        self.settings = json.loads(json.dumps(settings, cls=json_encoder))
+
+        self.state = None  # Tracker state of the last snapshot
+        self.last_frame = None  # Frame index of the last snapshot
+        self.frame_count = 0  # Committed frame results
+        self._pending = 0  # Results written since the last snapshot
+        self._committed_offset = 0
+
+        self.logger = logging.getLogger(__name__)
+
+        checkpoint_dir = os.path.dirname(path)
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+
+        if resume and os.path.exists(path):
+            self._load()
+            self._file = open(path, "r+b")
+            self._file.truncate(self._committed_offset)
+            self._file.seek(self._committed_offset)
+            self.logger.info(
+                f"Resuming from checkpoint {path}: {self.frame_count} frames, last frame {self.last_frame}"
+            )
+        else:
+            if resume:
+                self.logger.warning(f"No checkpoint found at {path}, starting from the beginning")
+            self._file = open(path, "wb")
+            self._write({"settings": self.settings})
+            self._committed_offset = self._file.tell()
+
+    def _load(self) -> None:
+        """Scan the checkpoint for its last snapshot and the number of results it commits."""
+        with open(self.path, "rb") as f:
+            header = f.readline()
+            try:
+                settings = json.loads(header)["settings"]
+            except (ValueError, KeyError):
+                raise ValueError(f"{self.path} is not a checkpoint file")
+            if settings != self.settings:
+                changed = sorted(
+                    key for key in set(settings) | set(self.settings)
+                    if settings.get(key) != self.settings.get(key)
+                )
+                raise ValueError(
+                    f"Checkpoint {self.path} was written with different settings ({', '.join(changed)}); "
+                    f"rerun with the original settings or without resuming"
+                )
+            self._committed_offset = f.tell()
+
+            frames = 0
+            for line in iter(f.readline, b""):
+                if not line.endswith(b"\n"):
+                    break  # Torn by a crash
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if "state" in record:
+                    self.state = record["state"]
+                    self.last_frame = record["frame"]
+                    self.frame_count += frames
+                    frames = 0
+                    self._committed_offset = f.tell()
+                else:
+                    frames += 1
+
+    def _write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, cls=self.json_encoder).encode("utf-8"))
+        self._file.write(b"\n")
+
+    def add_frame(self, frame_idx: int, result: Dict) -> None:
+        """
+        Append a completed frame's result.
+
+        Args:
+            frame_idx: Frame index
+            result: JSON-serializable frame result
+        """
+        self._write({"frame": frame_idx, "result": result})
+        self._pending += 1
+
+    @property
+    def snapshot_due(self) -> bool:
+        """Whether interval frames have completed since the last snapshot."""
+        return self._pending >= self.interval
+
+    def save_state(self, frame_idx: int, state: Dict) -> None:
+        """
+        Append a tracker state snapshot, committing the results before it.
+
+        The file is flushed and synced, so the snapshot survives a crash.
+
+        Args:
+            frame_idx: Index of the last completed frame
+            state: JSON-serializable tracker state after that frame
+        """
+        self._write({"frame": frame_idx, "state": state})
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._committed_offset = self._file.tell()
+        self.state = state
+        self.last_frame = frame_idx
+        self.frame_count += self._pending
+        self._pending = 0
+
+    def iter_frames(self) -> Iterator[Tuple[int, Dict]]:
+        """
+        Iterate over the committed frame results, oldest first.
+
+        Yields:
+            (frame_idx, result) pairs
+        """
+        if self._file is not None:
+            self._file.flush()
+        with open(self.path, "rb") as f:
+            f.readline()  # Settings
+            while f.tell() < self._committed_offset:
+                record = json.loads(f.readline())
+                if "result" in record:
+                    yield record["frame"], record["result"]
+
+    def close(self) -> None:
+        """Close the checkpoint file (the checkpoint stays on disk)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,168 @@
+import heapq
+import numpy as np
+from collections import defaultdict
+from scipy.optimize import linear_sum_assignment
+from typing import Dict, List, Set, Tuple
+
+
+class CircleTracker:
+    """
+    Keeps faceoff circle IDs stable from frame to frame.
+
+    Tracked circles are indexed in a uniform grid with cells the size of the
+    match distance, so each new circle is only compared with circles in the
+    neighbouring cells. Circles are matched with an optimal (Hungarian)
+    assignment that minimizes the total distance, instead of greedily. An
+    expiry heap ordered by the frame each circle was last seen drops circles
+    that have not been seen for max_frames_to_keep frames, and the least
+    recently seen circles beyond max_tracked.
+    """
+
+    def __init__(self, max_dist_for_match: float = 100, max_frames_to_keep: int = 10, max_tracked: int = 64):
+        """
+        Initialize the tracker.
+
+        Args:
+            max_dist_for_match: Maximum pixel distance to consider the same circle
+            max_frames_to_keep: How many frames an unseen circle is remembered
+            max_tracked: Hard cap on remembered circles
+        """
+        self.max_dist_for_match = max_dist_for_match
+        self.max_frames_to_keep = max_frames_to_keep
+        self.max_tracked = max_tracked
+
+        self.circles: Dict[int, Tuple[float, float, int]] = {}  # circle_id -> (x, y, frame_last_seen)
+        self.next_circle_id = 0
+        self.current_frame = 0
+
+        self._cell_size = float(max_dist_for_match)
+        self._grid: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self._expiry: List[Tuple[int, int]] = []  # (frame_last_seen, circle_id); stale entries are skipped
+
+    def __len__(self) -> int:
+        return len(self.circles)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(np.floor(x / self._cell_size)), int(np.floor(y / self._cell_size))
+
+    def _put(self, circle_id: int, x: float, y: float) -> None:
+        old = self.circles.get(circle_id)
+        if old is not None:
+            self._grid[self._cell(old[0], old[1])].discard(circle_id)
+        self.circles[circle_id] = (x, y, self.current_frame)
+        self._grid[self._cell(x, y)].add(circle_id)
+        heapq.heappush(self._expiry, (self.current_frame, circle_id))
+
+    def _remove(self, circle_id: int) -> None:
+        x, y, _ = self.circles.pop(circle_id)
+        cell = self._cell(x, y)
+        self._grid[cell].discard(circle_id)
+        if not self._grid[cell]:
+            del self._grid[cell]
+
+    def _pop_oldest(self) -> Tuple[int, int]:
+        """Pop the least recently seen circle from the expiry heap as (frame_last_seen, circle_id)."""
+        while self._expiry:
+            last_seen, circle_id = heapq.heappop(self._expiry)
+            circle = self.circles.get(circle_id)
+            # Skip entries superseded by a later sighting
+            if circle is not None and circle[2] == last_seen:
+                return last_seen, circle_id
+        raise IndexError("no tracked circles")
+
+    def _peek_oldest_seen(self) -> int:
+        while self._expiry:
+            last_seen, circle_id = self._expiry[0]
+            circle = self.circles.get(circle_id)
+            if circle is not None and circle[2] == last_seen:
+                return last_seen
+            heapq.heappop(self._expiry)
+        return self.current_frame
+
+    def _candidates(self, x: float, y: float) -> Set[int]:
+        cx, cy = self._cell(x, y)
+        candidates = set()
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                candidates |= self._grid.get((cx + dx, cy + dy), set())
+        return candidates
+
+    def update(self, positions: List[Tuple[float, float]]) -> List[int]:
+        """
+        Assign IDs to the circles found in the next frame.
+
+        Args:
+            positions: (x, y) centers of this frame's circles, in frame pixels
+
+        Returns:
+            Circle ID for each position, in the same order
+        """
+        # Forget circles that have not been seen recently
+        while self.circles and self.current_frame - self._peek_oldest_seen() > self.max_frames_to_keep:
+            self._remove(self._pop_oldest()[1])
+
+        # Candidate pairs from the neighbouring grid cells
+        candidate_ids = sorted(set().union(*(self._candidates(x, y) for x, y in positions))) if positions else []
+        circle_ids = [None] * len(positions)
+
+        if candidate_ids:
+            prev = np.array([self.circles[c][:2] for c in candidate_ids], dtype=np.float64)
+            current = np.array(positions, dtype=np.float64)
+            dist = np.linalg.norm(current[:, np.newaxis, :] - prev[np.newaxis, :, :], axis=2)
+
+            # Pairs that are too far apart get a cost no real match can reach,
+            # so the assignment first maximizes matches, then minimizes distance
+            feasible = dist < self.max_dist_for_match
+            cost = np.where(feasible, dist, self.max_dist_for_match * (len(positions) + 1))
+            rows, cols = linear_sum_assignment(cost)
+            for row, col in zip(rows, cols):
+                if feasible[row, col]:
+                    circle_ids[row] = candidate_ids[col]
+
+        for i, (x, y) in enumerate(positions):
+            if circle_ids[i] is None:
+                circle_ids[i] = self.next_circle_id
+                self.next_circle_id += 1
+            self._put(circle_ids[i], x, y)
+
+        # Forget the least recently seen circles beyond the cap
+        while len(self.circles) > self.max_tracked:
+            self._remove(self._pop_oldest()[1])
+
+        # Rebuild the heap once stale entries dominate it
+        if len(self._expiry) > 4 * max(len(self.circles), 16):
+            self._expiry = [(last_seen, circle_id) for circle_id, (_, _, last_seen) in self.circles.items()]
+            heapq.heapify(self._expiry)
+
+        self.current_frame += 1
+        return circle_ids
+
+    def get_state(self) -> Dict:
+        """Get the tracked circles and ID counters as a JSON-serializable dict (see set_state)."""
+        return {
+            "circles": [[circle_id, x, y, last_seen] for circle_id, (x, y, last_seen) in self.circles.items()],
+            "next_circle_id": self.next_circle_id,
+            "current_frame": self.current_frame
+        }
+
+    def set_state(self, state: Dict) -> None:
+        """
+        Restore the state saved by get_state.
+
+        Args:
+            state: Dictionary returned by get_state
+        """
+        self.reset()
+        self.next_circle_id = state["next_circle_id"]
+        for circle_id, x, y, last_seen in state["circles"]:
+            self.circles[circle_id] = (x, y, last_seen)
+            self._grid[self._cell(x, y)].add(circle_id)
+            self._expiry.append((last_seen, circle_id))
+        heapq.heapify(self._expiry)
+        self.current_frame = state["current_frame"]
+
+    def reset(self) -> None:
+        """Forget all tracked circles (IDs keep counting up)."""
+        self.circles.clear()
+        self._grid.clear()
+        self._expiry.clear()
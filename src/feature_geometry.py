@@ -0,0 +1,33 @@
+import numpy as np
+from typing import Dict, List
+
+
+def normalize_feature_geometry(features: Dict[str, List[Dict]]) -> Dict[str, List[np.ndarray]]:
+    """
+    Convert segmentation feature points to NumPy arrays once per frame.
+
+    Points may be given as {"x", "y"} dicts or [x, y] pairs; features without
+    points fall back to their "center". Features with no geometry at all are
+    skipped, but every class keeps its key so presence checks still work.
+
+    Args:
+        features: Features from SegmentationProcessor (class name -> list of features)
+
+    Returns:
+        Dictionary mapping each class name to a list of (k, 2) float64 point
+        arrays, one per feature
+    """
+    geometry = {}
+    for class_name, class_features in features.items():
+        arrays = []
+        for feature in class_features or []:
+            points = feature.get("points")
+            if points:
+                if isinstance(points[0], dict):
+                    arrays.append(np.array([[p["x"], p["y"]] for p in points], dtype=np.float64))
+                else:
+                    arrays.append(np.array([p[:2] for p in points], dtype=np.float64))
+            elif "center" in feature:
+                arrays.append(np.array([[feature["center"]["x"], feature["center"]["y"]]], dtype=np.float64))
+        geometry[class_name] = arrays
+    return geometry
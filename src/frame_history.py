@@ -0,0 +1,142 @@
+import os
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+class FrameHistory:
+    """
+    Bounded per-frame history for PlayerTracker.
+
+    Behaves like the plain dict it replaces (frame_id -> frame_data), but
+    only the most recently stored max_frames frames stay in memory. When the
+    window is full the oldest frame is evicted: it is either dropped or, if a
+    spill path is given, serialized and appended to a JSON Lines file so it
+    can still be written out at the end of the run.
+    """
+
+    def __init__(
+        self,
+        max_frames: Optional[int] = None,
+        spill_path: Optional[str] = None,
+        serialize_fn: Optional[Callable[[Dict], Dict]] = None,
+        json_encoder: Optional[type] = None
+    ):
+        """
+        Initialize the history.
+
+        Args:
+            max_frames: Number of frames kept in memory (None keeps every frame)
+            spill_path: JSON Lines file evicted frames are appended to (None drops them)
+            serialize_fn: Turns a frame record into the JSON-serializable form
+                that is spilled (defaults to the record itself)
+            json_encoder: JSONEncoder subclass used when spilling
+        """
+        if max_frames is not None and max_frames < 1:
+            raise ValueError(f"max_frames must be at least 1, got {max_frames}")
+
+        self.max_frames = max_frames
+        self.spill_path = spill_path
+        self.serialize_fn = serialize_fn
+        self.json_encoder = json_encoder
+
+        self._frames: "OrderedDict[Any, Dict]" = OrderedDict()
+        self._spill_file = None
+        self.spilled_count = 0
+        self.dropped_count = 0
+
+        self.logger = logging.getLogger(__name__)
+
+        if spill_path:
+            spill_dir = os.path.dirname(spill_path)
+            if spill_dir:
+                os.makedirs(spill_dir, exist_ok=True)
+            # Start each run with an empty spill file
+            self._spill_file = open(spill_path, "w")
+
+    def __setitem__(self, frame_id: Any, frame_data: Dict) -> None:
+        self._frames[frame_id] = frame_data
+        self._frames.move_to_end(frame_id)
+        if self.max_frames is not None:
+            while len(self._frames) > self.max_frames:
+                self._evict(*self._frames.popitem(last=False))
+
+    def __getitem__(self, frame_id: Any) -> Dict:
+        return self._frames[frame_id]
+
+    def __contains__(self, frame_id: Any) -> bool:
+        return frame_id in self._frames
+
+    def __len__(self) -> int:
+        """Number of frames recorded so far, in memory or spilled."""
+        return len(self._frames) + self.spilled_count
+
+    def get(self, frame_id: Any, default: Any = None) -> Any:
+        """Get a frame still held in memory, or default."""
+        return self._frames.get(frame_id, default)
+
+    def items(self) -> Iterator[Tuple[Any, Dict]]:
+        """Iterate over the (frame_id, frame_data) pairs held in memory."""
+        return iter(self._frames.items())
+
+    def tail(self, count: int) -> Iterator[Tuple[Any, Dict]]:
+        """Iterate over the (frame_id, frame_data) pairs of the last count frames in memory, oldest first."""
+        frames = []
+        for item in reversed(self._frames.items()):
+            if len(frames) == count:
+                break
+            frames.append(item)
+        return reversed(frames)
+
+    def _serialize(self, frame_id: Any, frame_data: Dict) -> Optional[Dict]:
+        if self.serialize_fn is None:
+            return frame_data
+        try:
+            return self.serialize_fn(frame_data)
+        except Exception as e:
+            self.logger.error(f"Error serializing frame {frame_id}: {e}")
+            return None
+
+    def _evict(self, frame_id: Any, frame_data: Dict) -> None:
+        record = self._serialize(frame_id, frame_data) if self._spill_file is not None else None
+        if record is None:
+            self.dropped_count += 1
+            return
+
+        self._spill_file.write(json.dumps([frame_id, record], cls=self.json_encoder))
+        self._spill_file.write("\n")
+        self.spilled_count += 1
+
+    def iter_serialized(self) -> Iterator[Tuple[Any, Dict]]:
+        """
+        Iterate over every recorded frame in serialized form, oldest first.
+
+        Spilled frames are read back from disk one line at a time, followed
+        by the frames still held in memory. Dropped frames, and frames that
+        fail to serialize, are skipped.
+
+        Yields:
+            (frame_id, serialized_frame) pairs
+        """
+        if self.spilled_count:
+            if self._spill_file is not None:
+                self._spill_file.flush()
+            with open(self.spill_path, "r") as f:
+                for line in f:
+                    frame_id, record = json.loads(line)
+                    yield frame_id, record
+
+        for frame_id, frame_data in self._frames.items():
+            record = self._serialize(frame_id, frame_data)
+            if record is not None:
+                yield frame_id, record
+
+    def close(self) -> None:
+        """Close the spill file (spilled frames stay on disk)."""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+            self.logger.info(f"Spilled {self.spilled_count} frames to {self.spill_path}")
+        if self.dropped_count:
+            self.logger.info(f"Dropped {self.dropped_count} frames outside the history window")
@@ -0,0 +1,185 @@
+import queue
+import threading
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+# Marks the end of the frame stream on a stage queue
+_END_OF_STREAM = object()
+
+
+class _StageFailure:
+    """Carries an exception raised inside a stage down to the consumer."""
+
+    def __init__(self, stage_name: str, error: BaseException):
+        self.stage_name = stage_name
+        self.error = error
+
+
+class FramePipeline:
+    """
+    Pipelined executor for PlayerTracker.
+
+    Decode, segmentation, homography, detection and metrics each run on their
+    own thread, connected by bounded queues. Every stage handles frames one at
+    a time in arrival order, so stateful components (circle tracking, the
+    homography cache, previous-frame metrics) see exactly the same sequence of
+    calls as the sequential PlayerTracker.process_frame path, and results come
+    out in frame order.
+
+    With drain_every set, decoding pauses after every drain_every frames
+    until the consumer has taken that frame and asked for the next one. While
+    the consumer holds such a frame, every stage is idle and no later frame
+    has started, so tracker state can be read safely (drained is True).
+    """
+
+    def __init__(self, tracker: Any, queue_size: int = 4, drain_every: int = 0):
+        """
+        Initialize the pipeline.
+
+        Args:
+            tracker: PlayerTracker whose stage methods are run
+            queue_size: Maximum number of frames buffered between two stages
+            drain_every: Drain the pipeline after every this many frames (0 never drains)
+        """
+        self.tracker = tracker
+        self.queue_size = max(1, queue_size)
+        self.drain_every = max(0, drain_every)
+        self.drained = False  # Whether the frame last yielded by run() was a drain point
+        self._resume = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+        # (name, function) pairs run in order on each work item
+        self.stages: List[Tuple[str, Callable[[Dict], None]]] = [
+            ("segmentation", self._segmentation_stage),
+            ("homography", self._homography_stage),
+            ("detection", self._detection_stage),
+            ("metrics", self._metrics_stage),
+        ]
+
+    def _segmentation_stage(self, item: Dict) -> None:
+        item["frame_data"] = self.tracker.create_frame_data(item["frame_id"])
+        item["segmentation_result"] = self.tracker.run_segmentation_stage(
+            item["frame"], item["frame_id"], item["frame_data"]
+        )
+
+    def _homography_stage(self, item: Dict) -> None:
+        self.tracker.run_homography_stage(
+            item.pop("segmentation_result"), item["frame_id"], item["frame_data"]
+        )
+
+    def _detection_stage(self, item: Dict) -> None:
+        item["detections"] = self.tracker.run_detection_stage(
+            item["frame"], item["frame_id"]
+        )
+        item["orientations"] = self.tracker.run_orientation_stage(
+            [item["frame"]], [item["detections"]]
+        )[0]
+
+    def _metrics_stage(self, item: Dict) -> None:
+        self.tracker.run_metrics_stage(
+            item.pop("detections"), item["frame_id"], item["frame_data"],
+            item.pop("orientations")
+        )
+
+    def _put(self, out_queue: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        """Put an item on a queue, giving up if the pipeline is being stopped."""
+        while not stop.is_set():
+            try:
+                out_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decode_worker(self, frames: Iterable[Tuple[int, np.ndarray]], out_queue: queue.Queue, stop: threading.Event) -> None:
+        try:
+            for count, (frame_id, frame) in enumerate(frames, 1):
+                drain = self.drain_every > 0 and count % self.drain_every == 0
+                if not self._put(out_queue, {"frame_id": frame_id, "frame": frame, "drain": drain}, stop):
+                    return
+                if drain:
+                    # Start no later frame until the consumer is done with this one
+                    while not self._resume.wait(timeout=0.1):
+                        if stop.is_set():
+                            return
+                    self._resume.clear()
+        except BaseException as e:
+            self._put(out_queue, _StageFailure("decode", e), stop)
+            return
+        self._put(out_queue, _END_OF_STREAM, stop)
+
+    def _stage_worker(self, name: str, func: Callable[[Dict], None], in_queue: queue.Queue, out_queue: queue.Queue, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                item = in_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            # Forward end-of-stream and upstream failures untouched
+            if item is _END_OF_STREAM or isinstance(item, _StageFailure):
+                self._put(out_queue, item, stop)
+                return
+
+            try:
+                func(item)
+            except BaseException as e:
+                self._put(out_queue, _StageFailure(name, e), stop)
+                return
+
+            if not self._put(out_queue, item, stop):
+                return
+
+    def run(self, frames: Iterable[Tuple[int, np.ndarray]]) -> Iterator[Tuple[int, np.ndarray, Dict]]:
+        """
+        Run the pipeline over a stream of frames.
+
+        Args:
+            frames: Iterable of (frame_id, frame) pairs, consumed on the decode thread
+
+        Yields:
+            (frame_id, frame, frame_data) tuples in input order
+        """
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+
+        threads = [
+            threading.Thread(
+                target=self._decode_worker,
+                args=(frames, queues[0], stop),
+                name="pipeline-decode",
+                daemon=True,
+            )
+        ]
+        for i, (name, func) in enumerate(self.stages):
+            threads.append(
+                threading.Thread(
+                    target=self._stage_worker,
+                    args=(name, func, queues[i], queues[i + 1], stop),
+                    name=f"pipeline-{name}",
+                    daemon=True,
+                )
+            )
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _END_OF_STREAM:
+                    break
+                if isinstance(item, _StageFailure):
+                    self.logger.error(f"Pipeline stage '{item.stage_name}' failed: {item.error}")
+                    raise item.error
+                self.drained = item["drain"]
+                yield item["frame_id"], item["frame"], item["frame_data"]
+                if self.drained:
+                    self._resume.set()
+        finally:
+            # Unblock and shut down every stage, including on early exit
+            stop.set()
+            for thread in threads:
+                thread.join()
@@ -5,6 +5,8 @@ import json
 import os
 import argparse
 
+from tracking_io import iter_tracking_frames
+
 def draw_rink_coordinates(rink_img, coordinates):
     """Draw rink coordinates on the rink image for visualization."""
     img = rink_img.copy()
@@ -297,9 +299,8 @@ def create_quadview(
     
     # Create warped overlay visualization (top right)
     if homography_matrix is not None:
-        # Convert homography matrix to numpy array if it's a list
-        if isinstance(homography_matrix, list):
-            homography_matrix = np.array(homography_matrix, dtype=np.float32)
+        # Matrices loaded from JSON arrive as lists; arrays pass through without a copy
+        homography_matrix = np.asarray(homography_matrix, dtype=np.float64)
         
         # Warp the frame using homography matrix to rink space
         warped_frame = cv2.warpPerspective(
@@ -444,11 +445,11 @@ def process_tracking_results(
         rink_image_path,
         output_dir
 ):
-    """Process existing tracking results to generate quadview visualizations."""
-    # Load tracking data
-    with open(tracking_data_path, 'r') as f:
-        tracking_data = json.load(f)
-    
+    """Process existing tracking results to generate quadview visualizations.
+
+    JSON Lines results (.jsonl, .jsonl.gz, .jsonl.zst) are streamed one
+    frame at a time instead of being loaded in full.
+    """
     # Load rink coordinates
     with open(rink_coordinates_path, 'r') as f:
         rink_coordinates = json.load(f)
@@ -463,7 +464,7 @@ def process_tracking_results(
     os.makedirs(output_dir, exist_ok=True)
     
     # Process each frame in the tracking data
-    for frame_info in tracking_data['frames']:
+    for frame_info in iter_tracking_frames(tracking_data_path):
         # Load original frame
         frame_path = os.path.join(
             os.path.dirname(tracking_data_path),
@@ -519,7 +520,7 @@ def generate_quadview(frame, warped_frame, rink_img, draw_rink_coordinates):
 
 def main():
     parser = argparse.ArgumentParser(description='Generate quadview visualizations from tracking results')
-    parser.add_argument('--tracking-data', required=True, help='Path to tracking data JSON')
+    parser.add_argument('--tracking-data', required=True, help='Path to tracking data (.json, .jsonl, .jsonl.gz or .jsonl.zst)')
     parser.add_argument('--rink-image', required=True, help='Path to rink image')
     parser.add_argument('--rink-coordinates', required=True, help='Path to rink coordinates JSON')
     parser.add_argument('--output-dir', required=True, help='Directory to save quadview images')
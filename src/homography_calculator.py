@@ -3,9 +3,178 @@ import numpy as np
 import json
 import os
 import logging
+from enum import IntEnum
 from typing import Dict, List, Tuple, Optional
 from collections import deque
 
+from feature_geometry import normalize_feature_geometry
+from homography_smoother import HomographySmoother
+from homography_store import SortedFrameCache
+
+# Ways HomographyCalculator can solve for the matrix
+HOMOGRAPHY_SOLVERS = ("ransac", "dlt")
+
+# Ways HomographyCalculator can interpolate between two matrices
+HOMOGRAPHY_INTERPOLATIONS = ("linear", "camera")
+
+# Ways HomographyCalculator can smooth matrices over time
+HOMOGRAPHY_SMOOTHINGS = ("causal", "fixed_lag")
+
+
+class HomographyCheck(IntEnum):
+    """
+    Outcome of homography validation: VALID or the first check that failed.
+    """
+    VALID = 0
+    NON_FINITE = 1  # Matrix or projected frame corners contain inf/NaN
+    CORNER_OUT_OF_BOUNDS = 2  # A frame corner lands too far outside the rink
+    AREA_RATIO = 3  # Projected frame area is implausibly small or large
+    DIAGONAL_RATIO = 4  # Projected frame diagonal is implausibly short or long
+
+
+def _normalizing_transforms(points: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Build Hartley normalization transforms for batches of 2D points.
+    
+    Each batch is translated so the points with non-zero weight have their
+    centroid at the origin and scaled so their mean distance from it is sqrt(2).
+    
+    Args:
+        points: (B, N, 2) points
+        weights: (B, N) point weights (zero marks padding)
+        
+    Returns:
+        (B, 3, 3) normalization transforms
+    """
+    used = (weights > 0).astype(np.float64)
+    count = np.maximum(used.sum(axis=1), 1.0)
+    centroid = (points * used[..., np.newaxis]).sum(axis=1) / count[:, np.newaxis]
+    distance = np.linalg.norm(points - centroid[:, np.newaxis, :], axis=2)
+    mean_distance = (distance * used).sum(axis=1) / count
+    scale = np.sqrt(2.0) / np.maximum(mean_distance, 1e-12)
+    
+    transforms = np.zeros((len(points), 3, 3))
+    transforms[:, 0, 0] = scale
+    transforms[:, 1, 1] = scale
+    transforms[:, 0, 2] = -scale * centroid[:, 0]
+    transforms[:, 1, 2] = -scale * centroid[:, 1]
+    transforms[:, 2, 2] = 1.0
+    return transforms
+
+
+def solve_homographies_dlt(
+    source_points: np.ndarray, dest_points: np.ndarray, weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Solve many homographies at once with the normalized, weighted DLT.
+    
+    Every batch entry is a least-squares fit of all its correspondences (no
+    outlier rejection); each point's equations are scaled by the square root
+    of its weight. Entries with fewer points can be padded with zero weights.
+    
+    Args:
+        source_points: (B, N, 2) source points
+        dest_points: (B, N, 2) destination points
+        weights: (B, N) point weights (default: all ones)
+        
+    Returns:
+        (B, 3, 3) homography matrices mapping source to destination points
+    """
+    source_points = np.asarray(source_points, dtype=np.float64)
+    dest_points = np.asarray(dest_points, dtype=np.float64)
+    if weights is None:
+        weights = np.ones(source_points.shape[:2])
+    weights = np.asarray(weights, dtype=np.float64)
+    
+    # Normalize both point sets for numerical stability
+    source_norm = _normalizing_transforms(source_points, weights)
+    dest_norm = _normalizing_transforms(dest_points, weights)
+    x = source_points[..., 0] * source_norm[:, 0:1, 0] + source_norm[:, 0:1, 2]
+    y = source_points[..., 1] * source_norm[:, 1:2, 1] + source_norm[:, 1:2, 2]
+    u = dest_points[..., 0] * dest_norm[:, 0:1, 0] + dest_norm[:, 0:1, 2]
+    v = dest_points[..., 1] * dest_norm[:, 1:2, 1] + dest_norm[:, 1:2, 2]
+    
+    # Two equations per correspondence: (B, N, 2, 9)
+    zeros = np.zeros_like(x)
+    ones = np.ones_like(x)
+    rows_u = np.stack([-x, -y, -ones, zeros, zeros, zeros, u * x, u * y, u], axis=-1)
+    rows_v = np.stack([zeros, zeros, zeros, -x, -y, -ones, v * x, v * y, v], axis=-1)
+    design = np.stack([rows_u, rows_v], axis=2) * np.sqrt(weights)[..., np.newaxis, np.newaxis]
+    design = design.reshape(len(design), -1, 9)
+    
+    # The solution is the eigenvector of A^T A with the smallest eigenvalue
+    _, eigenvectors = np.linalg.eigh(np.einsum("bki,bkj->bij", design, design))
+    normalized = eigenvectors[:, :, 0].reshape(-1, 3, 3)
+    
+    # Undo the normalization
+    matrices = np.linalg.inv(dest_norm) @ normalized @ source_norm
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return matrices / matrices[:, 2:3, 2:3]
+
+
+def solve_homography_dlt(
+    source_points: np.ndarray, dest_points: np.ndarray, weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Solve one homography with the normalized, weighted DLT.
+    
+    Args:
+        source_points: (N, 2) source points, N >= 4
+        dest_points: (N, 2) destination points
+        weights: (N,) point weights (default: all ones)
+        
+    Returns:
+        3x3 homography matrix mapping source to destination points
+    """
+    weights = None if weights is None else np.asarray(weights)[np.newaxis]
+    return solve_homographies_dlt(
+        np.asarray(source_points)[np.newaxis], np.asarray(dest_points)[np.newaxis], weights
+    )[0]
+
+
+def rotation_log(rotations: np.ndarray) -> np.ndarray:
+    """
+    Convert rotation matrices to rotation vectors (axis * angle).
+    
+    Args:
+        rotations: (N, 3, 3) rotation matrices with angles below pi
+        
+    Returns:
+        (N, 3) rotation vectors
+    """
+    skew = np.stack([
+        rotations[:, 2, 1] - rotations[:, 1, 2],
+        rotations[:, 0, 2] - rotations[:, 2, 0],
+        rotations[:, 1, 0] - rotations[:, 0, 1]
+    ], axis=1)
+    cos_angle = np.clip((np.trace(rotations, axis1=1, axis2=2) - 1) / 2, -1.0, 1.0)
+    angle = np.arccos(cos_angle)
+    # angle / (2 sin(angle)) tends to 1/2 for small angles
+    sin_angle = np.sin(angle)
+    factor = np.where(sin_angle > 1e-9, angle / (2 * np.where(sin_angle > 1e-9, sin_angle, 1.0)), 0.5)
+    return skew * factor[:, np.newaxis]
+
+
+def rotation_exp(vectors: np.ndarray) -> np.ndarray:
+    """
+    Convert rotation vectors (axis * angle) to rotation matrices (Rodrigues).
+    
+    Args:
+        vectors: (N, 3) rotation vectors
+        
+    Returns:
+        (N, 3, 3) rotation matrices
+    """
+    angle = np.linalg.norm(vectors, axis=1)
+    axis = vectors / np.where(angle > 1e-12, angle, 1.0)[:, np.newaxis]
+    cross = np.zeros((len(vectors), 3, 3))
+    cross[:, 0, 1], cross[:, 0, 2] = -axis[:, 2], axis[:, 1]
+    cross[:, 1, 0], cross[:, 1, 2] = axis[:, 2], -axis[:, 0]
+    cross[:, 2, 0], cross[:, 2, 1] = -axis[:, 1], axis[:, 0]
+    sin_angle = np.sin(angle)[:, np.newaxis, np.newaxis]
+    cos_angle = np.cos(angle)[:, np.newaxis, np.newaxis]
+    return np.eye(3) + sin_angle * cross + (1 - cos_angle) * (cross @ cross)
+
 
 class HomographyCalculator:
     """
@@ -13,7 +182,18 @@ class HomographyCalculator:
     Maps detected rink features in broadcast footage to their corresponding positions in the 2D rink.
     """
 
-    def __init__(self, rink_coordinates_path: str, broadcast_width: int = 1948, broadcast_height: int = 1042):
+    def __init__(
+        self,
+        rink_coordinates_path: str,
+        broadcast_width: int = 1948,
+        broadcast_height: int = 1042,
+        cache_size: Optional[int] = None,
+        solver: str = "ransac",
+        max_residual: float = 5.0,
+        interpolation: str = "linear",
+        smoothing: Optional[str] = None,
+        smoothing_lag: int = 15
+    ):
         """
         Initialize the HomographyCalculator with rink coordinates.
         
@@ -21,10 +201,37 @@ class HomographyCalculator:
             rink_coordinates_path: Path to the JSON file containing rink coordinates
             broadcast_width: Width of the broadcast footage (default: 1948)
             broadcast_height: Height of the broadcast footage (default: 1042)
+            cache_size: Number of most recent frames kept in the homography and
+                destination-point caches (default: None, keep every frame)
+            solver: "ransac" always runs cv2.findHomography with RANSAC; "dlt"
+                first tries a weighted least-squares (DLT) fit of all points
+                and only runs RANSAC if that fit has outliers or is invalid
+            max_residual: Largest reprojection error (rink units) a DLT fit may
+                have for any point; also the RANSAC inlier threshold
+            interpolation: "linear" blends matrix elements; "camera"
+                decomposes each matrix into camera rotation (pan/tilt),
+                focal length (zoom) and position and interpolates those
+            smoothing: None, "causal" to filter each matrix as it is stored
+                (see store_homography), or "fixed_lag" to filter a whole
+                sequence afterwards with smooth_homographies
+            smoothing_lag: With "fixed_lag", number of later frames each
+                smoothed matrix also uses
         """
+        if solver not in HOMOGRAPHY_SOLVERS:
+            raise ValueError(f"solver must be one of {HOMOGRAPHY_SOLVERS}, got {solver!r}")
+        if interpolation not in HOMOGRAPHY_INTERPOLATIONS:
+            raise ValueError(f"interpolation must be one of {HOMOGRAPHY_INTERPOLATIONS}, got {interpolation!r}")
+        if smoothing is not None and smoothing not in HOMOGRAPHY_SMOOTHINGS:
+            raise ValueError(f"smoothing must be None or one of {HOMOGRAPHY_SMOOTHINGS}, got {smoothing!r}")
+        
         self.rink_coordinates_path = rink_coordinates_path
         self.broadcast_width = broadcast_width
         self.broadcast_height = broadcast_height
+        self.solver = solver
+        self.max_residual = max_residual
+        self.interpolation = interpolation
+        self.smoothing = smoothing
+        self.smoothing_lag = smoothing_lag
         
         # Default rink dimensions
         self.rink_width = 1400
@@ -33,11 +240,11 @@ class HomographyCalculator:
         # Load rink coordinates
         self.rink_coordinates = self._load_rink_coordinates()
         
-        # Cache for homography matrices
-        self.homography_cache = {}
+        # Cache for homography matrices (measured frames; interpolations memoized separately)
+        self.homography_cache = SortedFrameCache(max_size=cache_size)
         
         # Cache for destination points (per frame)
-        self.destination_points_cache = {}
+        self.destination_points_cache = SortedFrameCache(max_size=cache_size)
         
         # Base destination points from rink coordinates
         self.base_destination_points = self._get_base_destination_points()
@@ -47,6 +254,9 @@ class HomographyCalculator:
         self.last_valid_matrix = None  # Store the last valid matrix
         self.matrix_age = 0  # Track how old the last_valid_matrix is
         
+        # Online filter for the "causal" smoothing mode
+        self.smoother = HomographySmoother(self._smoothing_reference_points()) if smoothing == "causal" else None
+        
         # Initialize logger
         self.logger = logging.getLogger(__name__)
         
@@ -159,20 +369,17 @@ class HomographyCalculator:
             return self.destination_points_cache[frame_idx].copy()
             
         # If we don't have direct destination points, try to interpolate
-        valid_indices = sorted(self.destination_points_cache.keys())
-        if not valid_indices:
+        if len(self.destination_points_cache) == 0:
             return self.base_destination_points.copy()
             
         # Find the closest indices before and after
-        before_idx = None
-        after_idx = None
+        anchors = self.destination_points_cache.neighbors(frame_idx)
+        before_idx, after_idx = anchors
         
-        for idx in valid_indices:
-            if idx <= frame_idx:
-                before_idx = idx
-            if idx > frame_idx:
-                after_idx = idx
-                break
+        # Reuse points derived earlier from the same neighbours
+        derived_points = self.destination_points_cache.get_derived(frame_idx, anchors)
+        if derived_points is not None:
+            return derived_points.copy()
         
         # If we have both before and after destination points, interpolate
         if before_idx is not None and after_idx is not None:
@@ -180,60 +387,60 @@ class HomographyCalculator:
             after_points = self.destination_points_cache[after_idx]
             
             # Calculate interpolation factor
-            frame_diff = after_idx - before_idx
-            if frame_diff == 0:
-                self.logger.warning("Before and after indices are the same for destination points, using before points")
-                interpolated_points = before_points.copy()
-            else:
-                # Calculate interpolation factor
-                t = (frame_idx - before_idx) / frame_diff
-                self.logger.info(f"Interpolating destination points with t={t:.3f}")
-                
-                # Interpolate each point
-                interpolated_points = {}
-                for key in before_points:
-                    if key in after_points:
-                        x1, y1 = before_points[key]
-                        x2, y2 = after_points[key]
-                        x = (1 - t) * x1 + t * x2
-                        y = (1 - t) * y1 + t * y2
-                        interpolated_points[key] = (x, y)
-                    else:
-                        # If point exists only in before_points, use that
-                        interpolated_points[key] = before_points[key]
-                
-                # Add points that exist only in after_points
-                for key in after_points:
-                    if key not in before_points:
-                        interpolated_points[key] = after_points[key]
+            t = (frame_idx - before_idx) / (after_idx - before_idx)
+            self.logger.info(f"Interpolating destination points with t={t:.3f}")
+            
+            # Interpolate each point
+            interpolated_points = {}
+            for key in before_points:
+                if key in after_points:
+                    x1, y1 = before_points[key]
+                    x2, y2 = after_points[key]
+                    x = (1 - t) * x1 + t * x2
+                    y = (1 - t) * y1 + t * y2
+                    interpolated_points[key] = (x, y)
+                else:
+                    # If point exists only in before_points, use that
+                    interpolated_points[key] = before_points[key]
+            
+            # Add points that exist only in after_points
+            for key in after_points:
+                if key not in before_points:
+                    interpolated_points[key] = after_points[key]
             
             # Store the interpolated points for future reference
-            self.destination_points_cache[frame_idx] = interpolated_points
+            self.destination_points_cache.set_derived(frame_idx, anchors, interpolated_points)
             return interpolated_points.copy()
         
         # If we only have before points, use those
         elif before_idx is not None:
             self.logger.info(f"Using destination points from frame {before_idx} for frame {frame_idx}")
             before_points = self.destination_points_cache[before_idx].copy()
-            self.destination_points_cache[frame_idx] = before_points
-            return before_points
+            self.destination_points_cache.set_derived(frame_idx, anchors, before_points)
+            return before_points.copy()
         
         # If we only have after points, use those
         elif after_idx is not None:
             self.logger.info(f"Using destination points from frame {after_idx} for frame {frame_idx}")
             after_points = self.destination_points_cache[after_idx].copy()
-            self.destination_points_cache[frame_idx] = after_points
-            return after_points
+            self.destination_points_cache.set_derived(frame_idx, anchors, after_points)
+            return after_points.copy()
         
         # Fallback to base destination points
         return self.base_destination_points.copy()
     
-    def extract_source_points(self, segmentation_features: Dict[str, List[Dict]]) -> Dict[str, Tuple[float, float]]:
+    def extract_source_points(
+        self,
+        segmentation_features: Dict[str, List[Dict]],
+        geometry: Optional[Dict[str, List[np.ndarray]]] = None
+    ) -> Dict[str, Tuple[float, float]]:
         """
         Extract source points from segmentation features for homography calculation.
         
         Args:
             segmentation_features: Dictionary of segmentation features
+            geometry: The features' points as arrays (see normalize_feature_geometry);
+                built from segmentation_features if not given
             
         Returns:
             Dictionary of source points
@@ -245,166 +452,91 @@ class HomographyCalculator:
             f"Raw segmentation features: {json.dumps(segmentation_features, indent=2)}"
         )
         
-        # Track feature positions for relative positioning
-        goal_line_positions = []  # List of (x, points) tuples
-        faceoff_circle_positions = []  # List of (x, points) tuples
-        blue_line_positions = []  # List of (x, points) tuples
-        center_line_x = None
-        
-        # First collect all feature positions
-        if "GoalLine" in segmentation_features:
-            for gl in segmentation_features["GoalLine"]:
-                if "points" in gl and gl["points"]:
-                    points = gl["points"]
-                    if isinstance(points[0], dict):
-                        pts = [(float(p["x"]), float(p["y"])) for p in points]
-                    else:
-                        pts = [(float(p[0]), float(p[1])) for p in points]
-                    avg_x = sum(p[0] for p in pts) / len(pts)
-                    goal_line_positions.append((avg_x, pts))
-        
-        if "FaceoffCircle" in segmentation_features:
-            for fc in segmentation_features["FaceoffCircle"]:
-                if "points" in fc and fc["points"]:
-                    points = fc["points"]
-                    if isinstance(points[0], dict):
-                        x = float(points[0]["x"])
-                        y = float(points[0]["y"])
-                    else:
-                        x = float(points[0][0])
-                        y = float(points[0][1])
-                    faceoff_circle_positions.append((x, [(x, y)]))
-                elif "center" in fc:
-                    x = float(fc["center"]["x"])
-                    y = float(fc["center"]["y"])
-                    faceoff_circle_positions.append((x, [(x, y)]))
-        
-        if "BlueLine" in segmentation_features:
-            for bl in segmentation_features["BlueLine"]:
-                if "points" in bl and bl["points"]:
-                    points = bl["points"]
-                    if isinstance(points[0], dict):
-                        pts = [(float(p["x"]), float(p["y"])) for p in points]
-                    else:
-                        pts = [(float(p[0]), float(p[1])) for p in points]
-                    avg_x = sum(p[0] for p in pts) / len(pts)
-                    blue_line_positions.append((avg_x, pts))
-        
-        if "RedCenterLine" in segmentation_features and segmentation_features["RedCenterLine"]:
-            for cl in segmentation_features["RedCenterLine"]:
-                if "points" in cl and cl["points"]:
-                    points = cl["points"]
-                    if isinstance(points[0], dict):
-                        x_positions = [float(p["x"]) for p in points]
-                    else:
-                        x_positions = [float(p[0]) for p in points]
-                    center_line_x = sum(x_positions) / len(x_positions)
-                    break
-        
-        # Now classify goal lines
-        left_goal_line = None
-        right_goal_line = None
-        for goal_x, goal_points in goal_line_positions:
-            # Check if this goal line is left of any faceoff circle
-            is_left_of_faceoff = any(goal_x < fc_x for fc_x, _ in faceoff_circle_positions)
-            # Check if this goal line is right of any faceoff circle
-            is_right_of_faceoff = any(goal_x > fc_x for fc_x, _ in faceoff_circle_positions)
-            
-            if is_left_of_faceoff and not is_right_of_faceoff:
-                left_goal_line = (goal_x, goal_points)
-                # Add to source points
-                source_points["goal_line_left_top"] = goal_points[0]
-                source_points["goal_line_left_bottom"] = goal_points[-1]
-                self.logger.info(f"Classified goal line at x={goal_x} as LEFT")
-            elif is_right_of_faceoff and not is_left_of_faceoff:
-                right_goal_line = (goal_x, goal_points)
-                # Add to source points
-                source_points["goal_line_right_top"] = goal_points[0]
-                source_points["goal_line_right_bottom"] = goal_points[-1]
-                self.logger.info(f"Classified goal line at x={goal_x} as RIGHT")
-        
-        # Classify faceoff circles
-        for fc_x, fc_points in faceoff_circle_positions:
-            is_left_circle = False
-            is_right_circle = False
-            
-            # Check relative to goal lines
-            if left_goal_line and fc_x > left_goal_line[0]:
-                is_left_circle = True
-            if right_goal_line and fc_x < right_goal_line[0]:
-                is_right_circle = True
-                
-            # Check relative to blue lines
-            for blue_x, _ in blue_line_positions:
-                if fc_x < blue_x:
-                    is_left_circle = True
-                if fc_x > blue_x:
-                    is_right_circle = True
-            
+        if geometry is None:
+            geometry = normalize_feature_geometry(segmentation_features)
+        
+        # Feature positions for relative positioning: average x per line, first point per circle
+        goal_lines = geometry.get("GoalLine", [])
+        blue_lines = geometry.get("BlueLine", [])
+        goal_x = np.array([pts[:, 0].mean() for pts in goal_lines])
+        blue_x = np.array([pts[:, 0].mean() for pts in blue_lines])
+        faceoff_points = np.array([pts[0] for pts in geometry.get("FaceoffCircle", [])]).reshape(-1, 2)
+        faceoff_x = faceoff_points[:, 0]
+        center_lines = geometry.get("RedCenterLine", [])
+        center_line = center_lines[0] if center_lines else None
+        center_line_x = center_line[:, 0].mean() if center_line is not None else None
+        
+        # Now classify goal lines against the faceoff circles
+        left_goal_x = None
+        right_goal_x = None
+        goal_left_of_faceoff = (goal_x[:, np.newaxis] < faceoff_x[np.newaxis, :]).any(axis=1)
+        goal_right_of_faceoff = (goal_x[:, np.newaxis] > faceoff_x[np.newaxis, :]).any(axis=1)
+        for i in np.flatnonzero(goal_left_of_faceoff != goal_right_of_faceoff):
+            goal_points = goal_lines[i]
+            if goal_left_of_faceoff[i]:
+                left_goal_x = goal_x[i]
+                source_points["goal_line_left_top"] = tuple(goal_points[0].tolist())
+                source_points["goal_line_left_bottom"] = tuple(goal_points[-1].tolist())
+                self.logger.info(f"Classified goal line at x={goal_x[i]} as LEFT")
+            else:
+                right_goal_x = goal_x[i]
+                source_points["goal_line_right_top"] = tuple(goal_points[0].tolist())
+                source_points["goal_line_right_bottom"] = tuple(goal_points[-1].tolist())
+                self.logger.info(f"Classified goal line at x={goal_x[i]} as RIGHT")
+        
+        # Classify faceoff circles relative to goal lines and blue lines
+        circle_left = (faceoff_x[:, np.newaxis] < blue_x[np.newaxis, :]).any(axis=1)
+        circle_right = (faceoff_x[:, np.newaxis] > blue_x[np.newaxis, :]).any(axis=1)
+        if left_goal_x is not None:
+            circle_left |= faceoff_x > left_goal_x
+        if right_goal_x is not None:
+            circle_right |= faceoff_x < right_goal_x
+        circle_top = faceoff_points[:, 1] < self.broadcast_height / 2
+        for i in np.flatnonzero(circle_left != circle_right):
+            fc_x, y = faceoff_points[i].tolist()
             # Classify based on vertical position
-            y = fc_points[0][1]
-            if is_left_circle and not is_right_circle:
-                if y < self.broadcast_height / 2:
-                    source_points["faceoff_circle_0"] = fc_points[0]  # top left
+            if circle_left[i]:
+                if circle_top[i]:
+                    source_points["faceoff_circle_0"] = (fc_x, y)  # top left
                     self.logger.info(f"Added top left faceoff circle at ({fc_x}, {y})")
                 else:
-                    source_points["faceoff_circle_2"] = fc_points[0]  # bottom left
+                    source_points["faceoff_circle_2"] = (fc_x, y)  # bottom left
                     self.logger.info(f"Added bottom left faceoff circle at ({fc_x}, {y})")
-            elif is_right_circle and not is_left_circle:
-                if y < self.broadcast_height / 2:
-                    source_points["faceoff_circle_1"] = fc_points[0]  # top right
+            else:
+                if circle_top[i]:
+                    source_points["faceoff_circle_1"] = (fc_x, y)  # top right
                     self.logger.info(f"Added top right faceoff circle at ({fc_x}, {y})")
                 else:
-                    source_points["faceoff_circle_3"] = fc_points[0]  # bottom right
+                    source_points["faceoff_circle_3"] = (fc_x, y)  # bottom right
                     self.logger.info(f"Added bottom right faceoff circle at ({fc_x}, {y})")
         
-        # Classify blue lines
-        for blue_x, blue_points in blue_line_positions:
-            is_left_blue = False
-            is_right_blue = False
-            
-            # Check relative to center line if available
-            if center_line_x:
-                if blue_x < center_line_x:
-                    is_left_blue = True
-                else:
-                    is_right_blue = True
-            
-            # Check relative to faceoff circles and goal lines
-            if left_goal_line and blue_x > left_goal_line[0]:
-                is_left_blue = True
-            if right_goal_line and blue_x < right_goal_line[0]:
-                is_right_blue = True
-                
-            for fc_x, _ in faceoff_circle_positions:
-                if blue_x > fc_x:
-                    is_left_blue = True
-                if blue_x < fc_x:
-                    is_right_blue = True
-            
+        # Classify blue lines relative to the center line, goal lines and faceoff circles
+        blue_left = (blue_x[:, np.newaxis] > faceoff_x[np.newaxis, :]).any(axis=1)
+        blue_right = (blue_x[:, np.newaxis] < faceoff_x[np.newaxis, :]).any(axis=1)
+        if center_line_x:
+            blue_left |= blue_x < center_line_x
+            blue_right |= blue_x >= center_line_x
+        if left_goal_x is not None:
+            blue_left |= blue_x > left_goal_x
+        if right_goal_x is not None:
+            blue_right |= blue_x < right_goal_x
+        for i in np.flatnonzero(blue_left != blue_right):
+            blue_points = blue_lines[i]
             # Classify based on strongest evidence
-            if is_left_blue and not is_right_blue:
-                source_points["blue_line_left_top"] = blue_points[0]
-                source_points["blue_line_left_bottom"] = blue_points[-1]
-                self.logger.info(f"Classified blue line at x={blue_x} as LEFT")
-            elif is_right_blue and not is_left_blue:
-                source_points["blue_line_right_top"] = blue_points[0]
-                source_points["blue_line_right_bottom"] = blue_points[-1]
-                self.logger.info(f"Classified blue line at x={blue_x} as RIGHT")
+            if blue_left[i]:
+                source_points["blue_line_left_top"] = tuple(blue_points[0].tolist())
+                source_points["blue_line_left_bottom"] = tuple(blue_points[-1].tolist())
+                self.logger.info(f"Classified blue line at x={blue_x[i]} as LEFT")
+            else:
+                source_points["blue_line_right_top"] = tuple(blue_points[0].tolist())
+                source_points["blue_line_right_bottom"] = tuple(blue_points[-1].tolist())
+                self.logger.info(f"Classified blue line at x={blue_x[i]} as RIGHT")
         
         # Add center line points if available
-        if center_line_x is not None:
-            for cl in segmentation_features["RedCenterLine"]:
-                if "points" in cl and cl["points"]:
-                    points = cl["points"]
-                    if isinstance(points[0], dict):
-                        pts = [(float(p["x"]), float(p["y"])) for p in points]
-                    else:
-                        pts = [(float(p[0]), float(p[1])) for p in points]
-                    source_points["center_line_top"] = pts[0]
-                    source_points["center_line_bottom"] = pts[-1]
-                    self.logger.info(f"Added center line points at x={center_line_x}")
-                    break
+        if center_line is not None:
+            source_points["center_line_top"] = tuple(center_line[0].tolist())
+            source_points["center_line_bottom"] = tuple(center_line[-1].tolist())
+            self.logger.info(f"Added center line points at x={center_line_x}")
         
         # Log summary of found points
         self.logger.info(f"Found {len(source_points)} source points:")
@@ -436,84 +568,48 @@ class HomographyCalculator:
         weight = min(ratio, 1/ratio)
         return weight
 
-    def detect_camera_zone(self, segmentation_features: Dict[str, List[Dict]]) -> str:
+    def detect_camera_zone(
+        self,
+        segmentation_features: Dict[str, List[Dict]],
+        geometry: Optional[Dict[str, List[np.ndarray]]] = None
+    ) -> str:
         """
         Detect which zone the camera is focused on based on the detected features.
         
         Args:
             segmentation_features: Dictionary of detected features
+            geometry: The features' points as arrays (see normalize_feature_geometry);
+                built from segmentation_features if not given
             
         Returns:
             String indicating the camera zone: "left", "right", "center", or "unknown"
         """
-        # Count features in different zones
-        left_features = 0
-        right_features = 0
-        center_features = 0
+        if geometry is None:
+            geometry = normalize_feature_geometry(segmentation_features)
         
-        # Check goal line positions
-        if "GoalLine" in segmentation_features:
-            for line in segmentation_features["GoalLine"]:
-                if "points" in line and line["points"]:
-                    # Calculate average x position
-                    if isinstance(line["points"][0], dict):
-                        x_positions = [p["x"] for p in line["points"]]
-                    else:
-                        x_positions = [p[0] for p in line["points"]]
-                    
-                    avg_x = sum(x_positions) / len(x_positions)
-                    
-                    # Determine if this is likely left or right goal line
-                    if avg_x < self.broadcast_width * 0.4:  # Left third of screen
-                        left_features += 2  # Weight goal lines more heavily
-                    elif avg_x > self.broadcast_width * 0.6:  # Right third of screen
-                        right_features += 2
-                    else:
-                        center_features += 1
+        def count_zones(x: np.ndarray, left_edge: float, right_edge: float) -> Tuple[int, int, int]:
+            left = int(np.count_nonzero(x < self.broadcast_width * left_edge))
+            right = int(np.count_nonzero(x > self.broadcast_width * right_edge))
+            return left, right, len(x) - left - right
         
-        # Check faceoff circle positions
-        if "FaceoffCircle" in segmentation_features:
-            for circle in segmentation_features["FaceoffCircle"]:
-                if "center" in circle:
-                    x = float(circle["center"]["x"])
-                elif "points" in circle and circle["points"]:
-                    if isinstance(circle["points"][0], dict):
-                        x = float(circle["points"][0]["x"])
-                    else:
-                        x = float(circle["points"][0][0])
-                else:
-                    continue
-                
-                # Determine zone based on x position
-                if x < self.broadcast_width * 0.4:
-                    left_features += 1
-                elif x > self.broadcast_width * 0.6:
-                    right_features += 1
-                else:
-                    center_features += 1
+        # Goal lines by average x position (weighted more heavily on the sides)
+        goal_x = np.array([pts[:, 0].mean() for pts in geometry.get("GoalLine", [])])
+        goal_left, goal_right, goal_center = count_zones(goal_x, 0.4, 0.6)
         
-        # Check blue line positions
-        if "BlueLine" in segmentation_features:
-            for line in segmentation_features["BlueLine"]:
-                if "points" in line and line["points"]:
-                    # Calculate average x position
-                    if isinstance(line["points"][0], dict):
-                        x_positions = [p["x"] for p in line["points"]]
-                    else:
-                        x_positions = [p[0] for p in line["points"]]
-                    
-                    avg_x = sum(x_positions) / len(x_positions)
-                    
-                    # Determine if this is likely left or right blue line
-                    if avg_x < self.broadcast_width * 0.45:
-                        left_features += 1
-                    elif avg_x > self.broadcast_width * 0.55:
-                        right_features += 1
-                    else:
-                        center_features += 1
+        # Faceoff circles by center position
+        circle_x = np.array([pts[0, 0] for pts in geometry.get("FaceoffCircle", [])])
+        circle_left, circle_right, circle_center = count_zones(circle_x, 0.4, 0.6)
+        
+        # Blue lines by average x position
+        blue_x = np.array([pts[:, 0].mean() for pts in geometry.get("BlueLine", [])])
+        blue_left, blue_right, blue_center = count_zones(blue_x, 0.45, 0.55)
+        
+        left_features = 2 * goal_left + circle_left + blue_left
+        right_features = 2 * goal_right + circle_right + blue_right
+        center_features = goal_center + circle_center + blue_center
         
         # Check center line position
-        if "RedCenterLine" in segmentation_features:
+        if "RedCenterLine" in geometry:
             center_features += 2  # Weight center line heavily for center zone
         
         # Determine the most likely zone
@@ -597,7 +693,8 @@ class HomographyCalculator:
     def calculate_homography(
         self, 
         segmentation_features: Dict[str, List[Dict]],
-        frame_idx: int = None  # Add parameter to track which frame this is for
+        frame_idx: int = None,  # Add parameter to track which frame this is for
+        geometry: Optional[Dict[str, List[np.ndarray]]] = None
     ) -> Optional[np.ndarray]:
         """
         Calculate homography matrix from segmentation features.
@@ -605,12 +702,148 @@ class HomographyCalculator:
         Args:
             segmentation_features: Dictionary of segmentation features
             frame_idx: Optional frame index for caching the matrix
+            geometry: The features' points as arrays, as returned with the
+                segmentation result; built here if not given
             
         Returns:
             Homography matrix if successful, None otherwise
         """
+        correspondences = self._find_correspondences(segmentation_features, frame_idx, geometry)
+        if correspondences is None:
+            return None
+        
+        initial_matrix = None
+        if self.solver == "dlt":
+            names, source_pts, dest_pts = correspondences
+            initial_matrix = solve_homography_dlt(
+                source_pts, dest_pts, self._point_weights(names, source_pts, dest_pts, segmentation_features)
+            )
+        
+        matrix = self._solve_homography(correspondences, initial_matrix)
+        if matrix is not None and frame_idx is not None:
+            matrix = self.store_homography(frame_idx, matrix)
+        return matrix
+    
+    def calculate_homographies(
+        self,
+        segmentation_features_list: List[Dict[str, List[Dict]]],
+        frame_indices: Optional[List[int]] = None,
+        geometries: Optional[List[Optional[Dict[str, List[np.ndarray]]]]] = None,
+        store: bool = True
+    ) -> List[Optional[np.ndarray]]:
+        """
+        Calculate homography matrices for many frames.
+        
+        Batched form of calculate_homography: with the "dlt" solver all frames'
+        correspondences are fitted in one batched solve, and only frames whose
+        fit fails go through RANSAC individually.
+        
+        Args:
+            segmentation_features_list: Segmentation features, one dict per frame
+            frame_indices: Optional frame indices, one per frame
+            geometries: Optional feature geometry arrays, one per frame
+            store: Store valid matrices in the cache (in input order); if False,
+                the caller can store them later with store_homography
+            
+        Returns:
+            List with a homography matrix (or None) per frame
+        """
+        count = len(segmentation_features_list)
+        frame_indices = frame_indices if frame_indices is not None else [None] * count
+        geometries = geometries if geometries is not None else [None] * count
+        
+        correspondences = [
+            self._find_correspondences(features, frame_idx, geometry)
+            for features, frame_idx, geometry in zip(segmentation_features_list, frame_indices, geometries)
+        ]
+        
+        # One batched DLT solve, with shorter point lists padded by zero weights,
+        # and one batched validation of the results
+        initial_matrices = [None] * count
+        initial_valid = [None] * count
+        solvable = [i for i, c in enumerate(correspondences) if c is not None]
+        if self.solver == "dlt" and solvable:
+            max_points = max(len(correspondences[i][1]) for i in solvable)
+            source_batch = np.zeros((len(solvable), max_points, 2))
+            dest_batch = np.zeros((len(solvable), max_points, 2))
+            weight_batch = np.zeros((len(solvable), max_points))
+            for row, i in enumerate(solvable):
+                names, source_pts, dest_pts = correspondences[i]
+                source_batch[row, :len(names)] = source_pts
+                dest_batch[row, :len(names)] = dest_pts
+                weight_batch[row, :len(names)] = self._point_weights(
+                    names, source_pts, dest_pts, segmentation_features_list[i]
+                )
+            solved = solve_homographies_dlt(source_batch, dest_batch, weight_batch)
+            valid, _ = self.validate_homographies(solved)
+            for i, matrix, matrix_valid in zip(solvable, solved, valid):
+                initial_matrices[i] = matrix
+                initial_valid[i] = bool(matrix_valid)
+        
+        matrices = []
+        for i, frame_idx in enumerate(frame_indices):
+            matrix = None
+            if correspondences[i] is not None:
+                matrix = self._solve_homography(correspondences[i], initial_matrices[i], initial_valid[i])
+            if matrix is not None and store and frame_idx is not None:
+                matrix = self.store_homography(frame_idx, matrix)
+            matrices.append(matrix)
+        return matrices
+    
+    def store_homography(self, frame_idx: int, matrix: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Record a valid matrix for a frame in the cache and the smoothing window.
+        
+        With "causal" smoothing the matrix is filtered first (frames must then
+        be stored in increasing order), and the filtered matrix is stored.
+        
+        Args:
+            frame_idx: Frame index
+            matrix: Valid homography matrix
+            
+        Returns:
+            The matrix that was stored, or None if the smoothing filter
+            rejected it as an outlier (nothing is stored then)
+        """
+        if self.smoother is not None:
+            smoothed = self.smoother.update(frame_idx, matrix)
+            if smoothed is None or not self.validate_homography(smoothed):
+                self.logger.info(f"Smoothing filter rejected homography for frame {frame_idx}")
+                return None
+            matrix = smoothed
+        
+        self.homography_cache[frame_idx] = matrix
+        # Also store in recent matrices for smoothing
+        self.recent_matrices.append(matrix)
+        if len(self.recent_matrices) > self.max_matrices:
+            self.recent_matrices.popleft()  # Remove oldest matrix
+        self.logger.info(f"Stored valid homography matrix for frame {frame_idx}")
+        return matrix
+    
+    def _find_correspondences(
+        self,
+        segmentation_features: Dict[str, List[Dict]],
+        frame_idx: Optional[int],
+        geometry: Optional[Dict[str, List[np.ndarray]]]
+    ) -> Optional[Tuple[List[str], np.ndarray, np.ndarray]]:
+        """
+        Match labeled source points in a frame to rink destination points.
+        
+        Args:
+            segmentation_features: Dictionary of segmentation features
+            frame_idx: Optional frame index for caching the destination points
+            geometry: The features' points as arrays, or None
+            
+        Returns:
+            (point names, (N, 2) source points, (N, 2) destination points), or
+            None if fewer than 4 points match
+        """
+        # Parse the feature points once for point labeling and zone detection
+        if geometry is None:
+            geometry = normalize_feature_geometry(segmentation_features)
+        
         # Extract source points from segmentation features
-        source_points = self.extract_source_points(segmentation_features)
+        source_points = self.extract_source_points(segmentation_features, geometry)
         
         # Log available source points
         self.logger.info(
@@ -618,7 +851,7 @@ class HomographyCalculator:
         )
         
         # Detect which zone the camera is in
-        camera_zone = self.detect_camera_zone(segmentation_features)
+        camera_zone = self.detect_camera_zone(segmentation_features, geometry)
         self.logger.info(f"Detected camera zone: {camera_zone}")
         
         # Adjust destination points based on camera zone
@@ -651,39 +884,83 @@ class HomographyCalculator:
             return None
         
         # Get corresponding destination points
-        source_pts = []
-        dest_pts = []
-        
-        for name, point in source_points.items():
-            if name in dest_points:
-                source_pts.append(point)
-                dest_pts.append(dest_points[name])
+        names = [name for name in source_points if name in dest_points]
         
         # Need at least 4 matching points
-        if len(source_pts) < 4:
+        if len(names) < 4:
             self.logger.warning(
-                f"Insufficient matching points: found {len(source_pts)}, need 4"
+                f"Insufficient matching points: found {len(names)}, need 4"
             )
             return None
         
         # Convert to numpy arrays
-        source_pts = np.array(source_pts, dtype=np.float32)
-        dest_pts = np.array(dest_pts, dtype=np.float32)
+        source_pts = np.array([source_points[name] for name in names], dtype=np.float32)
+        dest_pts = np.array([dest_points[name] for name in names], dtype=np.float32)
+        return names, source_pts, dest_pts
+    
+    def _point_weights(
+        self, names: List[str], source_pts: np.ndarray, dest_pts: np.ndarray, segmentation_features: Dict
+    ) -> np.ndarray:
+        """Reliability weights for the DLT fit (see _calculate_feature_weights)."""
+        common_points = {
+            name: (tuple(src), tuple(dst)) for name, src, dst in zip(names, source_pts, dest_pts)
+        }
+        return self._calculate_feature_weights(common_points, segmentation_features)
+    
+    def _solve_homography(
+        self,
+        correspondences: Tuple[List[str], np.ndarray, np.ndarray],
+        initial_matrix: Optional[np.ndarray] = None,
+        initial_valid: Optional[bool] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Turn a frame's correspondences into a validated homography.
+        
+        A least-squares initial_matrix is accepted if every point reprojects
+        within max_residual and it passes validation; otherwise RANSAC runs.
+        
+        Args:
+            correspondences: Output of _find_correspondences
+            initial_matrix: Optional DLT fit of all correspondences
+            initial_valid: Whether initial_matrix already passed validation
+                (None validates it here)
+            
+        Returns:
+            Homography matrix if successful, None otherwise
+        """
+        _, source_pts, dest_pts = correspondences
         
         try:
+            if initial_matrix is not None and np.all(np.isfinite(initial_matrix)):
+                projected = cv2.perspectiveTransform(
+                    source_pts.reshape(-1, 1, 2).astype(np.float64), initial_matrix
+                ).reshape(-1, 2)
+                max_error = float(np.max(np.linalg.norm(projected - dest_pts, axis=1)))
+                if max_error <= self.max_residual:
+                    self.logger.debug(f"DLT fit of {len(source_pts)} points, max residual {max_error:.2f}")
+                    if initial_valid is None:
+                        initial_valid = self.validate_homography(initial_matrix)
+                    if initial_valid:
+                        return initial_matrix
+                else:
+                    self.logger.info(
+                        f"DLT max residual {max_error:.2f} exceeds {self.max_residual}, falling back to RANSAC"
+                    )
+            
             # Calculate homography matrix using RANSAC
             matrix, mask = cv2.findHomography(
-                source_pts, dest_pts, cv2.RANSAC, 5.0
+                source_pts, dest_pts, cv2.RANSAC, self.max_residual
             )
+            if matrix is None:
+                self.logger.warning("RANSAC found no homography")
+                return None
 
             # Log RANSAC results
-            self.logger.info("RANSAC Results:")
-            self.logger.info(f"Number of points: {len(source_pts)}")
-            self.logger.info("Point correspondences and inlier status:")
+            self.logger.debug("Point correspondences and inlier status:")
             for i, ((sx, sy), (dx, dy), m) in enumerate(zip(source_pts, dest_pts, mask)):
                 inlier_status = "INLIER" if m == 1 else "OUTLIER"
-                self.logger.info(f"Point {i}: Source({sx:.1f}, {sy:.1f}) -> Dest({dx:.1f}, {dy:.1f}) - {inlier_status}")
-            self.logger.info(f"Total inliers: {np.sum(mask)}/{len(mask)}")
+                self.logger.debug(f"Point {i}: Source({sx:.1f}, {sy:.1f}) -> Dest({dx:.1f}, {dy:.1f}) - {inlier_status}")
+            self.logger.info(f"RANSAC inliers: {np.sum(mask)}/{len(mask)}")
             
             # Convert matrix to numpy array if it's not already
             if not isinstance(matrix, np.ndarray):
@@ -692,15 +969,6 @@ class HomographyCalculator:
             # Validate the homography matrix
             if not self.validate_homography(matrix):
                 return None
-            
-            # Store the valid matrix in the cache if frame index is provided
-            if frame_idx is not None:
-                self.homography_cache[frame_idx] = matrix
-                # Also store in recent matrices for smoothing
-                self.recent_matrices.append(matrix)
-                if len(self.recent_matrices) > self.max_matrices:
-                    self.recent_matrices.popleft()  # Remove oldest matrix
-                self.logger.info(f"Stored valid homography matrix for frame {frame_idx}")
                 
             return matrix
             
@@ -770,81 +1038,148 @@ class HomographyCalculator:
             self.logger.error(f"Invalid matrix shape: {shape_info}")
             return False
         
-        # Check corner bounds
-        corners = np.float32([
-            [0, 0],
-            [self.broadcast_width, 0],
-            [self.broadcast_width, self.broadcast_height],
-            [0, self.broadcast_height]
-        ])
+        _, reasons = self.validate_homographies(h_matrix[np.newaxis])
+        reason = HomographyCheck(int(reasons[0]))
+        if reason != HomographyCheck.VALID:
+            self.logger.error(f"Invalid homography: {reason.name.lower()}")
+            return False
+        return True
+    
+    def validate_homographies(self, matrices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Validate a stack of homography matrices in one pass.
         
-        transformed_corners = cv2.perspectiveTransform(
-            corners.reshape(-1, 1, 2), 
-            h_matrix
-        ).reshape(-1, 2)
+        Applies the checks of validate_homography to every matrix at once:
+        the projected frame corners must stay within the rink plus a 100%
+        margin, and the projected area and diagonal must stay within lenient
+        ratios of the frame's own.
         
-        # Check if corners are within reasonable bounds
-        rink_width = self.rink_width
-        rink_height = self.rink_height
+        Args:
+            matrices: (N, 3, 3) candidate homography matrices
+            
+        Returns:
+            (valid, reasons): (N,) bool mask and (N,) uint8 HomographyCheck
+            codes giving the first failed check per matrix
+        """
+        matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 3, 3)
+        reasons = np.full(len(matrices), HomographyCheck.VALID, dtype=np.uint8)
+        
+        def fail(mask: np.ndarray, reason: HomographyCheck) -> None:
+            # Keep the first failure per matrix
+            reasons[mask & (reasons == HomographyCheck.VALID)] = reason
+        
+        # Project the frame corners: (N, 4, 2)
+        corners = np.array([
+            [0, 0, 1],
+            [self.broadcast_width, 0, 1],
+            [self.broadcast_width, self.broadcast_height, 1],
+            [0, self.broadcast_height, 1]
+        ], dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            projected = np.einsum("nij,kj->nki", matrices, corners)
+            transformed = projected[..., :2] / projected[..., 2:3]
+        fail(~np.isfinite(transformed).all(axis=(1, 2)), HomographyCheck.NON_FINITE)
         
-        # Increase margin to allow for more extreme perspectives
+        # Check if corners are within reasonable bounds
+        # (increased margin to allow for more extreme perspectives)
         margin = 1.0  # Allow 100% margin outside rink bounds
-        min_x = -rink_width * margin
-        max_x = rink_width * (1 + margin)
-        min_y = -rink_height * margin
-        max_y = rink_height * (1 + margin)
-        
-        # Log corner positions
-        self.logger.info("Transformed corner positions:")
-        for i, corner in enumerate(transformed_corners):
-            self.logger.info(
-                f"Corner {i}: ({corner[0]:.1f}, {corner[1]:.1f})"
+        x, y = transformed[..., 0], transformed[..., 1]
+        with np.errstate(invalid="ignore"):
+            in_bounds = (
+                (x >= -self.rink_width * margin) & (x <= self.rink_width * (1 + margin))
+                & (y >= -self.rink_height * margin) & (y <= self.rink_height * (1 + margin))
             )
-            self.logger.info(
-                f"Bounds: x=[{min_x:.1f}, {max_x:.1f}], "
-                f"y=[{min_y:.1f}, {max_y:.1f}]"
-            )
-            if not (min_x <= corner[0] <= max_x and min_y <= corner[1] <= max_y):
-                self.logger.error(f"Corner {i} is out of bounds")
-                return False
-        
-        # Check area ratio with more lenient bounds
-        original_area = self.broadcast_width * self.broadcast_height
-        transformed_area = cv2.contourArea(transformed_corners)
-        area_ratio = transformed_area / original_area
-        
-        # Allow for more extreme area changes
-        min_area_ratio = 0.01  # Allow much smaller projected area
-        max_area_ratio = 50.0  # Allow much larger projected area
+        fail(~in_bounds.all(axis=1), HomographyCheck.CORNER_OUT_OF_BOUNDS)
+        
+        # Check area ratio with more lenient bounds (shoelace formula)
+        with np.errstate(invalid="ignore", over="ignore"):
+            transformed_area = 0.5 * np.abs(np.sum(x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y, axis=1))
+            area_ratio = transformed_area / (self.broadcast_width * self.broadcast_height)
+            # Allow for more extreme area changes
+            fail(~((area_ratio >= 0.01) & (area_ratio <= 50.0)), HomographyCheck.AREA_RATIO)
+            
+            # Check diagonal ratio with more lenient bounds
+            original_diag = np.sqrt(self.broadcast_width**2 + self.broadcast_height**2)
+            diag1 = np.linalg.norm(transformed[:, 1] - transformed[:, 3], axis=1)
+            diag2 = np.linalg.norm(transformed[:, 0] - transformed[:, 2], axis=1)
+            diag_ratio = np.maximum(diag1, diag2) / original_diag
+            # Allow for more extreme diagonal changes
+            fail(~((diag_ratio >= 0.05) & (diag_ratio <= 20.0)), HomographyCheck.DIAGONAL_RATIO)
+        
+        return reasons == HomographyCheck.VALID, reasons
+
+    def get_state(self) -> Dict:
+        """
+        Get the state later frames depend on, as a JSON-serializable dict.
         
-        self.logger.info(
-            f"Area ratio: {area_ratio:.3f} "
-            f"(should be between {min_area_ratio} and {max_area_ratio})"
-        )
-        if not (min_area_ratio <= area_ratio <= max_area_ratio):
-            self.logger.error(f"Invalid area ratio: {area_ratio:.3f}")
-            return False
+        Only the most recent cached matrix is kept, since fallback lookups
+        for later frames never reach further back. See set_state.
         
-        # Check diagonal ratio with more lenient bounds
-        original_diag = np.sqrt(self.broadcast_width**2 + self.broadcast_height**2)
-        transformed_diag1 = np.linalg.norm(transformed_corners[1] - transformed_corners[3])
-        transformed_diag2 = np.linalg.norm(transformed_corners[0] - transformed_corners[2])
-        diag_ratio = max(transformed_diag1, transformed_diag2) / original_diag
+        Returns:
+            Dictionary with the latest cached matrix, the smoothing window and
+            the smoothing filter state
+        """
+        latest = self.homography_cache.keys()[-1:]
+        return {
+            "homography_cache": [[frame_idx, self.homography_cache[frame_idx].tolist()] for frame_idx in latest],
+            "recent_matrices": [matrix.tolist() for matrix in self.recent_matrices],
+            "smoother": self.smoother.get_state() if self.smoother is not None else None
+        }
+    
+    def set_state(self, state: Dict) -> None:
+        """
+        Restore the state saved by get_state.
         
-        # Allow for more extreme diagonal changes
-        min_diag_ratio = 0.05  # Allow much smaller diagonals
-        max_diag_ratio = 20.0  # Allow much larger diagonals
+        Args:
+            state: Dictionary returned by get_state
+        """
+        self.homography_cache.clear()
+        for frame_idx, matrix in state["homography_cache"]:
+            self.homography_cache[frame_idx] = np.array(matrix, dtype=np.float64)
+        self.recent_matrices.clear()
+        self.recent_matrices.extend(np.array(matrix, dtype=np.float64) for matrix in state["recent_matrices"])
+        if self.smoother is not None and state["smoother"] is not None:
+            self.smoother.set_state(state["smoother"])
+    
+    def _smoothing_reference_points(self) -> np.ndarray:
+        """Rink points the smoothing filter tracks: the corners of the middle half of the rink."""
+        return np.array([
+            [0.25 * self.rink_width, 0.25 * self.rink_height],
+            [0.75 * self.rink_width, 0.25 * self.rink_height],
+            [0.75 * self.rink_width, 0.75 * self.rink_height],
+            [0.25 * self.rink_width, 0.75 * self.rink_height]
+        ])
+    
+    def smooth_homographies(
+        self, frame_indices: List[int], matrices: List[Optional[np.ndarray]]
+    ) -> List[Optional[np.ndarray]]:
+        """
+        Smooth a sequence of homographies with a fixed-lag filter.
         
-        self.logger.info(
-            f"Diagonal ratio: {diag_ratio:.3f} "
-            f"(should be between {min_diag_ratio} and {max_diag_ratio})"
-        )
-        if not (min_diag_ratio <= diag_ratio <= max_diag_ratio):
-            self.logger.error(f"Invalid diagonal ratio: {diag_ratio:.3f}")
-            return False
+        Every matrix is estimated from the frames up to smoothing_lag frames
+        after it (see HomographySmoother.smooth), in one pass over the
+        sequence. Matrices the filter rejects as outliers, or whose smoothed
+        version fails validation, come back as None.
         
-        return True
-
+        Args:
+            frame_indices: Frame indices in increasing order
+            matrices: Homography matrix (or None) per frame
+            
+        Returns:
+            Smoothed matrix (or None) per frame
+        """
+        smoother = HomographySmoother(self._smoothing_reference_points(), lag=self.smoothing_lag)
+        smoothed = [matrix for _, matrix in smoother.smooth(zip(frame_indices, matrices))]
+        
+        # Validate all smoothed matrices in one batched call
+        present = [i for i, matrix in enumerate(smoothed) if matrix is not None]
+        if present:
+            valid, _ = self.validate_homographies(np.stack([smoothed[i] for i in present]))
+            for i, matrix_valid in zip(present, valid):
+                if not matrix_valid:
+                    smoothed[i] = None
+        return smoothed
+    
     def get_average_matrix(self) -> Optional[np.ndarray]:
         """
         Calculate an average homography matrix from recent valid matrices.
@@ -884,9 +1219,11 @@ class HomographyCalculator:
         # Convert back to list of tuples
         return [(pt[0][0], pt[0][1]) for pt in transformed_pts]
     
-    def interpolate_homography(self, matrix1: np.ndarray, matrix2: np.ndarray, t: float) -> np.ndarray:
+    def interpolate_homography(
+        self, matrix1: np.ndarray, matrix2: np.ndarray, t: float, method: Optional[str] = None
+    ) -> np.ndarray:
         """
-        Linearly interpolate between two homography matrices.
+        Interpolate between two homography matrices.
         
         This performs true interpolation between two homography matrices, providing a 
         smooth transition between different camera views. The interpolation creates
@@ -899,20 +1236,170 @@ class HomographyCalculator:
                - t=0.0 would return matrix1
                - t=1.0 would return matrix2
                - t=0.5 would return an equal blend of both matrices
+            method: "linear" or "camera" (defaults to the calculator's interpolation)
             
         Returns:
             Interpolated homography matrix
         """
+        return self.interpolate_homographies(
+            np.asarray(matrix1)[np.newaxis], np.asarray(matrix2)[np.newaxis], np.array([t]), method
+        )[0]
+    
+    def interpolate_homographies(
+        self, matrices1: np.ndarray, matrices2: np.ndarray, t: np.ndarray, method: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Interpolate many pairs of homography matrices at once.
+        
+        Batched form of interpolate_homography: row i blends matrices1[i] and
+        matrices2[i] with factor t[i]. A single (3, 3) pair is broadcast over
+        all t values, so a whole gap can be filled in one call.
+        
+        With the "linear" method matrix elements are blended and renormalized.
+        With "camera" both matrices are decomposed into a broadcast camera
+        (see decompose_camera); its rotation is interpolated along the shortest
+        arc, its focal length geometrically and its position linearly, and the
+        homography is rebuilt. Pans and zooms then stay physically plausible.
+        Rows that cannot be decomposed fall back to the linear blend.
+        
+        Args:
+            matrices1: (N, 3, 3) or (3, 3) first homography matrices
+            matrices2: (N, 3, 3) or (3, 3) second homography matrices
+            t: (N,) interpolation factors (clipped to 0.0 - 1.0)
+            method: "linear" or "camera" (defaults to the calculator's interpolation)
+            
+        Returns:
+            (N, 3, 3) interpolated homography matrices
+        """
+        method = method or self.interpolation
+        
         # Ensure t is between 0 and 1
-        t = max(0.0, min(1.0, t))
+        t = np.clip(np.atleast_1d(np.asarray(t, dtype=np.float64)), 0.0, 1.0)
+        matrices1 = np.broadcast_to(np.asarray(matrices1, dtype=np.float64), (len(t), 3, 3))
+        matrices2 = np.broadcast_to(np.asarray(matrices2, dtype=np.float64), (len(t), 3, 3))
+        weights = t[:, np.newaxis, np.newaxis]
         
         # Linear interpolation of matrix elements
-        interpolated = (1 - t) * matrix1 + t * matrix2
+        interpolated = (1 - weights) * matrices1 + weights * matrices2
         
-        # Normalize the matrix to ensure it's a valid homography
-        interpolated = interpolated / interpolated[2, 2]
+        # Normalize each matrix to ensure it's a valid homography
+        interpolated = interpolated / interpolated[:, 2:3, 2:3]
+        if method == "linear":
+            return interpolated
         
+        # Interpolate the camera parameters and rebuild the homographies
+        focal1, rotation1, position1, ok1 = self.decompose_camera(matrices1)
+        focal2, rotation2, position2, ok2 = self.decompose_camera(matrices2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative = rotation_log(np.transpose(rotation1, (0, 2, 1)) @ rotation2)
+            rotation = rotation1 @ rotation_exp(relative * t[:, np.newaxis])
+            focal = np.exp((1 - t) * np.log(focal1) + t * np.log(focal2))
+            position = (1 - t)[:, np.newaxis] * position1 + t[:, np.newaxis] * position2
+            rebuilt = self.compose_camera(focal, rotation, position)
+        
+        usable = ok1 & ok2 & np.all(np.isfinite(rebuilt), axis=(1, 2))
+        interpolated[usable] = rebuilt[usable]
         return interpolated
+    
+    def decompose_camera(self, matrices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Recover the broadcast camera behind frame-to-rink homographies.
+        
+        Assumes square pixels, the principal point at the frame center and
+        rink coordinates with the same scale along x and y. The focal length
+        follows from the orthonormality of the rotation's first two columns.
+        
+        Args:
+            matrices: (N, 3, 3) homographies from frame pixels to rink coordinates
+            
+        Returns:
+            (focal, rotation, position, ok): (N,) focal lengths in pixels,
+            (N, 3, 3) world-to-camera rotations, (N, 3) camera positions in
+            rink units, and an (N,) mask of matrices that could be decomposed
+        """
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            # Rink plane -> centered image coordinates
+            to_centered = np.array([
+                [1.0, 0.0, -self.broadcast_width / 2],
+                [0.0, 1.0, -self.broadcast_height / 2],
+                [0.0, 0.0, 1.0]
+            ])
+            finite = np.all(np.isfinite(matrices), axis=(1, 2)) & (np.abs(np.linalg.det(matrices)) > 0)
+            plane_to_image = np.full_like(matrices, np.nan)
+            plane_to_image[finite] = to_centered @ np.linalg.inv(matrices[finite])
+            b1, b2 = plane_to_image[:, :, 0], plane_to_image[:, :, 1]
+            
+            # r1 . r2 = 0 and |r1| = |r2| are linear in w = 1 / focal^2
+            a_dot = b1[:, 0] * b2[:, 0] + b1[:, 1] * b2[:, 1]
+            c_dot = b1[:, 2] * b2[:, 2]
+            a_norm = b1[:, 0] ** 2 + b1[:, 1] ** 2 - b2[:, 0] ** 2 - b2[:, 1] ** 2
+            c_norm = b1[:, 2] ** 2 - b2[:, 2] ** 2
+            w = -(a_dot * c_dot + a_norm * c_norm) / (a_dot ** 2 + a_norm ** 2)
+            ok = finite & np.isfinite(w) & (w > 0)
+            focal = 1.0 / np.sqrt(np.where(ok, w, np.nan))
+            
+            # [r1 r2 t] up to scale, with the rink in front of the camera
+            extrinsics = plane_to_image / np.stack([focal, focal, np.ones_like(focal)], axis=1)[:, :, np.newaxis]
+            scale = 0.5 * (np.linalg.norm(extrinsics[:, :, 0], axis=1) + np.linalg.norm(extrinsics[:, :, 1], axis=1))
+            extrinsics = extrinsics / (scale * np.where(extrinsics[:, 2, 2] < 0, -1.0, 1.0))[:, np.newaxis, np.newaxis]
+            
+            r1, r2, translation = extrinsics[:, :, 0], extrinsics[:, :, 1], extrinsics[:, :, 2]
+            rotation = np.stack([r1, r2, np.cross(r1, r2)], axis=2)
+            rotation[~ok] = np.eye(3)
+            # Snap to the nearest proper rotation
+            u, _, vt = np.linalg.svd(rotation)
+            rotation = u @ vt
+            position = -np.einsum("nji,nj->ni", rotation, translation)
+        
+        return focal, rotation, position, ok & np.all(np.isfinite(position), axis=1)
+    
+    def compose_camera(self, focal: np.ndarray, rotation: np.ndarray, position: np.ndarray) -> np.ndarray:
+        """
+        Build frame-to-rink homographies from camera parameters (inverse of decompose_camera).
+        
+        Args:
+            focal: (N,) focal lengths in pixels
+            rotation: (N, 3, 3) world-to-camera rotations
+            position: (N, 3) camera positions in rink units
+            
+        Returns:
+            (N, 3, 3) homographies from frame pixels to rink coordinates
+        """
+        translation = -np.einsum("nij,nj->ni", rotation, position)
+        intrinsics = np.zeros((len(focal), 3, 3))
+        intrinsics[:, 0, 0] = focal
+        intrinsics[:, 1, 1] = focal
+        intrinsics[:, 0, 2] = self.broadcast_width / 2
+        intrinsics[:, 1, 2] = self.broadcast_height / 2
+        intrinsics[:, 2, 2] = 1.0
+        plane_to_image = intrinsics @ np.stack([rotation[:, :, 0], rotation[:, :, 1], translation], axis=2)
+        
+        matrices = np.full_like(plane_to_image, np.nan)
+        invertible = np.all(np.isfinite(plane_to_image), axis=(1, 2)) & (np.abs(np.linalg.det(plane_to_image)) > 0)
+        matrices[invertible] = np.linalg.inv(plane_to_image[invertible])
+        return matrices / matrices[:, 2:3, 2:3]
+
+    def propagate_homography(self, keyframe_matrix: np.ndarray, frame_to_keyframe: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Carry a keyframe's homography forward to a later frame.
+        
+        Composes the keyframe's broadcast-to-rink matrix with the tracked
+        transform from the current frame to the keyframe, so no segmentation
+        is needed for the current frame.
+        
+        Args:
+            keyframe_matrix: 3x3 homography measured on the keyframe
+            frame_to_keyframe: 3x3 transform from current frame pixels to keyframe pixels
+            
+        Returns:
+            3x3 homography for the current frame, or None if the composed
+            matrix fails validation
+        """
+        homography_matrix = np.asarray(keyframe_matrix, dtype=np.float64) @ np.asarray(frame_to_keyframe, dtype=np.float64)
+        homography_matrix = homography_matrix / homography_matrix[2, 2]
+        if not self.validate_homography(homography_matrix):
+            return None
+        return homography_matrix
 
     def get_homography_matrix(self, frame_idx: int) -> Optional[np.ndarray]:
         """
@@ -935,54 +1422,35 @@ class HomographyCalculator:
             return self.homography_cache[frame_idx]
         
         # Find the closest valid matrices before and after this frame
-        valid_indices = sorted(self.homography_cache.keys())
-        if not valid_indices:
+        if len(self.homography_cache) == 0:
             self.logger.warning("No valid homography matrices in cache for interpolation")
             return None
             
-        # Find the closest indices before and after
-        before_idx = None
-        after_idx = None
-        
-        # Find closest before index
-        before_indices = [idx for idx in valid_indices if idx <= frame_idx]
-        if before_indices:
-            before_idx = max(before_indices)
-        
-        # Find closest after index
-        after_indices = [idx for idx in valid_indices if idx > frame_idx]
-        if after_indices:
-            after_idx = min(after_indices)
+        # Find the closest measured indices before and after (bisect on the sorted index)
+        anchors = self.homography_cache.neighbors(frame_idx)
+        before_idx, after_idx = anchors
         
         # Log what we found
         self.logger.info(f"Looking for homography for frame {frame_idx}")
         self.logger.info(f"Found before_idx={before_idx}, after_idx={after_idx}")
         
-        # Get destination points for this frame (which will be interpolated if needed)
-        # This line is commented out because we don't actually use dest_points
-        # but we keep it for debugging purposes
-        # dest_points = self.get_destination_points(frame_idx)
+        # Reuse a matrix derived earlier from the same measured neighbours
+        derived_matrix = self.homography_cache.get_derived(frame_idx, anchors)
+        if derived_matrix is not None:
+            return derived_matrix
         
         # If we have both before and after matrices, interpolate
         if before_idx is not None and after_idx is not None:
             matrix1 = self.homography_cache[before_idx]
             matrix2 = self.homography_cache[after_idx]
             
-            # Check for division by zero
-            frame_diff = after_idx - before_idx
-            if frame_diff == 0:
-                self.logger.warning("Before and after indices are the same, using before matrix")
-                interpolated = matrix1
-            else:
-                # Calculate true interpolation factor
-                t = (frame_idx - before_idx) / frame_diff
-                self.logger.info(f"TRUE INTERPOLATION: t={t:.3f} between frames {before_idx} and {after_idx}")
-                
-                # Interpolate and cache the result
-                interpolated = self.interpolate_homography(matrix1, matrix2, t)
+            # Calculate true interpolation factor
+            t = (frame_idx - before_idx) / (after_idx - before_idx)
+            self.logger.info(f"TRUE INTERPOLATION: t={t:.3f} between frames {before_idx} and {after_idx}")
             
-            # Store the interpolated matrix in the cache
-            self.homography_cache[frame_idx] = interpolated
+            # Interpolate and memoize the result apart from the measured matrices
+            interpolated = self.interpolate_homography(matrix1, matrix2, t)
+            self.homography_cache.set_derived(frame_idx, anchors, interpolated)
             self.logger.info(f"Stored interpolated homography matrix for frame {frame_idx}")
             return interpolated
         
@@ -990,21 +1458,19 @@ class HomographyCalculator:
         elif before_idx is not None:
             self.logger.info(f"Using before matrix from frame {before_idx} for frame {frame_idx}")
             before_matrix = self.homography_cache[before_idx]
-            # Store it in the cache for this frame as well
-            self.homography_cache[frame_idx] = before_matrix
+            self.homography_cache.set_derived(frame_idx, anchors, before_matrix)
             return before_matrix
         
         # If we only have a matrix after this frame, use it
         elif after_idx is not None:
             self.logger.info(f"Using after matrix from frame {after_idx} for frame {frame_idx}")
             after_matrix = self.homography_cache[after_idx]
-            # Store it in the cache for this frame as well
-            self.homography_cache[frame_idx] = after_matrix
+            self.homography_cache.set_derived(frame_idx, anchors, after_matrix)
             return after_matrix
         
         self.logger.warning(f"No suitable homography matrix found for frame {frame_idx}")
         return None
-        
+    
     def warp_frame(self, frame: np.ndarray, homography_matrix: np.ndarray, rink_dims: Tuple[int, int]) -> np.ndarray:
         """
         Warp the broadcast frame to the rink perspective using the homography matrix.
@@ -1280,6 +1746,90 @@ class HomographyCalculator:
         
         return vis_frame
 
+    def project_points_to_rink(
+        self,
+        points: np.ndarray,
+        homography_matrix: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Project many points from broadcast coordinates to rink coordinates at once.
+        
+        Pass a single (3, 3) matrix to project every point of one frame, or an
+        (N, 3, 3) stack with one matrix per point to project the points of many
+        frames (each with its own homography) in one call.
+        
+        Args:
+            points: (N, 2) array of (x, y) coordinates in broadcast frames
+            homography_matrix: (3, 3) matrix, or (N, 3, 3) per-point matrices
+            
+        Returns:
+            Tuple of (rink_points, pixel_points, valid):
+            rink_points (N, 2) float array of projected coordinates,
+            pixel_points (N, 2) int array of rink pixel coordinates,
+            valid (N,) bool array marking points inside the rink bounds
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        homography_matrix = np.asarray(homography_matrix, dtype=np.float64)
+        
+        # Convert points to homogeneous coordinates
+        homogeneous = np.concatenate([points, np.ones((len(points), 1))], axis=1)
+        
+        # Project with either one shared matrix or one matrix per point
+        if homography_matrix.ndim == 2:
+            projected = homogeneous @ homography_matrix.T
+        else:
+            projected = np.einsum("nij,nj->ni", homography_matrix, homogeneous)
+        
+        # Convert back from homogeneous coordinates
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rink_points = projected[:, :2] / projected[:, 2:3]
+        
+        # Check if points are within rink bounds with margin
+        margin = 0.2  # 20% margin
+        min_x = -self.rink_width * margin
+        max_x = self.rink_width * (1 + margin)
+        min_y = -self.rink_height * margin
+        max_y = self.rink_height * (1 + margin)
+        
+        x = rink_points[:, 0]
+        y = rink_points[:, 1]
+        valid = (min_x <= x) & (x <= max_x) & (min_y <= y) & (y <= max_y)
+        
+        # Convert to pixel coordinates (0 to rink_width/height)
+        pixel_points = np.zeros((len(points), 2), dtype=np.int64)
+        pixel_points[valid, 0] = ((x[valid] + self.rink_width * margin) * self.rink_width / (max_x - min_x)).astype(np.int64)
+        pixel_points[valid, 1] = ((y[valid] + self.rink_height * margin) * self.rink_height / (max_y - min_y)).astype(np.int64)
+        
+        num_outside = int(len(points) - np.count_nonzero(valid))
+        if num_outside:
+            self.logger.warning(f"{num_outside} of {len(points)} projected points are outside rink bounds")
+        
+        return rink_points, pixel_points, valid
+    
+    def rink_positions_from_projection(
+        self,
+        rink_points: np.ndarray,
+        pixel_points: np.ndarray,
+        valid: np.ndarray
+    ) -> List[Optional[Dict[str, float]]]:
+        """
+        Convert the arrays returned by project_points_to_rink into the
+        per-point dictionaries returned by project_point_to_rink.
+        
+        Args:
+            rink_points: (N, 2) projected coordinates
+            pixel_points: (N, 2) rink pixel coordinates
+            valid: (N,) mask of points inside the rink bounds
+            
+        Returns:
+            List with a position dictionary per point, or None for points
+            outside the rink bounds
+        """
+        return [
+            {"x": rink[0], "y": rink[1], "pixel_x": pixel[0], "pixel_y": pixel[1]} if ok else None
+            for rink, pixel, ok in zip(rink_points.tolist(), pixel_points.tolist(), valid.tolist())
+        ]
+    
     def project_point_to_rink(
         self, 
         point: Tuple[float, float], 
@@ -1296,41 +1846,10 @@ class HomographyCalculator:
             Dictionary with x, y coordinates in rink space if successful, None otherwise
         """
         try:
-            # Convert homography matrix to numpy array if it's a list
-            if isinstance(homography_matrix, list):
-                homography_matrix = np.array(homography_matrix, dtype=np.float32)
-            
-            # Convert point to homogeneous coordinates
-            pt = np.array([[point[0], point[1], 1]], dtype=np.float32)
-            
-            # Project point using homography matrix
-            projected = homography_matrix.dot(pt.T)
-            
-            # Convert back from homogeneous coordinates
-            x = float(projected[0] / projected[2])
-            y = float(projected[1] / projected[2])
-            
-            # Check if point is within rink bounds with margin
-            margin = 0.2  # 20% margin
-            min_x = -self.rink_width * margin
-            max_x = self.rink_width * (1 + margin)
-            min_y = -self.rink_height * margin
-            max_y = self.rink_height * (1 + margin)
-            
-            if min_x <= x <= max_x and min_y <= y <= max_y:
-                # Convert to pixel coordinates (0 to rink_width/height)
-                pixel_x = int((x + self.rink_width * margin) * self.rink_width / (max_x - min_x))
-                pixel_y = int((y + self.rink_height * margin) * self.rink_height / (max_y - min_y))
-                
-                return {
-                    "x": x,
-                    "y": y,
-                    "pixel_x": pixel_x,
-                    "pixel_y": pixel_y
-                }
-            else:
-                self.logger.warning(f"Projected point ({x}, {y}) is outside rink bounds")
-                return None
+            projection = self.project_points_to_rink(
+                np.array([point], dtype=np.float64), homography_matrix
+            )
+            return self.rink_positions_from_projection(*projection)[0]
                 
         except Exception as e:
             self.logger.error(f"Error projecting point: {str(e)}")
@@ -0,0 +1,267 @@
+import numpy as np
+from collections import deque
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+
+def homography_from_points(source_points: np.ndarray, dest_points: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Solve the homography mapping four source points exactly onto four destination points.
+
+    Args:
+        source_points: (4, 2) points
+        dest_points: (4, 2) points
+
+    Returns:
+        3x3 homography matrix, or None if the points are degenerate
+    """
+    A = np.zeros((8, 8))
+    b = dest_points.reshape(-1)
+    x, y = source_points[:, 0], source_points[:, 1]
+    u, v = dest_points[:, 0], dest_points[:, 1]
+    A[0::2, 0], A[0::2, 1], A[0::2, 2] = x, y, 1.0
+    A[0::2, 6], A[0::2, 7] = -x * u, -y * u
+    A[1::2, 3], A[1::2, 4], A[1::2, 5] = x, y, 1.0
+    A[1::2, 6], A[1::2, 7] = -x * v, -y * v
+    try:
+        h = np.linalg.solve(A, b)
+    except np.linalg.LinAlgError:
+        return None
+    return np.append(h, 1.0).reshape(3, 3)
+
+
+class HomographySmoother:
+    """
+    Online Kalman filter that removes frame-to-frame jitter from homographies.
+
+    Each frame-to-rink homography is represented by where four fixed rink
+    reference points appear in the frame. Every image coordinate follows a
+    constant-velocity model, and all coordinates share one 2x2 covariance,
+    so an update costs the same regardless of how many frames were seen.
+    Frame gaps are handled by scaling the process noise with the gap.
+
+    Measurements whose innovation exceeds a chi-square gate are rejected as
+    outliers. After max_rejections rejections in a row the camera is assumed
+    to have cut, and the filter restarts from the latest measurement.
+
+    update() gives causal (live) estimates. smooth() runs the same filter with
+    a Rauch-Tung-Striebel pass over the last lag frames, so each estimate also
+    uses the lag frames after it. That still costs O(lag) per frame.
+    """
+
+    def __init__(
+        self,
+        reference_points: np.ndarray,
+        measurement_noise: float = 2.0,
+        process_noise: float = 2.0,
+        gate: float = 26.1,
+        max_rejections: int = 5,
+        lag: int = 15
+    ):
+        """
+        Initialize the smoother.
+
+        Args:
+            reference_points: (4, 2) rink points, no three collinear, tracked in the frame
+            measurement_noise: Standard deviation of the measured point positions, in pixels
+            process_noise: Standard deviation of the per-frame change in point velocity, in pixels
+            gate: Chi-square threshold on the normalized innovation (8 degrees of
+                freedom; the default rejects about 1 in 1000 inliers)
+            max_rejections: Consecutive rejections after which the filter restarts
+            lag: Number of later frames each estimate uses in smooth()
+        """
+        self.reference_points = np.asarray(reference_points, dtype=np.float64)
+        self.measurement_variance = measurement_noise ** 2
+        self.process_variance = process_noise ** 2
+        self.gate = gate
+        self.max_rejections = max_rejections
+        self.lag = lag
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the filter state, so the next measurement starts a new track."""
+        self.state = None  # (8, 2): position and velocity of each image coordinate
+        self.covariance = None  # (2, 2) covariance shared by every coordinate
+        self.last_frame = None
+        self.rejections = 0
+
+    def get_state(self) -> Dict:
+        """Get the filter state as a JSON-serializable dict (see set_state)."""
+        return {
+            "state": None if self.state is None else self.state.tolist(),
+            "covariance": None if self.covariance is None else self.covariance.tolist(),
+            "last_frame": self.last_frame,
+            "rejections": self.rejections
+        }
+
+    def set_state(self, state: Dict) -> None:
+        """
+        Restore the filter state saved by get_state.
+
+        Args:
+            state: Dictionary returned by get_state
+        """
+        self.state = None if state["state"] is None else np.array(state["state"], dtype=np.float64)
+        self.covariance = None if state["covariance"] is None else np.array(state["covariance"], dtype=np.float64)
+        self.last_frame = state["last_frame"]
+        self.rejections = state["rejections"]
+
+    def to_points(self, matrix: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Project the reference points into the frame with a frame-to-rink homography.
+
+        Args:
+            matrix: 3x3 homography from frame pixels to rink coordinates
+
+        Returns:
+            (8,) image coordinates, or None if the matrix is singular or the
+            reference points are not all on the same side of the camera
+        """
+        try:
+            inverse = np.linalg.inv(np.asarray(matrix, dtype=np.float64))
+        except np.linalg.LinAlgError:
+            return None
+        projected = np.column_stack([self.reference_points, np.ones(4)]) @ inverse.T
+        if not np.all(np.isfinite(projected)) or np.any(projected[:, 2] * projected[0, 2] <= 0):
+            return None
+        return (projected[:, :2] / projected[:, 2:]).reshape(-1)
+
+    def to_matrix(self, points: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Rebuild the frame-to-rink homography from image coordinates of the reference points.
+
+        Args:
+            points: (8,) image coordinates
+
+        Returns:
+            3x3 homography matrix, or None if the points are degenerate
+        """
+        return homography_from_points(points.reshape(4, 2), self.reference_points)
+
+    def _predict(self, frame_idx: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Predict the state at a frame; returns (state, covariance, transition)."""
+        dt = float(max(1, frame_idx - self.last_frame))
+        transition = np.array([[1.0, dt], [0.0, 1.0]])
+        noise = self.process_variance * np.array([[dt ** 3 / 3, dt ** 2 / 2], [dt ** 2 / 2, dt]])
+        state = self.state @ transition.T
+        covariance = transition @ self.covariance @ transition.T + noise
+        return state, covariance, transition
+
+    def _start(self, frame_idx: int, points: Optional[np.ndarray]) -> bool:
+        """Start a new track at a measurement (with unknown velocity); returns whether it started."""
+        if points is None:
+            return False
+        self.state = np.column_stack([points, np.zeros(8)])
+        self.covariance = np.diag([self.measurement_variance, 100.0 * self.process_variance])
+        self.last_frame = frame_idx
+        self.rejections = 0
+        return True
+
+    def _step(self, frame_idx: int, points: Optional[np.ndarray]) -> Tuple[bool, Optional[Tuple]]:
+        """
+        Advance the filter to a frame.
+
+        Returns:
+            (accepted, record): whether the measurement was used, and for
+            frames after the first of a track the (predicted state, predicted
+            covariance, transition) the RTS pass needs
+        """
+        if self.state is None:
+            return self._start(frame_idx, points), None
+
+        state, covariance, transition = self._predict(frame_idx)
+        accepted = False
+        if points is not None:
+            innovation = points - state[:, 0]
+            innovation_variance = covariance[0, 0] + self.measurement_variance
+            if np.sum(innovation ** 2) / innovation_variance <= self.gate:
+                gain = covariance[:, 0] / innovation_variance
+                self.state = state + np.outer(innovation, gain)
+                self.covariance = covariance - np.outer(gain, covariance[0, :])
+                self.rejections = 0
+                accepted = True
+            else:
+                self.rejections += 1
+
+        if not accepted:
+            self.state, self.covariance = state, covariance
+            if self.rejections >= self.max_rejections:
+                # Consecutive outliers: assume a camera cut and start over
+                self.reset()
+                return self._start(frame_idx, points), None
+        self.last_frame = frame_idx
+        return accepted, (state, covariance, transition)
+
+    def update(self, frame_idx: int, matrix: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Feed the next frame's homography and get the causal estimate.
+
+        Args:
+            frame_idx: Frame index (increasing; gaps are allowed)
+            matrix: Measured frame-to-rink homography, or None if there is none
+
+        Returns:
+            Smoothed homography, or None if the measurement was rejected as an
+            outlier (or there was none)
+        """
+        points = self.to_points(matrix) if matrix is not None else None
+        accepted, _ = self._step(frame_idx, points)
+        if not accepted:
+            return None
+        return self.to_matrix(self.state[:, 0])
+
+    def smooth(
+        self, frames: Iterable[Tuple[int, Optional[np.ndarray]]]
+    ) -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+        """
+        Fixed-lag smoothing over a stream of homographies (for offline use).
+
+        Each frame's estimate is emitted once lag later frames have been
+        seen, or at a track break or the end of the stream.
+
+        Args:
+            frames: (frame_idx, matrix or None) pairs in increasing frame order
+
+        Yields:
+            (frame_idx, smoothed matrix), in input order; the matrix is None
+            for frames whose measurement was missing or rejected as an outlier
+        """
+        self.reset()
+        # (frame_idx, accepted, filtered state, filtered covariance, record)
+        window = deque()
+
+        def emit(count: int) -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+            smoothed = self._rts(window)
+            for _ in range(count):
+                frame_idx, accepted, *_ = window.popleft()
+                points = smoothed.popleft()
+                yield frame_idx, self.to_matrix(points) if accepted else None
+
+        for frame_idx, matrix in frames:
+            points = self.to_points(matrix) if matrix is not None else None
+            accepted, record = self._step(frame_idx, points)
+            if record is None:
+                # New track (or none): flush the previous one
+                yield from emit(len(window))
+                if not accepted:
+                    yield frame_idx, None
+                    continue
+            window.append((frame_idx, accepted, self.state.copy(), self.covariance.copy(), record))
+            if len(window) > self.lag:
+                yield from emit(1)
+        yield from emit(len(window))
+
+    @staticmethod
+    def _rts(window: deque) -> deque:
+        """Rauch-Tung-Striebel backward pass; returns the smoothed (8,) positions in window order."""
+        smoothed = deque()
+        if not window:
+            return smoothed
+        state = window[-1][2]
+        smoothed.appendleft(state[:, 0])
+        for k in range(len(window) - 2, -1, -1):
+            _, _, filtered_state, filtered_covariance, _ = window[k]
+            predicted_state, predicted_covariance, transition = window[k + 1][4]
+            gain = filtered_covariance @ transition.T @ np.linalg.inv(predicted_covariance)
+            state = filtered_state + (state - predicted_state) @ gain.T
+            smoothed.appendleft(state[:, 0])
+        return smoothed
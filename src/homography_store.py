@@ -0,0 +1,292 @@
+import bisect
+import numpy as np
+from collections import OrderedDict
+from enum import IntEnum
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class HomographySource(IntEnum):
+    """
+    Where a frame's homography matrix came from.
+
+    The lower-case names match the "homography_source" labels written to
+    the tracking output.
+    """
+    NONE = 0  # No homography available for the frame
+    ORIGINAL = 1  # Calculated directly from the frame's segmentation
+    FALLBACK = 2  # Taken from the calculator cache, to be interpolated later
+    INTERPOLATED = 3  # Interpolated between two original frames
+    FROM_AFTER = 4  # Copied from the next original frame
+    PROPAGATED = 5  # Keyframe homography carried forward by the estimated camera motion
+
+    @property
+    def label(self) -> str:
+        """Label used for this source in the tracking output."""
+        return self.name.lower()
+
+    @classmethod
+    def from_label(cls, label: Optional[str]) -> "HomographySource":
+        """Look up a source by its output label (None maps to NONE)."""
+        if label is None:
+            return cls.NONE
+        return cls[label.upper()]
+
+
+class HomographyStore:
+    """
+    Compact per-clip store of homography matrices.
+
+    Matrices live in one contiguous (N, 3, 3) float64 array with a parallel
+    array of HomographySource codes, so whole-clip operations (interpolation,
+    validation, export) can work on the arrays directly. Rows are appended
+    in processing order and looked up by frame id.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Initialize an empty store.
+
+        Args:
+            capacity: Number of frames to allocate room for up front; the
+                arrays grow by doubling when full
+        """
+        capacity = max(1, capacity)
+        self._matrices = np.zeros((capacity, 3, 3), dtype=np.float64)
+        self._sources = np.zeros(capacity, dtype=np.uint8)
+        self._frame_ids = np.zeros(capacity, dtype=np.int64)
+        self._rows: Dict[int, int] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, frame_id: int) -> bool:
+        return frame_id in self._rows
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._matrices)
+        self._matrices = np.resize(self._matrices, (capacity, 3, 3))
+        self._sources = np.resize(self._sources, capacity)
+        self._frame_ids = np.resize(self._frame_ids, capacity)
+
+    def set(self, frame_id: int, matrix: Optional[np.ndarray], source: HomographySource) -> None:
+        """
+        Store (or overwrite) the matrix for a frame.
+
+        Args:
+            frame_id: Frame identifier
+            matrix: 3x3 homography matrix, or None if the frame has none
+            source: Where the matrix came from
+        """
+        row = self._rows.get(frame_id)
+        if row is None:
+            if self._size == len(self._matrices):
+                self._grow()
+            row = self._size
+            self._rows[frame_id] = row
+            self._frame_ids[row] = frame_id
+            self._size += 1
+
+        if matrix is None:
+            self._matrices[row] = 0.0
+            self._sources[row] = HomographySource.NONE
+        else:
+            self._matrices[row] = matrix
+            self._sources[row] = source
+
+    def set_many(self, frame_ids: np.ndarray, matrices: np.ndarray, source: HomographySource) -> None:
+        """
+        Store matrices for several frames that share a source.
+
+        Args:
+            frame_ids: (N,) frame identifiers
+            matrices: (N, 3, 3) homography matrices
+            source: Where the matrices came from
+        """
+        for frame_id in frame_ids:
+            frame_id = int(frame_id)
+            if frame_id not in self._rows:
+                self.set(frame_id, None, HomographySource.NONE)
+        rows = self.rows_for(frame_ids)
+        self._matrices[rows] = matrices
+        self._sources[rows] = source
+
+    def get(self, frame_id: int) -> Optional[np.ndarray]:
+        """
+        Get the matrix stored for a frame.
+
+        Args:
+            frame_id: Frame identifier
+
+        Returns:
+            Copy of the 3x3 matrix, or None if the frame has no homography
+        """
+        row = self._rows.get(frame_id)
+        if row is None or self._sources[row] == HomographySource.NONE:
+            return None
+        return self._matrices[row].copy()
+
+    def source(self, frame_id: int) -> HomographySource:
+        """Get the source of a frame's matrix (NONE if the frame is unknown)."""
+        row = self._rows.get(frame_id)
+        if row is None:
+            return HomographySource.NONE
+        return HomographySource(int(self._sources[row]))
+
+    @property
+    def frame_ids(self) -> np.ndarray:
+        """(N,) frame ids in storage order."""
+        return self._frame_ids[:self._size]
+
+    @property
+    def matrices(self) -> np.ndarray:
+        """(N, 3, 3) matrices in storage order (a view, not a copy)."""
+        return self._matrices[:self._size]
+
+    @property
+    def sources(self) -> np.ndarray:
+        """(N,) HomographySource codes in storage order (a view, not a copy)."""
+        return self._sources[:self._size]
+
+    def rows_for(self, frame_ids: np.ndarray) -> np.ndarray:
+        """
+        Map frame ids to storage rows.
+
+        Args:
+            frame_ids: Frame identifiers, all of which must be stored
+
+        Returns:
+            (N,) array of row indices
+        """
+        return np.array([self._rows[int(f)] for f in frame_ids], dtype=np.int64)
+
+    def items(self) -> Iterator[Tuple[int, Optional[np.ndarray], HomographySource]]:
+        """Iterate over (frame_id, matrix or None, source) in storage order."""
+        for row in range(self._size):
+            source = HomographySource(int(self._sources[row]))
+            matrix = None if source == HomographySource.NONE else self._matrices[row].copy()
+            yield int(self._frame_ids[row]), matrix, source
+
+    def clear(self) -> None:
+        """Remove every stored frame, keeping the allocated capacity."""
+        self._rows.clear()
+        self._size = 0
+
+
+class SortedFrameCache:
+    """
+    Frame-indexed cache with sorted keys for nearest-frame lookups.
+
+    Measured entries are kept in a dict plus a sorted key list, so the closest
+    measured frames before and after any frame are found with a bisect and
+    in-order inserts are appends. Derived entries (interpolated or copied from
+    a neighbour) are memoized separately along with the measured frames they
+    were built from. They are never used as anchors for other lookups and are
+    rebuilt once a new measurement lands between their anchors.
+
+    With max_size set, the cache keeps at most that many measured entries
+    (evicting the lowest frame indices first) and at most that many derived
+    entries (evicting the least recently stored first).
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_size: Maximum number of measured (and of derived) entries
+                kept, or None for no limit
+        """
+        self.max_size = max_size
+        self._values: Dict[int, Any] = {}
+        self._keys: List[int] = []
+        self._derived: "OrderedDict[int, Tuple[Tuple[Optional[int], Optional[int]], Any]]" = OrderedDict()
+
+    def __setitem__(self, frame_idx: int, value: Any) -> None:
+        if frame_idx not in self._values:
+            if not self._keys or frame_idx > self._keys[-1]:
+                self._keys.append(frame_idx)
+            else:
+                bisect.insort(self._keys, frame_idx)
+        self._values[frame_idx] = value
+        self._derived.pop(frame_idx, None)
+
+        # Drop the oldest frames once the window is full
+        if self.max_size is not None and len(self._keys) > self.max_size:
+            excess = len(self._keys) - self.max_size
+            for old_idx in self._keys[:excess]:
+                del self._values[old_idx]
+            del self._keys[:excess]
+
+    def __getitem__(self, frame_idx: int) -> Any:
+        return self._values[frame_idx]
+
+    def __contains__(self, frame_idx: int) -> bool:
+        return frame_idx in self._values
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._keys)
+
+    def keys(self) -> List[int]:
+        """Measured frame indices in ascending order."""
+        return list(self._keys)
+
+    def get(self, frame_idx: int, default: Any = None) -> Any:
+        """Get the measured entry for a frame, or default."""
+        return self._values.get(frame_idx, default)
+
+    def neighbors(self, frame_idx: int) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Find the closest measured frames strictly before and after a frame.
+
+        Args:
+            frame_idx: Frame index
+
+        Returns:
+            (before_idx, after_idx), either of which may be None
+        """
+        i = bisect.bisect_left(self._keys, frame_idx)
+        before_idx = self._keys[i - 1] if i > 0 else None
+        j = bisect.bisect_right(self._keys, frame_idx, lo=i)
+        after_idx = self._keys[j] if j < len(self._keys) else None
+        return before_idx, after_idx
+
+    def get_derived(self, frame_idx: int, anchors: Tuple[Optional[int], Optional[int]]) -> Any:
+        """
+        Get a memoized derived entry if it was built from the given anchors.
+
+        Args:
+            frame_idx: Frame index
+            anchors: (before_idx, after_idx) the entry must have been built from
+
+        Returns:
+            The derived entry, or None if missing or built from other anchors
+        """
+        entry = self._derived.get(frame_idx)
+        if entry is None or entry[0] != anchors:
+            return None
+        return entry[1]
+
+    def set_derived(self, frame_idx: int, anchors: Tuple[Optional[int], Optional[int]], value: Any) -> None:
+        """
+        Memoize a derived entry for a frame.
+
+        Args:
+            frame_idx: Frame index
+            anchors: (before_idx, after_idx) the entry was built from
+            value: Derived entry
+        """
+        self._derived[frame_idx] = (anchors, value)
+        self._derived.move_to_end(frame_idx)
+        if self.max_size is not None:
+            while len(self._derived) > self.max_size:
+                self._derived.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all measured and derived entries."""
+        self._values.clear()
+        self._keys.clear()
+        self._derived.clear()
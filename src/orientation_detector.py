@@ -31,13 +31,19 @@ class OrientationDetector:
         self.model = self._load_model()
         
         # Set up image transformation
+        self.input_size = (128, 64)  # (height, width) expected by the model
+        self.mean = [0.485, 0.456, 0.406]
+        self.std = [0.229, 0.224, 0.225]
         self.transform = transforms.Compose([
             transforms.ToPILImage(),
-            transforms.Resize((128, 64)),  # Adjust size based on model requirements
+            transforms.Resize(self.input_size),  # Adjust size based on model requirements
             transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+            transforms.Normalize(mean=self.mean, std=self.std)
         ])
         
+        # Maximum number of crops sent through one forward pass
+        self.max_batch_size = 256
+        
     def _load_model(self) -> Any:
         """
         Load the orientation model.
@@ -187,26 +193,118 @@ class OrientationDetector:
             }
         }
     
+    def preprocess_batch(self, images: List[np.ndarray]) -> torch.Tensor:
+        """
+        Preprocess several player images into a single batch tensor.
+        
+        Args:
+            images: Input images (BGR format), any sizes
+            
+        Returns:
+            Tensor of shape (N, 3, height, width) on the model device
+        """
+        height, width = self.input_size
+        
+        # Resize every crop to the model input size and stack them
+        batch = np.stack([
+            cv2.resize(
+                cv2.cvtColor(image, cv2.COLOR_BGR2RGB),
+                (width, height),
+                interpolation=cv2.INTER_LINEAR
+            )
+            for image in images
+        ])
+        
+        # Normalize the whole batch at once, then convert NHWC -> NCHW
+        batch = batch.astype(np.float32) / 255.0
+        batch = (batch - np.array(self.mean, dtype=np.float32)) / np.array(self.std, dtype=np.float32)
+        tensor = torch.from_numpy(np.ascontiguousarray(batch.transpose(0, 3, 1, 2)))
+        
+        return tensor.to(self.device)
+    
+    def predict_orientations(self, images: List[np.ndarray]) -> List[Dict[str, Any]]:
+        """
+        Predict orientations for several player images with batched forward passes.
+        
+        Args:
+            images: Input images of players (BGR format)
+            
+        Returns:
+            List of orientation dictionaries (same format as predict_orientation),
+            one per input image
+        """
+        results = []
+        
+        for start in range(0, len(images), self.max_batch_size):
+            tensor = self.preprocess_batch(images[start:start + self.max_batch_size])
+            
+            # Run inference
+            with torch.no_grad():
+                output = self.model(tensor)
+            
+            # Map the 8 model classes to our 3 orientation classes for every
+            # crop at once (same grouping as predict_orientation)
+            probs = torch.nn.functional.softmax(output, dim=1)
+            orientation_probs = torch.stack([
+                probs[:, :3].sum(dim=1),
+                probs[:, 3:6].sum(dim=1),
+                probs[:, 6:].sum(dim=1)
+            ], dim=1).cpu().numpy()
+            predicted = orientation_probs.argmax(axis=1)
+            
+            for row, predicted_class in zip(orientation_probs, predicted):
+                results.append({
+                    "orientation": self.orientation_classes[predicted_class],
+                    "confidence": float(row[predicted_class]),
+                    "probabilities": {
+                        self.orientation_classes[i]: float(row[i])
+                        for i in range(len(self.orientation_classes))
+                    }
+                })
+        
+        return results
+    
     def process_player_crops(self, crops: Dict[int, np.ndarray]) -> Dict[int, Dict[str, Any]]:
         """
         Process multiple player crops to determine their orientations.
         
+        All valid crops are classified in a single batched forward pass.
+        
         Args:
             crops: Dictionary mapping detection indices to player crops
             
         Returns:
             Dictionary mapping detection indices to orientation information
         """
-        orientations = {}
+        return self.process_crops_batch([crops])[0]
+    
+    def process_crops_batch(self, crops_per_frame: List[Dict[int, np.ndarray]]) -> List[Dict[int, Dict[str, Any]]]:
+        """
+        Determine orientations for the player crops of several frames at once.
         
-        for idx, crop in crops.items():
-            # Skip invalid crops
-            if crop.size == 0 or crop.shape[0] == 0 or crop.shape[1] == 0:
-                continue
-                
-            # Predict orientation
-            result = self.predict_orientation(crop)
-            orientations[idx] = result
+        Args:
+            crops_per_frame: One dictionary per frame mapping detection indices to player crops
+            
+        Returns:
+            One dictionary per frame mapping detection indices to orientation information
+        """
+        keys = []
+        images = []
+        
+        for frame_pos, crops in enumerate(crops_per_frame):
+            for idx, crop in crops.items():
+                # Skip invalid crops
+                if crop.size == 0 or crop.shape[0] == 0 or crop.shape[1] == 0:
+                    continue
+                keys.append((frame_pos, idx))
+                images.append(crop)
+        
+        orientations = [{} for _ in crops_per_frame]
+        if not images:
+            return orientations
+        
+        for (frame_pos, idx), result in zip(keys, self.predict_orientations(images)):
+            orientations[frame_pos][idx] = result
         
         return orientations
     
@@ -2,10 +2,166 @@ import cv2
 import numpy as np
 import torch
 import os
-from typing import Dict, List, Any
+import queue
+import threading
+from typing import Dict, List, Any, Iterator, Sequence
 from ultralytics import YOLO
 
 
+class DetectionResult(Sequence):
+    """
+    Columnar detections for one frame.
+    
+    Boxes, confidences, class ids and reference points are stored as NumPy
+    arrays so downstream projection and tracking can work on whole frames.
+    Indexing or iterating yields the same detection dictionaries that
+    PlayerDetector has always returned; they are built lazily on first use.
+    """
+
+    def __init__(
+        self,
+        bboxes: np.ndarray,
+        confidences: np.ndarray,
+        class_ids: np.ndarray,
+        class_mapping: Dict[int, str]
+    ):
+        """
+        Initialize the detection result.
+        
+        Args:
+            bboxes: (N, 4) array of x1, y1, x2, y2 boxes
+            confidences: (N,) array of confidence scores
+            class_ids: (N,) array of integer class ids
+            class_mapping: Mapping from class id to class name
+        """
+        self.bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        self.confidences = np.asarray(confidences, dtype=np.float64).reshape(-1)
+        self.class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        self.class_mapping = class_mapping
+        
+        # Reference point (blue dot): center of the box horizontally,
+        # 1/3 of the box height up from the bottom
+        x1, y1, x2, y2 = self.bboxes.T
+        self.reference_points = np.stack(
+            [(x1 + x2) / 2, y2 - (y2 - y1) / 3], axis=1
+        )
+        
+        self._dicts = None
+
+    @classmethod
+    def empty(cls, class_mapping: Dict[int, str]) -> "DetectionResult":
+        """Create a result with no detections."""
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=np.int64), class_mapping)
+
+    @classmethod
+    def concatenate(cls, results: List["DetectionResult"], class_mapping: Dict[int, str]) -> "DetectionResult":
+        """Join several results into one, keeping their order."""
+        if not results:
+            return cls.empty(class_mapping)
+        if len(results) == 1:
+            return results[0]
+        return cls(
+            np.concatenate([r.bboxes for r in results]),
+            np.concatenate([r.confidences for r in results]),
+            np.concatenate([r.class_ids for r in results]),
+            class_mapping
+        )
+
+    @property
+    def class_names(self) -> List[str]:
+        """Class name of every detection."""
+        return [self.class_mapping.get(int(c), "unknown") for c in self.class_ids]
+
+    def to_list(self) -> List[Dict]:
+        """
+        Get the detections as a list of dictionaries.
+        
+        Returns:
+            List of dictionaries containing detection information
+        """
+        if self._dicts is None:
+            pixel_points = self.reference_points.astype(np.int64)
+            self._dicts = [
+                {
+                    "bbox": tuple(bbox),
+                    "confidence": confidence,
+                    "class": class_name,
+                    "reference_point": {
+                        "x": ref[0],
+                        "y": ref[1],
+                        "pixel_x": pixel[0],
+                        "pixel_y": pixel[1]
+                    }
+                }
+                for bbox, confidence, class_name, ref, pixel in zip(
+                    self.bboxes.tolist(),
+                    self.confidences.tolist(),
+                    self.class_names,
+                    self.reference_points.tolist(),
+                    pixel_points.tolist()
+                )
+            ]
+        return self._dicts
+
+    def __len__(self) -> int:
+        return len(self.confidences)
+
+    def __getitem__(self, index):
+        return self.to_list()[index]
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.to_list())
+
+
+class DebugFrameWriter:
+    """
+    Writes detection visualizations to disk on a background thread so JPEG
+    encoding never blocks inference.
+    """
+
+    def __init__(self, frames_dir: str, visualize_fn, max_pending: int = 16):
+        """
+        Initialize the writer and start its worker thread.
+        
+        Args:
+            frames_dir: Directory to write frames to
+            visualize_fn: Function (frame, detections) -> visualization image
+            max_pending: Maximum number of frames waiting to be written; further
+                frames are dropped rather than stalling the caller
+        """
+        self.frames_dir = frames_dir
+        self.visualize_fn = visualize_fn
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="debug-frame-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, frame: np.ndarray, detections: List[Dict], frame_idx: int) -> None:
+        """Queue a frame for writing, dropping it if the writer is behind."""
+        try:
+            self.pending.put_nowait((frame, detections, frame_idx))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            frame, detections, frame_idx = item
+            vis_frame = self.visualize_fn(frame, detections)
+            cv2.imwrite(
+                os.path.join(self.frames_dir, f"frame_{frame_idx:06d}.jpg"),
+                vis_frame
+            )
+
+    def close(self) -> None:
+        """Write all queued frames and stop the worker thread."""
+        if self.thread.is_alive():
+            self.pending.put(None)
+            self.thread.join()
+
+
 class PlayerDetector:
     """
     Detects players and goalies in hockey broadcast footage.
@@ -16,7 +172,9 @@ class PlayerDetector:
         self, 
         model_path: str, 
         device: str = "cuda" if torch.cuda.is_available() else "cpu",
-        output_dir: str = None
+        output_dir: str = None,
+        headless: bool = False,
+        debug_every: int = 0
     ):
         """
         Initialize the player detector.
@@ -25,16 +183,28 @@ class PlayerDetector:
             model_path: Path to the detection model
             device: Device to run inference on ("cuda" or "cpu")
             output_dir: Directory to save processed frames and data
+            headless: Production mode - skip visualization, display and
+                per-frame disk writes and only return detections
+            debug_every: In headless mode, write the visualization of every
+                Nth frame from a background thread (0 disables)
         """
         self.model_path = model_path
         self.device = device
         self.model = self._load_model()
         self.output_dir = output_dir
+        self.headless = headless
+        self.debug_every = debug_every
+        self.debug_writer = None
+        # Show the visualization in a window (OpenCV windows only work from the main thread)
+        self.display = True
         
         if output_dir:
             # Create output directories
             self.frames_dir = os.path.join(output_dir, "processed_frames")
             os.makedirs(self.frames_dir, exist_ok=True)
+            
+            if headless and debug_every > 0:
+                self.debug_writer = DebugFrameWriter(self.frames_dir, self.visualize_detections)
         
         # Define class mapping (adjust based on actual model outputs)
         self.class_mapping = {
@@ -97,7 +267,7 @@ class PlayerDetector:
         
         return tensor
     
-    def process_frame(self, frame: np.ndarray, frame_idx: int = None) -> List[Dict]:
+    def process_frame(self, frame: np.ndarray, frame_idx: int = None) -> DetectionResult:
         """
         Process a frame to detect players and goalies.
         
@@ -106,61 +276,20 @@ class PlayerDetector:
             frame_idx: Index of the current frame
             
         Returns:
-            List of dictionaries containing detection information
+            DetectionResult, which also behaves as a list of dictionaries
+            containing detection information
         """
         try:
             # Run inference with YOLOv8
             results = self.model(frame, verbose=False)
             
             # Process each detection
-            detections = []
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    if box.conf.item() < self.conf_threshold:
-                        continue
-                        
-                    # Get box coordinates (already in x1,y1,x2,y2 format)
-                    x1, y1, x2, y2 = box.xyxy[0].tolist()
-                    
-                    # Get class name and confidence
-                    class_id = int(box.cls.item())
-                    class_name = self.class_mapping.get(class_id, "unknown")
-                    confidence = float(box.conf.item())
-                    
-                    # Calculate reference point (blue dot)
-                    ref_x = (x1 + x2) / 2  # x-coordinate at center of bbox
-                    ref_y = y2 - (y2 - y1) / 3  # y-coordinate at 1/3 from bottom
-                    
-                    # Create detection dictionary
-                    detection = {
-                        "bbox": (x1, y1, x2, y2),
-                        "confidence": confidence,
-                        "class": class_name,
-                        "reference_point": {
-                            "x": float(ref_x),  # Ensure coordinates are float
-                            "y": float(ref_y),
-                            "pixel_x": int(ref_x),  # Add pixel-space coordinates
-                            "pixel_y": int(ref_y)
-                        }
-                    }
-                    
-                    detections.append(detection)
-            
-            # Visualize detections on frame
-            vis_frame = self.visualize_detections(frame, detections)
+            detections = DetectionResult.concatenate(
+                [self._detections_from_result(result) for result in results],
+                self.class_mapping
+            )
             
-            # Save processed frame if output directory is set
-            if self.output_dir and frame_idx is not None:
-                frame_path = os.path.join(
-                    self.frames_dir, 
-                    f"frame_{frame_idx:06d}.jpg"
-                )
-                cv2.imwrite(frame_path, vis_frame)
-            
-            # Display frame
-            cv2.imshow('Player Detection', vis_frame)
-            cv2.waitKey(1)  # 1ms delay to allow window updates
+            self._output_frame(frame, detections, frame_idx)
             
             return detections
                 
@@ -169,8 +298,109 @@ class PlayerDetector:
             print(msg)
             import traceback
             traceback.print_exc()
-            cv2.destroyAllWindows()  # Clean up windows on error
+            if not self.headless and self.display:
+                cv2.destroyAllWindows()  # Clean up windows on error
+            return DetectionResult.empty(self.class_mapping)
+    
+    def process_batch(self, frames: List[np.ndarray], frame_ids: List[int] = None) -> List[DetectionResult]:
+        """
+        Detect players in several frames with a single forward pass.
+        
+        Args:
+            frames: Input frames (BGR format)
+            frame_ids: Indices of the frames, used for saving processed frames
+            
+        Returns:
+            List with one DetectionResult per input frame, in the same
+            format as process_frame
+        """
+        if not frames:
             return []
+        if frame_ids is None:
+            frame_ids = [None] * len(frames)
+        
+        try:
+            # One result per input image, in input order
+            results = self.model(list(frames), verbose=False)
+            
+            batch_detections = []
+            for frame, frame_idx, result in zip(frames, frame_ids, results):
+                detections = self._detections_from_result(result)
+                self._output_frame(frame, detections, frame_idx)
+                batch_detections.append(detections)
+            
+            return batch_detections
+                
+        except Exception as e:
+            msg = f"Error during batched player detection inference: {str(e)}"
+            print(msg)
+            import traceback
+            traceback.print_exc()
+            if not self.headless and self.display:
+                cv2.destroyAllWindows()  # Clean up windows on error
+            return [DetectionResult.empty(self.class_mapping) for _ in frames]
+    
+    def _detections_from_result(self, result: Any) -> DetectionResult:
+        """
+        Convert one ultralytics result into columnar detections.
+        
+        All boxes are moved to the host in a single transfer and filtered
+        and post-processed with array operations.
+        
+        Args:
+            result: Detection result for a single image
+            
+        Returns:
+            DetectionResult holding the detections above the confidence threshold
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return DetectionResult.empty(self.class_mapping)
+        
+        # Columns are x1, y1, x2, y2, [track id,] confidence, class
+        data = boxes.data.cpu().numpy().astype(np.float64)
+        confidences = data[:, -2]
+        keep = confidences >= self.conf_threshold
+        
+        return DetectionResult(
+            bboxes=data[keep, :4],
+            confidences=confidences[keep],
+            class_ids=data[keep, -1].astype(np.int64),
+            class_mapping=self.class_mapping
+        )
+    
+    def _output_frame(self, frame: np.ndarray, detections: List[Dict], frame_idx: int = None) -> None:
+        """
+        Visualize, save and display the detections for a frame.
+        
+        In headless mode nothing is drawn or displayed; only every
+        debug_every-th frame is handed to the background writer.
+        
+        Args:
+            frame: Input frame (BGR format)
+            detections: List of detection dictionaries
+            frame_idx: Index of the current frame
+        """
+        if self.headless:
+            if self.debug_writer is not None and frame_idx is not None and frame_idx % self.debug_every == 0:
+                self.debug_writer.submit(frame, detections, frame_idx)
+            return
+        
+        # Visualize detections on frame
+        vis_frame = self.visualize_detections(frame, detections)
+        
+        # Save processed frame if output directory is set
+        if self.output_dir and frame_idx is not None:
+            frame_path = os.path.join(
+                self.frames_dir, 
+                f"frame_{frame_idx:06d}.jpg"
+            )
+            cv2.imwrite(frame_path, vis_frame)
+        
+        # Display frame
+        if self.display:
+            cv2.imshow('Player Detection', vis_frame)
+            cv2.waitKey(1)  # 1ms delay to allow window updates
     
     def get_player_crops(self, frame: np.ndarray, detections: List[Dict]) -> Dict[int, np.ndarray]:
         """
@@ -248,6 +478,16 @@ class PlayerDetector:
         
         return vis_frame
 
+    def close(self) -> None:
+        """Flush pending debug frames and stop the background writer."""
+        if self.debug_writer is not None:
+            self.debug_writer.close()
+            if self.debug_writer.dropped:
+                print(f"Debug writer dropped {self.debug_writer.dropped} frames")
+            self.debug_writer = None
+
     def __del__(self):
         """Cleanup method to ensure windows are closed"""
+        if getattr(self, "headless", False):
+            return
         cv2.destroyAllWindows()
@@ -2,15 +2,22 @@ import cv2
 import numpy as np
 import os
 import json
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional, Iterable, Iterator
 from datetime import datetime
 import logging
+import itertools
 import time
 
 from segmentation_processor import SegmentationProcessor
 from player_detector import PlayerDetector
 from orientation_detector import OrientationDetector
 from homography_calculator import HomographyCalculator
+from homography_store import HomographyStore, HomographySource
+from frame_pipeline import FramePipeline
+from frame_history import FrameHistory
+from checkpoint import RunCheckpoint
+from tracking_io import FrameRecordWriter, is_jsonl_path
+from camera_motion import CameraMotionGate, HomographyTracker, translation_matrix, warp_features
 from ultralytics import YOLO
 
 
@@ -42,7 +49,22 @@ class PlayerTracker:
         output_dir: str = None,
         segmentation_model_path: Optional[str] = None,
         rink_coordinates_path: Optional[str] = None,
-        device: str = "cuda" if cv2.cuda.getCudaEnabledDeviceCount() > 0 else "cpu"
+        device: str = "cuda" if cv2.cuda.getCudaEnabledDeviceCount() > 0 else "cpu",
+        detect_facing: bool = False,
+        headless: bool = False,
+        debug_every: int = 0,
+        history_size: Optional[int] = None,
+        history_spill_path: Optional[str] = None,
+        mask_scale: Optional[Any] = None,
+        motion_gate: Optional[float] = None,
+        keyframe_interval: int = 30,
+        track_homography: bool = False,
+        drift_bound: float = 3.0,
+        extraction_workers: int = 0,
+        homography_solver: str = "ransac",
+        homography_interpolation: str = "linear",
+        homography_smoothing: Optional[str] = None,
+        smoothing_lag: int = 15
     ):
         """
         Initialize the player tracker.
@@ -54,8 +76,44 @@ class PlayerTracker:
             segmentation_model_path: Optional path to segmentation model
             rink_coordinates_path: Optional path to rink coordinates JSON
             device: Device to run inference on ("cuda" or "cpu")
+            detect_facing: Classify which way each detected player is facing
+                with the orientation model (stored as "facing" per player)
+            headless: Run the detector without visualization, display or
+                per-frame disk writes
+            debug_every: In headless mode, save every Nth detection
+                visualization from a background thread (0 disables)
+            history_size: Number of most recent frames kept in memory in the
+                tracking history and homography caches (None keeps every frame)
+            history_spill_path: JSON Lines file that frames evicted from the
+                tracking history are appended to; if None they are dropped
+            mask_scale: Resolution segmentation masks are processed at (None
+                for full frame size, "native" for the model's mask size, or a
+                fraction of the frame size)
+            motion_gate: If set, skip segmentation while the camera moves less
+                than this many pixels per frame, reusing the last keyframe's
+                features and homography shifted by the estimated motion
+            keyframe_interval: With motion_gate or track_homography, run
+                segmentation at least every this many frames
+            track_homography: Skip segmentation between keyframes by tracking
+                features frame to frame and composing the tracked motion with
+                the keyframe's homography (takes precedence over motion_gate)
+            drift_bound: With track_homography, accumulated tracking error in
+                pixels after which segmentation runs again
+            extraction_workers: Number of threads extracting lines and circles
+                from the segmentation masks in parallel (0 for sequential)
+            homography_solver: "ransac", or "dlt" to try a weighted
+                least-squares fit first and use RANSAC only for outliers
+            homography_interpolation: "linear", or "camera" to fill gaps
+                between homographies by interpolating the camera's pan, tilt
+                and zoom
+            homography_smoothing: None, "causal" to filter jitter out of each
+                homography as it is calculated, or "fixed_lag" to filter the
+                clip's homographies in the second pass (before interpolation)
+            smoothing_lag: With "fixed_lag", number of later frames each
+                smoothed homography also uses
         """
         self.device = device
+        self.detect_facing = detect_facing
         
         # Initialize output directory
         self.output_dir = output_dir
@@ -66,25 +124,130 @@ class PlayerTracker:
         self.player_detector = PlayerDetector(
             model_path=detection_model_path, 
             device=device,
-            output_dir=output_dir
+            output_dir=output_dir,
+            headless=headless,
+            debug_every=debug_every
         )
         self.orientation_detector = OrientationDetector(orientation_model_path, device)
         
         # Initialize optional components
         self.segmentation_processor = None
         if segmentation_model_path:
-            self.segmentation_processor = SegmentationProcessor(segmentation_model_path, device)
+            # The tracker only uses the extracted geometry, so skip building masks
+            self.segmentation_processor = SegmentationProcessor(
+                segmentation_model_path, device, mask_output="features", mask_scale=mask_scale,
+                extraction_workers=extraction_workers
+            )
             
         self.homography_calculator = None
         if rink_coordinates_path:
-            self.homography_calculator = HomographyCalculator(rink_coordinates_path)
+            self.homography_calculator = HomographyCalculator(
+                rink_coordinates_path,
+                cache_size=history_size,
+                solver=homography_solver,
+                interpolation=homography_interpolation,
+                smoothing=homography_smoothing,
+                smoothing_lag=smoothing_lag
+            )
+        
+        # Camera-motion gate deciding when segmentation can be reused
+        self.motion_gate = None
+        if self.segmentation_processor:
+            if track_homography:
+                self.motion_gate = HomographyTracker(drift_bound=drift_bound, keyframe_interval=keyframe_interval)
+            elif motion_gate is not None:
+                self.motion_gate = CameraMotionGate(max_motion=motion_gate, keyframe_interval=keyframe_interval)
+        self._segmentation_keyframe = None  # (frame_id, segmentation result) of the last keyframe
+        
+        # Initialize tracking data (bounded to history_size frames if set)
+        self.tracking_data = FrameHistory(
+            max_frames=history_size,
+            spill_path=history_spill_path,
+            serialize_fn=self.serializable_frame,
+            json_encoder=NumpyEncoder
+        )
+        
+        # Per-clip homography matrices, kept as arrays until serialization
+        self.homography_store = HomographyStore()
+        
+        # Last frames before a resumed checkpoint, for the first resumed frame's metrics
+        self._resumed_history: Dict[int, Dict] = {}
         
-        # Initialize tracking data
-        self.tracking_data = {}
+        # Whether no frame after the last one returned has started processing,
+        # i.e. whether checkpoint_state currently matches that frame
+        self.drained = True
         
         # Initialize logger
         self.logger = logging.getLogger(__name__)
         
+    def close(self) -> None:
+        """
+        Release background resources (flushes pending debug frames, stops
+        feature extraction threads and closes the tracking history spill file).
+        """
+        if self.player_detector:
+            self.player_detector.close()
+        if self.segmentation_processor:
+            self.segmentation_processor.close()
+        self.tracking_data.close()
+    
+    def checkpoint_state(self) -> Dict:
+        """
+        Snapshot the tracker state a resumed run needs to continue seamlessly.
+        
+        Covers the last frame of the tracking history (metrics look one frame
+        back), the homography calculator state and the faceoff circle tracker.
+        Player IDs are derived from frame ids and need no state.
+        
+        Only call this while self.drained is True: with batched or pipelined
+        processing, later frames may otherwise already have changed the state
+        (and pipeline threads may still be changing it).
+        
+        Returns:
+            JSON-serializable (with NumpyEncoder) state dictionary
+        """
+        return {
+            "history": [
+                [frame_id, {"frame_id": frame_id, "players": frame_data.get("players", [])}]
+                for frame_id, frame_data in self.tracking_data.tail(1)
+            ],
+            "homography": self.homography_calculator.get_state() if self.homography_calculator else None,
+            "circles": (
+                self.segmentation_processor.circle_tracker.get_state() if self.segmentation_processor else None
+            )
+        }
+    
+    def restore_checkpoint_state(self, state: Dict, frame_results: Iterable[Dict] = ()) -> None:
+        """
+        Restore a snapshot taken by checkpoint_state.
+        
+        The camera motion gate starts over, so the first resumed frame is
+        segmented as a new keyframe.
+        
+        Args:
+            state: Dictionary returned by checkpoint_state
+            frame_results: Frame results completed before the snapshot (with
+                "frame_idx"), used to refill the per-clip homography store
+        """
+        self._resumed_history = {frame_id: frame_data for frame_id, frame_data in state["history"]}
+        if self.homography_calculator and state["homography"] is not None:
+            self.homography_calculator.set_state(state["homography"])
+        if self.segmentation_processor and state["circles"] is not None:
+            self.segmentation_processor.circle_tracker.set_state(state["circles"])
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        self._segmentation_keyframe = None
+        
+        for frame_data in frame_results:
+            if frame_data.get("homography_success", False) and frame_data.get("homography_matrix") is not None:
+                source = HomographySource.from_label(frame_data.get("homography_source"))
+                if source == HomographySource.NONE:
+                    interpolated = frame_data.get("homography_interpolated", False)
+                    source = HomographySource.FALLBACK if interpolated else HomographySource.ORIGINAL
+                self.homography_store.set(frame_data["frame_idx"], np.asarray(frame_data["homography_matrix"]), source)
+            else:
+                self.homography_store.set(frame_data["frame_idx"], None, HomographySource.NONE)
+        
     def calculate_player_metrics(self, current_player: Dict, frame_id: int, prev_frame_data: Optional[Dict] = None) -> Dict:
         """
         Calculate metrics for a player based on current and previous positions.
@@ -145,6 +308,9 @@ class PlayerTracker:
         """
         Process a single frame to track players.
         
+        Runs the same stages as the pipelined executor (see FramePipeline),
+        one after another on the calling thread.
+        
         Args:
             frame: Input frame (BGR format)
             frame_id: Frame identifier
@@ -153,87 +319,420 @@ class PlayerTracker:
         Returns:
             Dictionary containing processed data for the frame
         """
-        frame_height, frame_width = frame.shape[:2]
-        frame_data = {
+        frame_data = self.create_frame_data(frame_id)
+        
+        # Step 1: Process through segmentation model if available
+        segmentation_result = self.run_segmentation_stage(frame, frame_id, frame_data)
+        
+        # Calculate homography if we have a homography calculator
+        self.run_homography_stage(segmentation_result, frame_id, frame_data)
+        
+        # Step 2: Detect players
+        detections = self.run_detection_stage(frame, frame_id)
+        orientations = self.run_orientation_stage([frame], [detections])[0]
+        
+        # Step 3: Process each detection and store the frame
+        return self.run_metrics_stage(detections, frame_id, frame_data, orientations)
+    
+    def create_frame_data(self, frame_id: int) -> Dict:
+        """
+        Create the empty per-frame record filled in by the processing stages.
+        
+        Args:
+            frame_id: Frame identifier
+            
+        Returns:
+            Dictionary with frame id, timestamp and an empty player list
+        """
+        return {
             "frame_id": frame_id,
             "timestamp": datetime.now().isoformat(),
             "players": []
         }
+    
+    def run_segmentation_stage(self, frame: np.ndarray, frame_id: int, frame_data: Dict) -> Optional[Dict]:
+        """
+        Segmentation stage: run the rink segmentation model on a frame.
         
-        # Get previous frame data if available
-        prev_frame_data = self.tracking_data.get(frame_id - 1)
+        Args:
+            frame: Input frame (BGR format)
+            frame_id: Frame identifier
+            frame_data: Frame record to store the segmentation result in
+            
+        Returns:
+            Segmentation result, or None if no segmentation processor is loaded
+        """
+        if not self.segmentation_processor:
+            return None
         
-        # Step 1: Process through segmentation model if available
-        if self.segmentation_processor:
+        # Reuse the keyframe's features while the camera is (nearly) still
+        segmentation_result = self._propagate_segmentation(self._keyframe_transform(frame))
+        if segmentation_result is None:
             segmentation_result = self.segmentation_processor.process_frame(
                 frame, frame_id, self.output_dir
             )
-            frame_data["segmentation_features"] = segmentation_result
+            self._segmentation_keyframe = (frame_id, segmentation_result)
+        else:
+            frame_data["segmentation_propagated"] = True
+        
+        frame_data["segmentation_features"] = segmentation_result
+        return segmentation_result
+    
+    def _keyframe_transform(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Run the motion gate on a frame.
+        
+        Args:
+            frame: Input frame (BGR format)
             
-            # Calculate homography if we have a homography calculator
-            if self.homography_calculator:
-                try:
-                    # Pass the features to the homography calculator
-                    homography_matrix = self.homography_calculator.calculate_homography(
-                        segmentation_result["features"],
-                        frame_id  # Pass frame_id for caching
-                    )
-                    if homography_matrix is not None:
-                        frame_data["homography_matrix"] = homography_matrix.tolist()
-                        frame_data["homography_success"] = True
-                        frame_data["homography_source"] = "original"  # Mark as an original calculation
-                    else:
-                        # Try to get an interpolated matrix
-                        homography_matrix = self.homography_calculator.get_homography_matrix(frame_id)
-                        if homography_matrix is not None:
-                            frame_data["homography_matrix"] = homography_matrix.tolist()
-                            frame_data["homography_success"] = True
-                            frame_data["homography_interpolated"] = True
-                            frame_data["homography_source"] = "fallback"  # Mark as a fallback, to be interpolated later
-                        else:
-                            frame_data["homography_success"] = False
-                except Exception as e:
-                    self.logger.error(f"Error calculating homography: {e}")
-                    frame_data["homography_success"] = False
+        Returns:
+            3x3 transform from this frame's pixels to the last keyframe's
+            pixels if the frame can reuse the keyframe, or None if
+            segmentation has to run (always None without a gate)
+        """
+        if self.motion_gate is None:
+            return None
+        motion = self.motion_gate.update(frame)
+        if motion is None or isinstance(motion, np.ndarray):
+            return motion
+        # The phase-correlation gate reports a shift from the keyframe to this frame
+        return translation_matrix((-motion[0], -motion[1]))
+    
+    def _propagate_segmentation(self, to_keyframe: Optional[np.ndarray]) -> Optional[Dict]:
+        """
+        Build a segmentation result by moving the last keyframe's features.
         
-        # Step 2: Detect players
-        if self.player_detector:
-            detections = self.player_detector.process_frame(frame, frame_id)
-            
-            # Step 3: Process each detection
-            for i, detection in enumerate(detections):
-                player_data = {
-                    "player_id": f"{frame_id}_{i}",  # Temporary ID
-                    "type": detection["class"],
-                    "bbox": detection["bbox"],
-                    "confidence": detection["confidence"],
-                    "reference_point": detection["reference_point"]
-                }
-                
-                # Project player position to rink coordinates if homography available
-                if frame_data.get("homography_success", False):
-                    try:
-                        rink_pos = self.homography_calculator.project_point_to_rink(
-                            (detection["reference_point"]["x"], detection["reference_point"]["y"]),
-                            frame_data["homography_matrix"]
-                        )
-                        if rink_pos:
-                            player_data["rink_position"] = rink_pos
-                            
-                            # Calculate metrics using previous frame data
-                            metrics = self.calculate_player_metrics(player_data, frame_id, prev_frame_data)
-                            player_data.update(metrics)
-                            
-                    except Exception as e:
-                        self.logger.error(f"Error projecting point: {e}")
+        Args:
+            to_keyframe: Transform from this frame to the keyframe, or None
+            
+        Returns:
+            Propagated segmentation result, or None if there is nothing to reuse
+        """
+        if to_keyframe is None or self._segmentation_keyframe is None:
+            if to_keyframe is not None:
+                self.motion_gate.mark_keyframe()
+            return None
+        
+        keyframe_id, keyframe_result = self._segmentation_keyframe
+        return {
+            "segmentation_mask": None,
+            "features": warp_features(keyframe_result.get("features", {}), np.linalg.inv(to_keyframe)),
+            "propagated_from": keyframe_id,
+            "keyframe_transform": to_keyframe
+        }
+    
+    def run_homography_stage(
+        self, segmentation_result: Optional[Dict], frame_id: int, frame_data: Dict,
+        solved: Optional[Dict[int, Optional[np.ndarray]]] = None
+    ) -> None:
+        """
+        Homography stage: solve the broadcast-to-rink homography for a frame.
+        
+        Args:
+            segmentation_result: Output of the segmentation stage (may be None)
+            frame_id: Frame identifier
+            frame_data: Frame record to store the homography in
+            solved: Matrices already solved for some frames by a batched
+                calculate_homographies call (not yet stored in the cache)
+        """
+        if segmentation_result is None or not self.homography_calculator:
+            return
+        
+        # Carry the keyframe's homography forward if the segmentation was propagated from it
+        keyframe_id = segmentation_result.get("propagated_from")
+        homography_matrix = None
+        if keyframe_id is not None and self.homography_store.source(keyframe_id) == HomographySource.ORIGINAL:
+            homography_matrix = self.homography_calculator.propagate_homography(
+                self.homography_store.get(keyframe_id), segmentation_result["keyframe_transform"]
+            )
+        if homography_matrix is not None:
+            self.homography_store.set(frame_id, homography_matrix, HomographySource.PROPAGATED)
+            frame_data["homography_matrix"] = homography_matrix
+            frame_data["homography_success"] = True
+            frame_data["homography_source"] = HomographySource.PROPAGATED.label
+            frame_data["propagated_from"] = keyframe_id
+            return
+        
+        homography_matrix = None
+        source = HomographySource.NONE
+        try:
+            if solved is not None and frame_id in solved:
+                # Store in frame order, so fallbacks only see earlier frames as before
+                homography_matrix = solved[frame_id]
+                if homography_matrix is not None:
+                    homography_matrix = self.homography_calculator.store_homography(frame_id, homography_matrix)
+            else:
+                # Pass the features to the homography calculator
+                homography_matrix = self.homography_calculator.calculate_homography(
+                    segmentation_result["features"],
+                    frame_id,  # Pass frame_id for caching
+                    segmentation_result.get("geometry")
+                )
+            if homography_matrix is not None:
+                source = HomographySource.ORIGINAL  # Mark as an original calculation
+            else:
+                # Try to get an interpolated matrix
+                homography_matrix = self.homography_calculator.get_homography_matrix(frame_id)
+                if homography_matrix is not None:
+                    source = HomographySource.FALLBACK  # Mark as a fallback, to be interpolated later
+                    frame_data["homography_interpolated"] = True
+        except Exception as e:
+            self.logger.error(f"Error calculating homography: {e}")
+            homography_matrix = None
+            source = HomographySource.NONE
+        
+        self.homography_store.set(frame_id, homography_matrix, source)
+        if homography_matrix is not None:
+            # Stays an ndarray; NumpyEncoder converts it when the frame is saved
+            frame_data["homography_matrix"] = self.homography_store.get(frame_id)
+            frame_data["homography_success"] = True
+            frame_data["homography_source"] = source.label
+        else:
+            frame_data["homography_success"] = False
+    
+    def run_detection_stage(self, frame: np.ndarray, frame_id: int) -> List[Dict]:
+        """
+        Detection stage: run the player detector on a frame.
+        
+        Args:
+            frame: Input frame (BGR format)
+            frame_id: Frame identifier
+            
+        Returns:
+            List of detection dictionaries
+        """
+        if not self.player_detector:
+            return []
+        return self.player_detector.process_frame(frame, frame_id)
+    
+    def run_orientation_stage(self, frames: List[np.ndarray], batch_detections: List[List[Dict]]) -> List[Optional[Dict[int, Dict]]]:
+        """
+        Orientation stage: classify which way every detected player is facing.
+        
+        The player crops of all given frames go through the orientation
+        model together.
+        
+        Args:
+            frames: Input frames (BGR format)
+            batch_detections: Detections for each frame
+            
+        Returns:
+            One dictionary per frame mapping detection indices to orientation
+            information, or None per frame if facing detection is disabled
+        """
+        if not self.detect_facing or not self.orientation_detector:
+            return [None] * len(frames)
+        
+        crops_per_frame = [
+            self.player_detector.get_player_crops(frame, detections)
+            for frame, detections in zip(frames, batch_detections)
+        ]
+        return self.orientation_detector.process_crops_batch(crops_per_frame)
+    
+    def run_metrics_stage(self, detections: List[Dict], frame_id: int, frame_data: Dict, orientations: Optional[Dict[int, Dict]] = None) -> Dict:
+        """
+        Metrics stage: project detections to the rink, compute player metrics
+        and store the finished frame in the tracking history.
+        
+        Frames must pass through this stage in order, since metrics are
+        computed against the previous frame's stored data.
+        
+        Args:
+            detections: Output of the detection stage
+            frame_id: Frame identifier
+            frame_data: Frame record filled in by the earlier stages
+            orientations: Optional output of the orientation stage
+            
+        Returns:
+            The completed frame record
+        """
+        # Get previous frame data if available
+        prev_frame_data = self.tracking_data.get(frame_id - 1) or self._resumed_history.get(frame_id - 1)
+        
+        # Project every player position to rink coordinates in one call if homography available
+        rink_positions = [None] * len(detections)
+        if frame_data.get("homography_success", False) and len(detections) > 0:
+            try:
+                projection = self.homography_calculator.project_points_to_rink(
+                    detections.reference_points,
+                    frame_data["homography_matrix"]
+                )
+                rink_positions = self.homography_calculator.rink_positions_from_projection(*projection)
+            except Exception as e:
+                self.logger.error(f"Error projecting points: {e}")
+        
+        for i, detection in enumerate(detections):
+            player_data = {
+                "player_id": f"{frame_id}_{i}",  # Temporary ID
+                "type": detection["class"],
+                "bbox": detection["bbox"],
+                "confidence": detection["confidence"],
+                "reference_point": detection["reference_point"]
+            }
+            
+            if orientations and i in orientations:
+                player_data["facing"] = orientations[i]["orientation"]
+                player_data["facing_confidence"] = orientations[i]["confidence"]
+            
+            # Use the rink position projected for this player, if any
+            rink_pos = rink_positions[i]
+            if rink_pos:
+                player_data["rink_position"] = rink_pos
                 
-                frame_data["players"].append(player_data)
+                try:
+                    # Calculate metrics using previous frame data
+                    metrics = self.calculate_player_metrics(player_data, frame_id, prev_frame_data)
+                    player_data.update(metrics)
+                except Exception as e:
+                    self.logger.error(f"Error projecting point: {e}")
+            
+            frame_data["players"].append(player_data)
         
         # Store frame data for next frame's calculations
         self.tracking_data[frame_id] = frame_data
         
         return frame_data
     
+    def process_batch(self, frames: List[np.ndarray], frame_ids: List[int]) -> List[Dict]:
+        """
+        Process several frames, batching segmentation and detection inference.
+
+        Segmentation and detection each run one forward pass for the whole
+        batch; homography and metrics then run per frame in order, so the
+        output matches calling process_frame on each frame in turn.
+
+        Args:
+            frames: Input frames (BGR format)
+            frame_ids: Frame identifiers, one per frame
+
+        Returns:
+            List of frame data dictionaries, one per input frame
+        """
+        frames_data = [self.create_frame_data(frame_id) for frame_id in frame_ids]
+
+        # Step 1: Batched segmentation of the keyframes, then homography frame by frame
+        segmentation_results = [None] * len(frames)
+        if self.segmentation_processor:
+            transforms = [self._keyframe_transform(frame) for frame in frames]
+            keyframes = [i for i, transform in enumerate(transforms) if transform is None]
+            keyframe_results = dict(zip(keyframes, self.segmentation_processor.process_batch(
+                [frames[i] for i in keyframes], [frame_ids[i] for i in keyframes], self.output_dir
+            )))
+            
+            # Fill in propagated frames in order, each from the latest keyframe
+            for i, (frame_id, frame_data) in enumerate(zip(frame_ids, frames_data)):
+                if i in keyframe_results:
+                    segmentation_results[i] = keyframe_results[i]
+                    self._segmentation_keyframe = (frame_id, keyframe_results[i])
+                    continue
+                segmentation_results[i] = self._propagate_segmentation(transforms[i])
+                if segmentation_results[i] is None:
+                    segmentation_results[i] = self.segmentation_processor.process_frame(
+                        frames[i], frame_id, self.output_dir
+                    )
+                    self._segmentation_keyframe = (frame_id, segmentation_results[i])
+                else:
+                    frame_data["segmentation_propagated"] = True
+
+        # Solve all measured (non-propagated) frames of the batch at once
+        solved = None
+        if self.homography_calculator:
+            measured = [
+                (frame_id, result) for frame_id, result in zip(frame_ids, segmentation_results)
+                if result is not None and result.get("propagated_from") is None
+            ]
+            try:
+                solved = dict(zip([frame_id for frame_id, _ in measured], self.homography_calculator.calculate_homographies(
+                    [result["features"] for _, result in measured],
+                    [frame_id for frame_id, _ in measured],
+                    [result.get("geometry") for _, result in measured],
+                    store=False
+                )))
+            except Exception as e:
+                self.logger.error(f"Error calculating batched homographies: {e}")
+                solved = None
+
+        for segmentation_result, frame_id, frame_data in zip(segmentation_results, frame_ids, frames_data):
+            if segmentation_result is not None:
+                frame_data["segmentation_features"] = segmentation_result
+            self.run_homography_stage(segmentation_result, frame_id, frame_data, solved)
+
+        # Step 2: Batched detection, then orientation for all crops in the batch
+        if self.player_detector:
+            batch_detections = self.player_detector.process_batch(frames, frame_ids)
+        else:
+            batch_detections = [[] for _ in frames]
+        batch_orientations = self.run_orientation_stage(frames, batch_detections)
+
+        # Step 3: Metrics in frame order
+        return [
+            self.run_metrics_stage(detections, frame_id, frame_data, orientations)
+            for detections, orientations, frame_id, frame_data
+            in zip(batch_detections, batch_orientations, frame_ids, frames_data)
+        ]
+
+    def process_frames_batched(self, frames: Iterable[Tuple[int, np.ndarray]], batch_size: int) -> Iterator[Tuple[int, np.ndarray, Dict]]:
+        """
+        Process a stream of frames in batches of batch_size.
+
+        Args:
+            frames: Iterable of (frame_id, frame) pairs
+            batch_size: Number of frames sent through each forward pass
+
+        Yields:
+            (frame_id, frame, frame_data) tuples in input order
+        """
+        batch = []
+        for frame_id, frame in frames:
+            batch.append((frame_id, frame))
+            if len(batch) >= batch_size:
+                yield from self._process_buffered_batch(batch)
+                batch = []
+
+        if batch:
+            yield from self._process_buffered_batch(batch)
+
+    def _process_buffered_batch(self, batch: List[Tuple[int, np.ndarray]]) -> Iterator[Tuple[int, np.ndarray, Dict]]:
+        frame_ids = [frame_id for frame_id, _ in batch]
+        frames = [frame for _, frame in batch]
+        for i, (frame_id, frame, frame_data) in enumerate(zip(frame_ids, frames, self.process_batch(frames, frame_ids))):
+            # The whole batch has been processed, so the state only matches its last frame
+            self.drained = i == len(batch) - 1
+            yield frame_id, frame, frame_data
+
+    def process_frames_pipelined(self, frames: Iterable[Tuple[int, np.ndarray]], queue_size: int = 4, drain_every: int = 0) -> Iterator[Tuple[int, np.ndarray, Dict]]:
+        """
+        Process a stream of frames with each stage running on its own thread.
+        
+        Produces the same per-frame output as calling process_frame on each
+        frame in turn, in the same order. Detection runs on a worker thread,
+        where OpenCV windows are not supported, so the detector's display
+        window is turned off for the run (visualizations are still saved).
+        
+        Args:
+            frames: Iterable of (frame_id, frame) pairs; it is consumed by the decode stage
+            queue_size: Maximum number of frames buffered between two stages
+            drain_every: Let the pipeline drain after every this many frames, so
+                self.drained is True (and checkpoint_state can be taken) when
+                that frame is returned (0 never drains)
+            
+        Yields:
+            (frame_id, frame, frame_data) tuples in input order
+        """
+        pipeline = FramePipeline(self, queue_size=queue_size, drain_every=drain_every)
+        detector = self.player_detector
+        display = detector.display if detector else False
+        if detector:
+            detector.display = False
+        try:
+            for result in pipeline.run(frames):
+                self.drained = pipeline.drained
+                yield result
+        finally:
+            if detector:
+                detector.display = display
+        self.drained = True
+    
     def visualize_frame(self, frame: np.ndarray, frame_data: Dict, rink_image: np.ndarray = None, debug_mode: bool = False) -> Dict[str, np.ndarray]:
         """
         Create visualizations for the processed frame.
@@ -330,71 +829,114 @@ class PlayerTracker:
         
         return visualizations
     
-    def save_tracking_data(self, output_path: str) -> str:
+    def serializable_frame(self, frame_data: Dict) -> Dict:
+        """
+        Reduce a frame record to the essential, JSON-serializable data.
+        
+        Args:
+            frame_data: Frame record produced by process_frame
+            
+        Returns:
+            Dictionary with the fields written to the tracking data file
+        """
+        # Only keep essential data
+        serializable_frame = {
+            "frame_id": frame_data["frame_id"],
+            "timestamp": frame_data["timestamp"],
+            "players": [
+                {
+                    "player_id": p["player_id"],
+                    "type": p["type"],
+                    "bbox": p["bbox"],
+                    "rink_position": p.get("rink_position", None)
+                } for p in frame_data["players"]
+            ],
+            "homography_success": frame_data.get("homography_success", False)
+        }
+        
+        # Only include homography matrix if successful
+        if frame_data.get("homography_success", False):
+            serializable_frame["homography_matrix"] = frame_data.get("homography_matrix", None)
+        
+        # Keep where the matrix came from, so a resumed run refills the homography store correctly
+        if "homography_source" in frame_data:
+            serializable_frame["homography_source"] = frame_data["homography_source"]
+        if frame_data.get("homography_interpolated", False):
+            serializable_frame["homography_interpolated"] = True
+        
+        # Only include essential segmentation features
+        if "segmentation_features" in frame_data:
+            serializable_frame["segmentation_features"] = {
+                "features": {
+                    k: v for k, v in frame_data["segmentation_features"].get("features", {}).items()
+                    if k in ["blue_lines", "center_line", "goal_lines"]
+                }
+            }
+        
+        return serializable_frame
+    
+    def save_tracking_data(self, output_path: str, earlier_frames: Optional[Iterable[Tuple[Any, Dict]]] = None) -> str:
         """
         Save tracking data to a JSON file.
         
+        Frames are written one at a time, so frames spilled to disk by a
+        bounded tracking history are streamed back in rather than loaded
+        all at once. A path ending in .jsonl, .jsonl.gz or .jsonl.zst is
+        written as compact JSON Lines, one frame per line.
+        
         Args:
             output_path: Path to save tracking data
+            earlier_frames: Optional (frame_id, serialized frame) pairs written
+                before the tracker's own frames, e.g. the frames of a resumed
+                run's checkpoint
             
         Returns:
             Path to the saved file
         """
-        # Create a serializable copy of the tracking data
-        serializable_data = {}
-        
         print(f"Preparing tracking data for saving ({len(self.tracking_data)} frames)...")
         
-        # Process each frame separately
-        for frame_id, frame_data in self.tracking_data.items():
-            try:
-                # Only keep essential data
-                serializable_frame = {
-                    "frame_id": frame_data["frame_id"],
-                    "timestamp": frame_data["timestamp"],
-                    "players": [
-                        {
-                            "player_id": p["player_id"],
-                            "type": p["type"],
-                            "bbox": p["bbox"],
-                            "rink_position": p.get("rink_position", None)
-                        } for p in frame_data["players"]
-                    ],
-                    "homography_success": frame_data.get("homography_success", False)
-                }
-                
-                # Only include homography matrix if successful
-                if frame_data.get("homography_success", False):
-                    serializable_frame["homography_matrix"] = frame_data.get("homography_matrix", None)
-                
-                # Only include essential segmentation features
-                if "segmentation_features" in frame_data:
-                    serializable_frame["segmentation_features"] = {
-                        "features": {
-                            k: v for k, v in frame_data["segmentation_features"].get("features", {}).items()
-                            if k in ["blue_lines", "center_line", "goal_lines"]
-                        }
-                    }
-                
-                serializable_data[str(frame_id)] = serializable_frame
-            except Exception as e:
-                print(f"Error processing frame {frame_id}: {str(e)}")
-                continue
-        
         try:
-            print(f"Saving {len(serializable_data)} frames to {output_path}...")
+            print(f"Saving tracking data to {output_path}...")
             
             # Create directory if it doesn't exist
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            # Save with error handling
-            with open(output_path, 'w') as f:
-                json.dump(serializable_data, f, indent=2, cls=NumpyEncoder)
+            frames = self.tracking_data.iter_serialized()
+            if earlier_frames is not None:
+                frames = itertools.chain(earlier_frames, frames)
+            
+            saved_count = 0
+            if is_jsonl_path(output_path):
+                # One compact record per frame
+                with FrameRecordWriter(output_path) as writer:
+                    for frame_id, serializable_frame in frames:
+                        try:
+                            writer.write(serializable_frame)
+                        except Exception as e:
+                            print(f"Error processing frame {frame_id}: {str(e)}")
+                            continue
+                        saved_count += 1
+            else:
+                # Write the same layout as json.dump(..., indent=2), one frame at a time
+                with open(output_path, 'w') as f:
+                    f.write("{")
+                    for frame_id, serializable_frame in frames:
+                        try:
+                            frame_json = json.dumps(serializable_frame, indent=2, cls=NumpyEncoder)
+                        except Exception as e:
+                            print(f"Error processing frame {frame_id}: {str(e)}")
+                            continue
+                        
+                        f.write("," if saved_count else "")
+                        f.write(f"\n  {json.dumps(str(frame_id))}: ")
+                        f.write(frame_json.replace("\n", "\n  "))
+                        saved_count += 1
+                    f.write("\n}" if saved_count else "}")
             
             # Verify the file was created successfully
             if os.path.exists(output_path):
                 file_size = os.path.getsize(output_path)
-                print(f"Successfully saved tracking data to {output_path} ({file_size/1024:.1f} KB)")
+                print(f"Successfully saved {saved_count} frames to {output_path} ({file_size/1024:.1f} KB)")
             else:
                 print(f"Failed to save tracking data to {output_path} - file not created")
                 
@@ -404,104 +946,18 @@ class PlayerTracker:
             print(f"Error saving tracking data: {str(e)}")
             return None
 
-    def track_players(self, frame, frame_idx, timestamp):
-        """Track players in a single frame."""
-        frame_data = {
-            "frame_idx": frame_idx,
-            "timestamp": timestamp,
-            "players": [],
-            "homography_success": False
-        }
-        
-        # Run segmentation if we have a segmentation processor
-        if self.segmentation_processor:
-            segmentation_result = self.segmentation_processor.process_frame(frame)
-            frame_data["segmentation_features"] = segmentation_result["features"]
-            
-            # Calculate homography if we have a homography calculator
-            if self.homography_calculator:
-                try:
-                    # Pass the features to the homography calculator
-                    homography_matrix = self.homography_calculator.calculate_homography(
-                        segmentation_result["features"],
-                        frame_idx  # Pass frame_idx for caching
-                    )
-                    if homography_matrix is not None:
-                        frame_data["homography_matrix"] = homography_matrix.tolist()
-                        frame_data["homography_success"] = True
-                    else:
-                        # Try to get an interpolated matrix
-                        homography_matrix = self.homography_calculator.get_homography_matrix(frame_idx)
-                        if homography_matrix is not None:
-                            frame_data["homography_matrix"] = homography_matrix.tolist()
-                            frame_data["homography_success"] = True
-                            frame_data["homography_interpolated"] = True
-                        else:
-                            frame_data["homography_success"] = False
-                except Exception as e:
-                    self.logger.error(f"Error calculating homography: {e}")
-                    frame_data["homography_success"] = False
-        
-        # Run player detection
-        detection_result = self.player_detector.detect_players(frame)
-        
-        # Extract player detections
-        players = []
-        for i, bbox in enumerate(detection_result["boxes"]):
-            x1, y1, x2, y2 = bbox
-            # Get class and confidence
-            class_id = detection_result["classes"][i]
-            confidence = detection_result["scores"][i]
-            
-            # Extract player orientation if orientation model is available
-            orientation = None
-            orientation_confidence = None
-            if self.player_orientation_estimator:
-                try:
-                    player_img = frame[int(y1):int(y2), int(x1):int(x2)]
-                    if player_img.size > 0:  # Ensure valid crop
-                        orient_result = self.player_orientation_estimator.estimate_orientation(player_img)
-                        orientation = orient_result["orientation"]
-                        orientation_confidence = orient_result["confidence"]
-                except Exception as e:
-                    self.logger.error(f"Error estimating player orientation: {e}")
-            
-            # Calculate player position on the rink if homography is available
-            rink_position = None
-            if frame_data.get("homography_success", False) and "homography_matrix" in frame_data:
-                try:
-                    # Use the center bottom point of the bounding box as the player's position
-                    player_x = (x1 + x2) / 2
-                    player_y = y2  # Bottom of the bounding box
-                    
-                    # Convert from list back to numpy array
-                    homography_matrix = np.array(frame_data["homography_matrix"])
-                    
-                    # Project the point to the rink coordinates
-                    rink_position = self.homography_calculator.project_point_to_rink(
-                        (player_x, player_y), 
-                        homography_matrix
-                    )
-                except Exception as e:
-                    self.logger.error(f"Error projecting player position: {e}")
-            
-            player_data = {
-                "bbox": bbox.tolist(),
-                "class_id": int(class_id),
-                "confidence": float(confidence),
-                "orientation": orientation,
-                "orientation_confidence": orientation_confidence,
-                "rink_position": rink_position
-            }
-            
-            players.append(player_data)
+    def process_video_clip(self, video_path, start_second=0, num_seconds=5, frame_step=1, max_frames=None,
+                           checkpoint_every=0, resume=False):
+        """
+        Process a clip from a video file.
         
-        frame_data["players"] = players
-        return frame_data
-
-    def process_video_clip(self, video_path, start_second=0, num_seconds=5, frame_step=1, max_frames=None):
-        """Process a clip from a video file."""
+        With checkpoint_every (or resume) set, every frame result is appended
+        to checkpoint.jsonl in the output directory and the tracker state is
+        snapshotted every checkpoint_every frames (100 if 0), so a crashed run
+        can be resumed after its last snapshot.
+        """
         results = []
+        checkpoint = None
         
         try:
             cap = cv2.VideoCapture(video_path)
@@ -524,15 +980,38 @@ class PlayerTracker:
             if max_frames is not None and (end_frame - start_frame) > max_frames:
                 end_frame = start_frame + max_frames
             
-            # Set starting position
-            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-            
             frame_idx = start_frame
             frames_dir = os.path.join(self.output_dir, "frames")
             os.makedirs(frames_dir, exist_ok=True)
             
             frame_results = []
             
+            # Append results to a checkpoint and pick up after its last snapshot when resuming
+            if checkpoint_every > 0 or resume:
+                checkpoint = RunCheckpoint(
+                    os.path.join(self.output_dir, "checkpoint.jsonl"),
+                    {
+                        "video_path": video_path,
+                        "start_frame": start_frame,
+                        "end_frame": end_frame,
+                        "frame_step": frame_step,
+                        "max_frames": max_frames
+                    },
+                    interval=checkpoint_every or 100,
+                    resume=resume,
+                    json_encoder=NumpyEncoder
+                )
+                if checkpoint.state is not None:
+                    frame_results = [
+                        {"frame_idx": frame_id, **frame_data} for frame_id, frame_data in checkpoint.iter_frames()
+                    ]
+                    self.restore_checkpoint_state(checkpoint.state, frame_results)
+                    frame_idx = checkpoint.last_frame + frame_step
+                    self.logger.info(f"Resuming after frame {checkpoint.last_frame}")
+            
+            # Set starting position
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            
             # Process frames
             while frame_idx < end_frame:
                 ret, frame = cap.read()
@@ -541,10 +1020,10 @@ class PlayerTracker:
                 
                 # Process every n-th frame
                 if (frame_idx - start_frame) % frame_step == 0:
-                    timestamp = frame_idx / fps
-                    
-                    # Track players
-                    frame_data = self.track_players(frame, frame_idx, timestamp)
+                    # Track players, keeping the clip's frame index and video time
+                    frame_data = self.process_frame(frame, frame_idx)
+                    frame_data["frame_idx"] = frame_idx
+                    frame_data["timestamp"] = frame_idx / fps
                     frame_results.append(frame_data)
                     
                     # Save frame
@@ -553,6 +1032,11 @@ class PlayerTracker:
                     cv2.imwrite(frame_path, frame)
                     
                     self.logger.info(f"Processed frame {frame_idx} (output idx: {output_idx})")
+                    
+                    if checkpoint is not None:
+                        checkpoint.add_frame(frame_idx, self.serializable_frame(frame_data))
+                        if checkpoint.snapshot_due:
+                            checkpoint.save_state(frame_idx, self.checkpoint_state())
                 
                 frame_idx += 1
                 
@@ -560,6 +1044,10 @@ class PlayerTracker:
                 if max_frames is not None and (frame_idx - start_frame) >= max_frames * frame_step:
                     break
             
+            # Commit the last results
+            if checkpoint is not None and len(frame_results) > checkpoint.frame_count:
+                checkpoint.save_state(frame_results[-1]["frame_idx"], self.checkpoint_state())
+            
             # Now interpolate missing homography matrices
             self.interpolate_missing_homography(frame_results)
             
@@ -590,17 +1078,118 @@ class PlayerTracker:
         finally:
             if 'cap' in locals() and cap is not None:
                 cap.release()
+            if checkpoint is not None:
+                checkpoint.close()
         
         return results
     
+    def smooth_homography(self, frame_results):
+        """
+        Filter jitter out of the original homography matrices of a clip.
+        
+        Runs the calculator's fixed-lag smoother over the frames with an
+        original homography, in frame order. The players of every smoothed
+        frame are projected to the rink again with the smoothed matrix
+        (callers that derive metrics from rink positions recompute them).
+        Frames the filter rejects as outliers are turned into fallback frames,
+        so interpolate_missing_homography fills them from their neighbours.
+        
+        Args:
+            frame_results: List of frame dictionaries with "frame_idx", updated in place
+        """
+        positions = sorted(
+            (i for i, frame_data in enumerate(frame_results)
+             if frame_data.get("homography_success", False) and frame_data.get("homography_source") == "original"),
+            key=lambda i: frame_results[i]["frame_idx"]
+        )
+        if not positions:
+            return
+        
+        smoothed = self.homography_calculator.smooth_homographies(
+            [frame_results[i]["frame_idx"] for i in positions],
+            [np.asarray(frame_results[i]["homography_matrix"], dtype=np.float64) for i in positions]
+        )
+        
+        rejected = 0
+        for i, matrix in zip(positions, smoothed):
+            frame_data = frame_results[i]
+            if matrix is None:
+                frame_data["homography_source"] = HomographySource.FALLBACK.label
+                frame_data["homography_interpolated"] = True
+                self.homography_store.set(
+                    frame_data["frame_idx"], frame_data["homography_matrix"], HomographySource.FALLBACK
+                )
+                rejected += 1
+            else:
+                frame_data["homography_matrix"] = matrix
+                self.homography_store.set(frame_data["frame_idx"], matrix, HomographySource.ORIGINAL)
+                self.reproject_players(frame_data)
+        
+        self.logger.info(f"Smoothed {len(positions) - rejected} homographies, rejected {rejected} as outliers")
+    
+    def reproject_players(self, frame_data: Dict) -> None:
+        """
+        Project a frame's players to the rink again with the frame's current homography matrix.
+        
+        Players are projected from their "reference_point" if they have one,
+        otherwise from the same bbox point DetectionResult uses.
+        
+        Args:
+            frame_data: Frame dictionary with "homography_matrix" and "players", updated in place
+        """
+        players = frame_data.get("players", [])
+        if not players or frame_data.get("homography_matrix") is None:
+            return
+        
+        points = []
+        for player in players:
+            reference_point = player.get("reference_point")
+            if reference_point:
+                points.append((reference_point["x"], reference_point["y"]))
+            else:
+                x1, y1, x2, y2 = player["bbox"]
+                points.append(((x1 + x2) / 2, y2 - (y2 - y1) / 3))
+        
+        try:
+            projection = self.homography_calculator.project_points_to_rink(
+                np.array(points, dtype=np.float64), frame_data["homography_matrix"]
+            )
+            rink_positions = self.homography_calculator.rink_positions_from_projection(*projection)
+        except Exception as e:
+            self.logger.error(f"Error re-projecting players of frame {frame_data.get('frame_idx')}: {e}")
+            return
+        
+        for player, rink_position in zip(players, rink_positions):
+            player["rink_position"] = rink_position
+    
     def interpolate_missing_homography(self, frame_results):
-        """Interpolate missing homography matrices for frames where calculation failed or used fallback."""
+        """
+        Interpolate missing homography matrices for frames where calculation failed or used fallback.
+        
+        A single sweep finds, for every fallback frame, the closest frames with an
+        original homography before and after it (searchsorted on the sorted
+        original frame indices). All interpolation factors and matrices are then
+        computed in one batched call, so the cost is linear in the clip length
+        apart from the sort.
+        
+        With "fixed_lag" homography smoothing, the original matrices are
+        smoothed first (see smooth_homography).
+        
+        Args:
+            frame_results: List of frame dictionaries with "frame_idx", updated in place
+        """
+        if self.homography_calculator and self.homography_calculator.smoothing == "fixed_lag":
+            self.smooth_homography(frame_results)
+        
         # Collect frame indices with successfully calculated homography (not fallback)
         successful_original_frames = {}
+        fallback_positions = []
         for i, frame_data in enumerate(frame_results):
             # Only use frames with original homography as interpolation sources
             if frame_data.get("homography_success", False) and frame_data.get("homography_source") == "original":
                 successful_original_frames[frame_data["frame_idx"]] = i
+            elif frame_data.get("homography_source") == "fallback":
+                fallback_positions.append(i)
         
         # Skip if we have less than 2 original frames
         if len(successful_original_frames) < 2:
@@ -610,125 +1199,100 @@ class PlayerTracker:
         # Report initial state
         self.logger.info(f"Starting true homography interpolation:")
         self.logger.info(f"Found {len(successful_original_frames)} frames with original homography matrices")
+        self.logger.info(f"Need to interpolate {len(fallback_positions)} frames with fallback matrices")
         
-        # Count frames that need interpolation (fallback frames)
-        frames_needing_interpolation = []
-        for i, frame_data in enumerate(frame_results):
-            if frame_data.get("homography_source") == "fallback":
-                frames_needing_interpolation.append(frame_data["frame_idx"])
-        
-        self.logger.info(f"Need to interpolate {len(frames_needing_interpolation)} frames with fallback matrices")
-        
-        # Get sorted list of frame indices with original homography
-        sorted_indices = sorted(successful_original_frames.keys())
-        self.logger.info(f"Original homography frames: {sorted_indices}")
-        
-        # Get sorted list of frames needing interpolation
-        sorted_frames_to_interpolate = sorted(frames_needing_interpolation)
-        
-        # Do multiple passes to ensure all frames have a chance to be interpolated
-        for pass_num in range(3):  # Do three passes to ensure better results
-            self.logger.info(f"\nInterpolation pass {pass_num+1}")
-            frames_interpolated_this_pass = 0
-            
-            # Interpolate for each frame with fallback homography
-            for frame_idx in sorted_frames_to_interpolate[:]:  # Use a copy to safely modify the list
-                # Get the frame data
-                frame_idx_in_results = None
-                for i, frame_data in enumerate(frame_results):
-                    if frame_data["frame_idx"] == frame_idx:
-                        frame_idx_in_results = i
-                        break
-                
-                if frame_idx_in_results is None:
-                    continue
-                
-                frame_data = frame_results[frame_idx_in_results]
-                
-                # Skip if this frame is no longer a fallback (it was interpolated in a previous pass)
-                if frame_data.get("homography_source") != "fallback":
-                    sorted_frames_to_interpolate.remove(frame_idx)
-                    continue
-                
-                # Find the closest original frames before and after
-                before_idx = None
-                after_idx = None
-                
-                # Find closest before and after indices from original frames
-                before_indices = [idx for idx in sorted_indices if idx < frame_idx]
-                after_indices = [idx for idx in sorted_indices if idx > frame_idx]
-                
-                if before_indices:
-                    before_idx = max(before_indices)
-                
-                if after_indices:
-                    after_idx = min(after_indices)
-                
-                # Interpolate only if we have both before and after frames
-                if before_idx is not None and after_idx is not None:
-                    before_matrix = np.array(frame_results[successful_original_frames[before_idx]]["homography_matrix"])
-                    after_matrix = np.array(frame_results[successful_original_frames[after_idx]]["homography_matrix"])
-                    
-                    # Calculate interpolation factor
-                    t = (frame_idx - before_idx) / (after_idx - before_idx)
-                    
-                    # Use the homography calculator's interpolation method
-                    interpolated = self.homography_calculator.interpolate_homography(before_matrix, after_matrix, t)
-                    
-                    # Update the frame data
-                    frame_data["homography_matrix"] = interpolated.tolist()
-                    frame_data["homography_success"] = True
-                    frame_data["homography_source"] = "interpolated"  # Mark as properly interpolated
-                    frame_data["interpolation_details"] = {
-                        "method": "true_interpolation",
-                        "before_frame": before_idx,
-                        "after_frame": after_idx,
-                        "t_factor": t
-                    }
-                    
-                    # Remove this frame from the list of frames to interpolate
-                    sorted_frames_to_interpolate.remove(frame_idx)
-                    frames_interpolated_this_pass += 1
-                    
-                    self.logger.info(f"  Frame {frame_idx}: TRUE INTERPOLATION (t={t:.2f}, between frames {before_idx} and {after_idx})")
-                
-                # If we only have a before frame but no after frame, keep using the before frame
-                elif before_idx is not None:
-                    # We already have the before matrix, no need to change it
-                    # Just update the metadata to be clearer about what happened
-                    frame_data["interpolation_details"] = {
-                        "method": "before_fallback",
-                        "before_frame": before_idx,
-                        "note": "Kept existing fallback, no after frame available for interpolation"
-                    }
-                    
-                    sorted_frames_to_interpolate.remove(frame_idx)
-                    frames_interpolated_this_pass += 1
-                    self.logger.info(f"  Frame {frame_idx}: Kept fallback from frame {before_idx} (no after frame)")
+        if not fallback_positions:
+            return
+        
+        # Sorted original frame indices and their matrices
+        original_idx = np.array(sorted(successful_original_frames), dtype=np.int64)
+        original_matrices = np.stack([
+            np.asarray(frame_results[successful_original_frames[idx]]["homography_matrix"], dtype=np.float64)
+            for idx in original_idx.tolist()
+        ])
+        
+        # Process fallback frames in frame order
+        fallback_positions.sort(key=lambda i: frame_results[i]["frame_idx"])
+        fallback_idx = np.array([frame_results[i]["frame_idx"] for i in fallback_positions], dtype=np.int64)
+        
+        # Closest original frame strictly before and strictly after each fallback frame
+        before_pos = np.searchsorted(original_idx, fallback_idx, side="left") - 1
+        after_pos = np.searchsorted(original_idx, fallback_idx, side="right")
+        has_before = before_pos >= 0
+        has_after = after_pos < len(original_idx)
+        before_pos = np.clip(before_pos, 0, len(original_idx) - 1)
+        after_pos = np.clip(after_pos, 0, len(original_idx) - 1)
+        
+        # Interpolate only if we have both before and after frames
+        between = has_before & has_after
+        before_frames = original_idx[before_pos[between]]
+        after_frames = original_idx[after_pos[between]]
+        t_factors = (fallback_idx[between] - before_frames) / (after_frames - before_frames)
+        interpolated = self.homography_calculator.interpolate_homographies(
+            original_matrices[before_pos[between]],
+            original_matrices[after_pos[between]],
+            t_factors
+        )
+        
+        # Write the results back in frame order
+        interpolated_rows = iter(range(len(t_factors)))
+        for k, i in enumerate(fallback_positions):
+            frame_data = frame_results[i]
+            frame_idx = int(fallback_idx[k])
+            
+            if between[k]:
+                row = next(interpolated_rows)
+                before_idx = int(before_frames[row])
+                after_idx = int(after_frames[row])
+                t = float(t_factors[row])
                 
-                # If we only have an after frame but no before frame, use the after frame
-                elif after_idx is not None:
-                    after_matrix = np.array(frame_results[successful_original_frames[after_idx]]["homography_matrix"])
-                    frame_data["homography_matrix"] = after_matrix.tolist()
-                    frame_data["homography_source"] = "from_after"
-                    frame_data["interpolation_details"] = {
-                        "method": "after_fallback",
-                        "after_frame": after_idx,
-                        "note": "Used after frame instead of fallback, no before frame available"
-                    }
-                    
-                    sorted_frames_to_interpolate.remove(frame_idx)
-                    frames_interpolated_this_pass += 1
-                    self.logger.info(f"  Frame {frame_idx}: Using matrix from next frame {after_idx}")
-            
-            # Update the number of successful frames after each pass
-            self.logger.info(f"Pass {pass_num+1} complete: Interpolated {frames_interpolated_this_pass} frames")
-            self.logger.info(f"Remaining frames to interpolate: {len(sorted_frames_to_interpolate)}")
-            
-            # If we didn't interpolate any frames in this pass, or all frames have been interpolated, break
-            if frames_interpolated_this_pass == 0 or len(sorted_frames_to_interpolate) == 0:
-                self.logger.info(f"No more frames to interpolate, ending interpolation passes")
-                break
+                # Update the frame data
+                frame_data["homography_matrix"] = interpolated[row]
+                frame_data["homography_success"] = True
+                frame_data["homography_source"] = "interpolated"  # Mark as properly interpolated
+                frame_data["interpolation_details"] = {
+                    "method": "true_interpolation",
+                    "before_frame": before_idx,
+                    "after_frame": after_idx,
+                    "t_factor": t
+                }
+                self.logger.debug(f"  Frame {frame_idx}: TRUE INTERPOLATION (t={t:.2f}, between frames {before_idx} and {after_idx})")
+            
+            # If we only have a before frame but no after frame, keep using the before frame
+            elif has_before[k]:
+                before_idx = int(original_idx[before_pos[k]])
+                # We already have the before matrix, no need to change it
+                # Just update the metadata to be clearer about what happened
+                frame_data["interpolation_details"] = {
+                    "method": "before_fallback",
+                    "before_frame": before_idx,
+                    "note": "Kept existing fallback, no after frame available for interpolation"
+                }
+                self.logger.debug(f"  Frame {frame_idx}: Kept fallback from frame {before_idx} (no after frame)")
+            
+            # If we only have an after frame but no before frame, use the after frame
+            else:
+                after_idx = int(original_idx[after_pos[k]])
+                frame_data["homography_matrix"] = original_matrices[after_pos[k]].copy()
+                frame_data["homography_source"] = "from_after"
+                frame_data["interpolation_details"] = {
+                    "method": "after_fallback",
+                    "after_frame": after_idx,
+                    "note": "Used after frame instead of fallback, no before frame available"
+                }
+                self.logger.debug(f"  Frame {frame_idx}: Using matrix from next frame {after_idx}")
+        
+        # Mirror the new matrices in the homography store in two batched writes
+        only_after = ~has_before
+        self.homography_store.set_many(fallback_idx[between], interpolated, HomographySource.INTERPOLATED)
+        self.homography_store.set_many(
+            fallback_idx[only_after], original_matrices[after_pos[only_after]], HomographySource.FROM_AFTER
+        )
+        
+        self.logger.info(
+            f"Interpolation complete: {int(between.sum())} interpolated, "
+            f"{int((has_before & ~has_after).sum())} kept before fallback, {int(only_after.sum())} from after frame"
+        )
     
     def create_visualization(self, results, output_dir):
         # Implementation of create_visualization method
@@ -3,12 +3,16 @@ import numpy as np
 import os
 import argparse
 import time
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional, Iterator
 import json
 import shutil
 import math
 
+from checkpoint import RunCheckpoint
 from player_tracker import PlayerTracker, NumpyEncoder
+from segmentation_processor import parse_mask_scale
+from tracking_io import FrameRecordWriter, OUTPUT_FORMATS
+from track_columns import PlayerTrackColumns, TRACK_FORMATS, check_track_format
 
 
 def calculate_player_metrics(frames_info: List[Dict], fps: float = 30.0) -> List[Dict]:
@@ -150,6 +154,102 @@ def calculate_moving_averages(frames_info: List[Dict], window_size: int = 5) ->
     return frames_info
 
 
+# Number of previous frames in the players' metric moving averages
+METRICS_WINDOW = 5
+
+
+def update_player_metrics(players: List[Dict], recent_frames: List[Dict], fps: float) -> None:
+    """
+    Set speed, acceleration and the metric moving averages of a frame's players.
+    
+    Args:
+        players: The frame's player dictionaries, updated in place
+        recent_frames: The up to METRICS_WINDOW frames processed before this one, oldest first
+        fps: Video frame rate
+    """
+    if recent_frames:
+        last_frame = recent_frames[-1]
+        for player in players:
+            # Find this player in the last frame
+            last_player = next((p for p in last_frame["players"] if p["player_id"] == player["player_id"]), None)
+            if last_player and player.get("rink_position") and last_player.get("rink_position"):
+                # Calculate speed (pixels per second)
+                dt = 1.0 / fps
+                dx = player["rink_position"]["x"] - last_player["rink_position"]["x"]
+                dy = player["rink_position"]["y"] - last_player["rink_position"]["y"]
+                speed = math.sqrt(dx * dx + dy * dy) / dt
+                player["speed"] = speed
+                
+                # Calculate acceleration
+                if "speed" in last_player:
+                    player["acceleration"] = (speed - last_player["speed"]) / dt
+                else:
+                    player["acceleration"] = 0.0
+            else:
+                player["speed"] = 0.0
+                player["acceleration"] = 0.0
+    
+    # Calculate moving averages for metrics
+    for player in players:
+        # Find this player's history
+        player_history = []
+        for past_frame in recent_frames:
+            past_player = next((p for p in past_frame["players"] if p["player_id"] == player["player_id"]), None)
+            if past_player:
+                player_history.append(past_player)
+        
+        # Calculate moving averages
+        if player_history:
+            speed_values = [p["speed"] for p in player_history if "speed" in p]
+            acc_values = [p["acceleration"] for p in player_history if "acceleration" in p]
+            orient_values = [p["orientation"] for p in player_history if "orientation" in p]
+            
+            player["speed_ma"] = sum(speed_values) / len(speed_values) if speed_values else 0.0
+            player["acceleration_ma"] = sum(acc_values) / len(acc_values) if acc_values else 0.0
+            player["orientation_ma"] = sum(orient_values) / len(orient_values) if orient_values else 0.0
+        else:
+            player["speed_ma"] = player.get("speed", 0.0)
+            player["acceleration_ma"] = player.get("acceleration", 0.0)
+            player["orientation_ma"] = player.get("orientation", 0.0)
+
+
+def iter_clip_frames(
+    cap: cv2.VideoCapture,
+    start_frame: int,
+    end_frame: int,
+    frame_step: int,
+    max_frames: int,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Read the frames of a clip that should be processed.
+    
+    Args:
+        cap: Video capture already positioned at start_frame
+        start_frame: First frame of the clip
+        end_frame: Frame at which to stop reading
+        frame_step: Yield every nth frame
+        max_frames: Maximum number of frames to yield
+        
+    Yields:
+        (frame_idx, frame) pairs
+    """
+    frame_idx = start_frame
+    frames_yielded = 0
+    
+    while frame_idx < end_frame and frames_yielded < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        
+        # Only process every nth frame
+        if (frame_idx - start_frame) % frame_step == 0:
+            print(f"Processing frame {frame_idx}/{end_frame} ({(frame_idx - start_frame) / (end_frame - start_frame) * 100:.1f}%)")
+            yield frame_idx, frame
+            frames_yielded += 1
+        
+        frame_idx += 1
+
+
 def process_clip(
     video_path: str,
     detection_model_path: str,
@@ -162,6 +262,27 @@ def process_clip(
     num_seconds: float = 5.0,
     frame_step: int = 5,
     max_frames: int = 60,
+    pipelined: bool = False,
+    queue_size: int = 4,
+    batch_size: int = 1,
+    detect_facing: bool = False,
+    headless: bool = False,
+    debug_every: int = 0,
+    history_size: Optional[int] = None,
+    mask_scale: Optional[Any] = None,
+    motion_gate: Optional[float] = None,
+    keyframe_interval: int = 30,
+    track_homography: bool = False,
+    drift_bound: float = 3.0,
+    extraction_workers: int = 0,
+    homography_solver: str = "ransac",
+    homography_interpolation: str = "linear",
+    homography_smoothing: Optional[str] = None,
+    smoothing_lag: int = 15,
+    checkpoint_every: int = 0,
+    resume: bool = False,
+    output_format: str = "json",
+    track_format: Optional[str] = None,
 ):
     """
     Process a short clip from a video to test the player tracking system.
@@ -178,7 +299,35 @@ def process_clip(
         num_seconds: Number of seconds to process
         frame_step: Process every nth frame
         max_frames: Maximum number of frames to process
+        pipelined: Run the tracker stages concurrently on separate threads
+        queue_size: Maximum number of frames buffered between pipeline stages
+        batch_size: Number of frames sent through each segmentation and detection forward pass
+        detect_facing: Classify which way each player is facing with the orientation model
+        headless: Skip detector visualization, display and per-frame debug writes
+        debug_every: In headless mode, save every Nth detector visualization in the background
+        history_size: Number of most recent frames the tracker keeps in memory (None keeps every frame)
+        mask_scale: Resolution segmentation masks are processed at: None (full frame), "native" or a fraction
+        motion_gate: Skip segmentation while the camera moves less than this many pixels per frame
+        keyframe_interval: With motion_gate or track_homography, run segmentation at least every this many frames
+        track_homography: Skip segmentation between keyframes by tracking the camera frame to frame
+        drift_bound: With track_homography, accumulated tracking error in pixels that triggers segmentation
+        extraction_workers: Threads extracting segmentation features in parallel (0 for sequential)
+        homography_solver: "ransac", or "dlt" to try a weighted least-squares fit before RANSAC
+        homography_interpolation: "linear", or "camera" to interpolate camera pan/tilt/zoom between homographies
+        homography_smoothing: None, "causal" to filter homography jitter as frames are processed, or "fixed_lag" to filter in the second pass
+        smoothing_lag: With "fixed_lag" smoothing, number of later frames each smoothed homography uses
+        checkpoint_every: Append results to checkpoint.jsonl in output_dir and snapshot the tracker every this many frames (0 disables)
+        resume: Continue from the checkpoint in output_dir (checkpointing every checkpoint_every frames, or 100 if 0)
+        output_format: "json" for one indented document, or "jsonl", "jsonl.gz" or "jsonl.zst" for one compact
+            line per frame followed by a {"run": ...} summary line
+        track_format: Also write player observations as columns to output_dir/player_tracks, as "npy" files,
+            "parquet" or "arrow" (both need pyarrow), with the interpolated homographies alongside
     """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}, got {output_format!r}")
+    if track_format is not None:
+        check_track_format(track_format)
+    
     # Create output directory if it doesn't exist
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -199,7 +348,21 @@ def process_clip(
         orientation_model_path=orientation_model_path,
         output_dir=output_dir,
         segmentation_model_path=segmentation_model_path,
-        rink_coordinates_path=rink_coordinates_path
+        rink_coordinates_path=rink_coordinates_path,
+        detect_facing=detect_facing,
+        headless=headless,
+        debug_every=debug_every,
+        history_size=history_size,
+        mask_scale=mask_scale,
+        motion_gate=motion_gate,
+        keyframe_interval=keyframe_interval,
+        track_homography=track_homography,
+        drift_bound=drift_bound,
+        extraction_workers=extraction_workers,
+        homography_solver=homography_solver,
+        homography_interpolation=homography_interpolation,
+        homography_smoothing=homography_smoothing,
+        smoothing_lag=smoothing_lag
     )
     
     # Load rink image for visualization if provided
@@ -229,197 +392,203 @@ def process_clip(
     
     print(f"Processing from frame {start_frame} to {end_frame} ({end_frame - start_frame} frames)")
     
-    # Seek to start frame
-    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-    
     # Process frames
     processed_frames_info = []
-    frame_idx = start_frame
     frames_processed = 0
+    first_frame = start_frame
+    
+    # Append results to a checkpoint and pick up after its last snapshot when resuming
+    checkpoint = None
+    if checkpoint_every > 0 or resume:
+        checkpoint = RunCheckpoint(
+            os.path.join(output_dir, "checkpoint.jsonl"),
+            {
+                "video_path": video_path,
+                "start_frame": start_frame,
+                "end_frame": end_frame,
+                "frame_step": frame_step,
+                "max_frames": max_frames
+            },
+            interval=checkpoint_every or 100,
+            resume=resume,
+            json_encoder=NumpyEncoder
+        )
+        if checkpoint.state is not None:
+            processed_frames_info = [frame_info for _, frame_info in checkpoint.iter_frames()]
+            tracker.restore_checkpoint_state(checkpoint.state, processed_frames_info)
+            frames_processed = len(processed_frames_info)
+            first_frame = checkpoint.last_frame + frame_step
+            print(f"Resuming after frame {checkpoint.last_frame} ({frames_processed} frames already processed)")
+    resumed_frames = frames_processed
+    
+    # Seek to the first frame to process
+    cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
     start_time = time.time()
     
-    # Use the max_frames parameter instead of hard-coded value
-    max_frames_to_process = max_frames
-    
-    while frame_idx < end_frame:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    frames = iter_clip_frames(cap, first_frame, end_frame, frame_step, max_frames - frames_processed)
+    if pipelined:
+        print(f"Using pipelined executor (queue size {queue_size})")
+        frame_results = tracker.process_frames_pipelined(
+            frames, queue_size=queue_size, drain_every=checkpoint.interval if checkpoint is not None else 0
+        )
+    elif batch_size > 1:
+        print(f"Using batched inference (batch size {batch_size})")
+        frame_results = tracker.process_frames_batched(frames, batch_size)
+    else:
+        frame_results = (
+            (frame_idx, frame, tracker.process_frame(frame, frame_idx))
+            for frame_idx, frame in frames
+        )
+    
+    for frame_idx, frame, frame_data in frame_results:
+        # Calculate metrics for this frame's players using previous frames
+        update_player_metrics(frame_data["players"], processed_frames_info[-METRICS_WINDOW:], fps)
         
-        # Only process every nth frame
-        if (frame_idx - start_frame) % frame_step == 0:
-            print(f"Processing frame {frame_idx}/{end_frame} ({(frame_idx - start_frame) / (end_frame - start_frame) * 100:.1f}%)")
-            
-            # Process the frame
-            frame_data = tracker.process_frame(frame, frame_idx)
-            
-            # Calculate metrics for this frame's players using previous frames
-            if len(processed_frames_info) > 0:
-                last_frame = processed_frames_info[-1]
-                for player in frame_data["players"]:
-                    # Find this player in the last frame
-                    last_player = next((p for p in last_frame["players"] if p["player_id"] == player["player_id"]), None)
-                    if last_player and "rink_position" in player and "rink_position" in last_player:
-                        # Calculate speed (pixels per second)
-                        dt = 1.0 / fps
-                        dx = player["rink_position"][0] - last_player["rink_position"][0]
-                        dy = player["rink_position"][1] - last_player["rink_position"][1]
-                        speed = math.sqrt(dx * dx + dy * dy) / dt
-                        player["speed"] = speed
-                        
-                        # Calculate acceleration
-                        if "speed" in last_player:
-                            player["acceleration"] = (speed - last_player["speed"]) / dt
-                        else:
-                            player["acceleration"] = 0.0
-                    else:
-                        player["speed"] = 0.0
-                        player["acceleration"] = 0.0
-            
-            # Calculate moving averages for metrics
-            window_size = 5
-            for player in frame_data["players"]:
-                # Find this player's history
-                player_history = []
-                for past_frame in processed_frames_info[-window_size:]:
-                    past_player = next((p for p in past_frame["players"] if p["player_id"] == player["player_id"]), None)
-                    if past_player:
-                        player_history.append(past_player)
-                
-                # Calculate moving averages
-                if player_history:
-                    speed_values = [p["speed"] for p in player_history if "speed" in p]
-                    acc_values = [p["acceleration"] for p in player_history if "acceleration" in p]
-                    orient_values = [p["orientation"] for p in player_history if "orientation" in p]
-                    
-                    player["speed_ma"] = sum(speed_values) / len(speed_values) if speed_values else 0.0
-                    player["acceleration_ma"] = sum(acc_values) / len(acc_values) if acc_values else 0.0
-                    player["orientation_ma"] = sum(orient_values) / len(orient_values) if orient_values else 0.0
-                else:
-                    player["speed_ma"] = player.get("speed", 0.0)
-                    player["acceleration_ma"] = player.get("acceleration", 0.0)
-                    player["orientation_ma"] = player.get("orientation", 0.0)
-            
-            # Create directory for individual frame if it doesn't exist
-            frame_dir = os.path.join(frames_dir, str(frame_idx))
-            if not os.path.exists(frame_dir):
-                os.makedirs(frame_dir)
-            
-            # Save original frame
-            original_path = os.path.join(frame_dir, "original.jpg")
-            cv2.imwrite(original_path, frame)
-            
-            # Create and save player detections visualization
-            detections_vis = frame.copy()
-            for player in frame_data["players"]:
-                if "bbox" in player:
-                    x1, y1, x2, y2 = player["bbox"]
-                    # Draw bounding box
-                    cv2.rectangle(detections_vis, 
-                                (int(x1), int(y1)), 
-                                (int(x2), int(y2)), 
-                                (0, 255, 0), 2)
-                    # Draw player ID
-                    cv2.putText(detections_vis, 
-                              player["player_id"], 
-                              (int(x1), int(y1) - 10),
-                              cv2.FONT_HERSHEY_SIMPLEX, 
-                              0.5, (0, 255, 0), 2)
-            
-            detections_path = os.path.join(frame_dir, "detections.jpg")
-            cv2.imwrite(detections_path, detections_vis)
-            
-            # Create and save tracking visualization if rink image is provided
-            tracking_path = None
-            if rink_image is not None:
-                visualizations = tracker.visualize_frame(frame, frame_data, rink_image)
-                if visualizations:
-                    tracking_vis = visualizations.get("rink")
-                    if tracking_vis is not None:
-                        tracking_path = os.path.join(frame_dir, "tracking.jpg")
-                        cv2.imwrite(tracking_path, tracking_vis)
-            
-            # Save frame info
-            frame_info = {
-                "frame_id": frame_idx,
-                "frame_idx": frame_idx,
-                "timestamp": (frame_idx - start_frame) / fps,
-                "players": [
-                    {
-                        "player_id": p["player_id"],
-                        "type": p["type"],
-                        "bbox": p["bbox"],
-                        "rink_position": p.get("rink_position", None),
-                        "speed": p.get("speed", 0.0),
-                        "acceleration": p.get("acceleration", 0.0),
-                        "orientation": p.get("orientation", 0.0),
-                        "speed_ma": p.get("speed_ma", 0.0),
-                        "acceleration_ma": p.get("acceleration_ma", 0.0),
-                        "orientation_ma": p.get("orientation_ma", 0.0)
-                    } for p in frame_data["players"]
-                ],
-                "homography_success": frame_data.get("homography_success", False),
-                "original_frame_path": os.path.join("frames", str(frame_idx), "original.jpg"),
-                "detections_path": os.path.join("frames", str(frame_idx), "detections.jpg")
-            }
-            
-            if tracking_path:
-                frame_info["tracking_path"] = os.path.join("frames", str(frame_idx), "tracking.jpg")
-            
-            # Include information about whether homography was interpolated
-            if frame_data.get("homography_interpolated", False):
-                frame_info["homography_interpolated"] = True
-            
-            # Include information about homography source
-            if "homography_source" in frame_data:
-                frame_info["homography_source"] = frame_data["homography_source"]
-            
-            # Include detailed interpolation info if available
-            if "interpolation_details" in frame_data:
-                frame_info["interpolation_details"] = frame_data["interpolation_details"]
-            
-            # Only include homography matrix if successful
-            if frame_data.get("homography_success", False):
-                frame_info["homography_matrix"] = frame_data.get("homography_matrix", None)
-            
-            # Only include essential segmentation features
-            if "segmentation_features" in frame_data:
-                frame_info["segmentation_features"] = {
-                    "features": {
-                        k: v for k, v in frame_data["segmentation_features"].get("features", {}).items()
-                        if k in ["blue_lines", "center_line", "goal_lines"]
-                    }
+        # Create directory for individual frame if it doesn't exist
+        frame_dir = os.path.join(frames_dir, str(frame_idx))
+        if not os.path.exists(frame_dir):
+            os.makedirs(frame_dir)
+        
+        # Save original frame
+        original_path = os.path.join(frame_dir, "original.jpg")
+        cv2.imwrite(original_path, frame)
+        
+        # Create and save player detections visualization
+        detections_vis = frame.copy()
+        for player in frame_data["players"]:
+            if "bbox" in player:
+                x1, y1, x2, y2 = player["bbox"]
+                # Draw bounding box
+                cv2.rectangle(detections_vis, 
+                            (int(x1), int(y1)), 
+                            (int(x2), int(y2)), 
+                            (0, 255, 0), 2)
+                # Draw player ID
+                cv2.putText(detections_vis, 
+                          player["player_id"], 
+                          (int(x1), int(y1) - 10),
+                          cv2.FONT_HERSHEY_SIMPLEX, 
+                          0.5, (0, 255, 0), 2)
+        
+        detections_path = os.path.join(frame_dir, "detections.jpg")
+        cv2.imwrite(detections_path, detections_vis)
+        
+        # Create and save tracking visualization if rink image is provided
+        tracking_path = None
+        if rink_image is not None:
+            visualizations = tracker.visualize_frame(frame, frame_data, rink_image)
+            if visualizations:
+                tracking_vis = visualizations.get("rink")
+                if tracking_vis is not None:
+                    tracking_path = os.path.join(frame_dir, "tracking.jpg")
+                    cv2.imwrite(tracking_path, tracking_vis)
+        
+        # Save frame info
+        frame_info = {
+            "frame_id": frame_idx,
+            "frame_idx": frame_idx,
+            "timestamp": (frame_idx - start_frame) / fps,
+            "players": [
+                {
+                    "player_id": p["player_id"],
+                    "type": p["type"],
+                    "bbox": p["bbox"],
+                    "reference_point": p.get("reference_point"),
+                    "confidence": p.get("confidence"),
+                    "rink_position": p.get("rink_position", None),
+                    "speed": p.get("speed", 0.0),
+                    "acceleration": p.get("acceleration", 0.0),
+                    "orientation": p.get("orientation", 0.0),
+                    "speed_ma": p.get("speed_ma", 0.0),
+                    "acceleration_ma": p.get("acceleration_ma", 0.0),
+                    "orientation_ma": p.get("orientation_ma", 0.0)
+                } for p in frame_data["players"]
+            ],
+            "homography_success": frame_data.get("homography_success", False),
+            "original_frame_path": os.path.join("frames", str(frame_idx), "original.jpg"),
+            "detections_path": os.path.join("frames", str(frame_idx), "detections.jpg")
+        }
+        
+        # Include facing direction from the orientation model if it was run
+        for player, player_info in zip(frame_data["players"], frame_info["players"]):
+            if "facing" in player:
+                player_info["facing"] = player["facing"]
+                player_info["facing_confidence"] = player["facing_confidence"]
+        
+        if tracking_path:
+            frame_info["tracking_path"] = os.path.join("frames", str(frame_idx), "tracking.jpg")
+        
+        # Include information about whether homography was interpolated
+        if frame_data.get("homography_interpolated", False):
+            frame_info["homography_interpolated"] = True
+        
+        # Include information about homography source
+        if "homography_source" in frame_data:
+            frame_info["homography_source"] = frame_data["homography_source"]
+        
+        # Mark frames whose segmentation was propagated from a keyframe
+        if frame_data.get("segmentation_propagated", False):
+            frame_info["segmentation_propagated"] = True
+        if "propagated_from" in frame_data:
+            frame_info["propagated_from"] = frame_data["propagated_from"]
+        
+        # Include detailed interpolation info if available
+        if "interpolation_details" in frame_data:
+            frame_info["interpolation_details"] = frame_data["interpolation_details"]
+        
+        # Only include homography matrix if successful
+        if frame_data.get("homography_success", False):
+            frame_info["homography_matrix"] = frame_data.get("homography_matrix", None)
+        
+        # Only include essential segmentation features
+        if "segmentation_features" in frame_data:
+            frame_info["segmentation_features"] = {
+                "features": {
+                    k: v for k, v in frame_data["segmentation_features"].get("features", {}).items()
+                    if k in ["blue_lines", "center_line", "goal_lines"]
                 }
-            
-            processed_frames_info.append(frame_info)
-            frames_processed += 1
-            
-            if frames_processed >= max_frames_to_process:
-                break
+            }
         
-        frame_idx += 1
+        processed_frames_info.append(frame_info)
+        frames_processed += 1
+        
+        if checkpoint is not None:
+            checkpoint.add_frame(frame_idx, frame_info)
+            if checkpoint.snapshot_due and tracker.drained:
+                checkpoint.save_state(frame_idx, tracker.checkpoint_state())
+    
+    # Commit the last results
+    if checkpoint is not None:
+        if frames_processed > checkpoint.frame_count:
+            checkpoint.save_state(processed_frames_info[-1]["frame_idx"], tracker.checkpoint_state())
+        checkpoint.close()
     
     # Close video
     cap.release()
+    tracker.close()
     
     # Calculate processing time
     end_time = time.time()
     processing_time = end_time - start_time
     print(f"\nProcessing complete!")
-    print(f"Processed {frames_processed} frames in {processing_time:.2f} seconds")
-    print(f"Average frame rate: {frames_processed/processing_time:.2f} fps")
+    print(f"Processed {frames_processed - resumed_frames} frames in {processing_time:.2f} seconds")
+    print(f"Average frame rate: {(frames_processed - resumed_frames)/processing_time:.2f} fps")
     
     # IMPROVED TWO-PASS INTERPOLATION:
     # Now that we have all the frames processed, do a second pass to interpolate missing homography matrices
     print("\nRunning two-pass homography interpolation...")
     tracker.interpolate_missing_homography(processed_frames_info)
     
+    # Fixed-lag smoothing re-projected players to the rink, so derive their metrics again
+    if homography_smoothing == "fixed_lag":
+        for k, frame_info in enumerate(processed_frames_info):
+            update_player_metrics(frame_info["players"], processed_frames_info[max(0, k - METRICS_WINDOW):k], fps)
+    
     # Save tracking data
-    tracking_data = {
-        "frames": processed_frames_info,
+    run_info = {
         "processing_time": processing_time,
         "frames_processed": frames_processed,
-        "fps": frames_processed/processing_time,
+        "fps": (frames_processed - resumed_frames)/processing_time,
         "video_path": video_path,
         "detection_model": detection_model_path,
         "orientation_model": orientation_model_path,
@@ -433,15 +602,30 @@ def process_clip(
     timestamp = time.strftime("%Y%m%d_%H%M%S")
     detection_data_path = os.path.join(
         output_dir, 
-        f"player_detection_data_{timestamp}.json"
+        f"player_detection_data_{timestamp}.{output_format}"
     )
     
-    with open(detection_data_path, 'w') as f:
-        json.dump(tracking_data, f, cls=NumpyEncoder, indent=2)
+    if output_format == "json":
+        with open(detection_data_path, 'w') as f:
+            json.dump({"frames": processed_frames_info, **run_info}, f, cls=NumpyEncoder, indent=2)
+    else:
+        with FrameRecordWriter(detection_data_path) as writer:
+            writer.write_all(processed_frames_info)
+            writer.write({"run": run_info})
     
     print(f"\nPlayer detection data saved to {detection_data_path}")
     print(f"File size: {os.path.getsize(detection_data_path)} bytes")
     
+    # Columns are built after the second pass, so they match the JSON output and the saved homographies
+    if track_format is not None:
+        track_columns = PlayerTrackColumns()
+        for frame_info in processed_frames_info:
+            track_columns.add_frame(frame_info)
+        tracks_dir = track_columns.save(
+            os.path.join(output_dir, "player_tracks"), track_format, tracker.homography_store
+        )
+        print(f"Saved {len(track_columns)} player observations to {tracks_dir}")
+    
     # Create HTML visualization if rink image is provided
     if rink_image is not None:
         create_html_visualization(processed_frames_info, output_dir, rink_image_path)
@@ -773,6 +957,27 @@ def main():
     parser.add_argument("--num-seconds", type=float, default=5.0, help="Number of seconds to process")
     parser.add_argument("--frame-step", type=int, default=5, help="Process every nth frame")
     parser.add_argument("--max-frames", type=int, default=60, help="Maximum number of frames to process")
+    parser.add_argument("--pipelined", action="store_true", help="Run segmentation, homography, detection and metrics as concurrent pipeline stages")
+    parser.add_argument("--queue-size", type=int, default=4, help="Maximum number of frames buffered between pipeline stages")
+    parser.add_argument("--batch-size", type=int, default=1, help="Number of frames per segmentation/detection forward pass")
+    parser.add_argument("--detect-facing", action="store_true", help="Classify which way each player is facing (batched orientation model)")
+    parser.add_argument("--headless", action="store_true", help="Skip detector visualization, display and per-frame debug images")
+    parser.add_argument("--debug-every", type=int, default=0, help="With --headless, save every Nth detector visualization in the background")
+    parser.add_argument("--history-size", type=int, default=None, help="Number of most recent frames the tracker keeps in memory (default: all)")
+    parser.add_argument("--motion-gate", type=float, default=None, help="Reuse the last keyframe's segmentation while the camera moves less than this many pixels per frame")
+    parser.add_argument("--keyframe-interval", type=int, default=30, help="With --motion-gate or --track-homography, run segmentation at least every N frames")
+    parser.add_argument("--track-homography", action="store_true", help="Track the camera between segmentation keyframes and update the homography from the tracked motion")
+    parser.add_argument("--drift-bound", type=float, default=3.0, help="With --track-homography, accumulated tracking error in pixels that triggers a new keyframe")
+    parser.add_argument("--extraction-workers", type=int, default=0, help="Number of threads extracting lines and circles from the segmentation masks (default: sequential)")
+    parser.add_argument("--homography-solver", choices=["ransac", "dlt"], default="ransac", help="Homography solver: RANSAC only, or a weighted least-squares (DLT) fit with RANSAC fallback")
+    parser.add_argument("--homography-interpolation", choices=["linear", "camera"], default="linear", help="How gaps between homographies are filled: blend matrix elements, or interpolate the camera's pan, tilt and zoom")
+    parser.add_argument("--homography-smoothing", choices=["causal", "fixed_lag"], default=None, help="Filter jitter out of the homographies: causally as frames are processed (live), or with a fixed lag in the second pass (offline)")
+    parser.add_argument("--smoothing-lag", type=int, default=15, help="With --homography-smoothing fixed_lag, number of later frames each smoothed homography uses")
+    parser.add_argument("--mask-scale", type=parse_mask_scale, default=None, help="Process segmentation masks at 'native' model resolution or this fraction of the frame size (default: full frame)")
+    parser.add_argument("--checkpoint-every", type=int, default=0, help="Append results to checkpoint.jsonl in the output directory and snapshot the tracker every N frames (default: off)")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run from the checkpoint in the output directory")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="json", help="Tracking data format: one indented JSON document, or compact JSON Lines (optionally gzip or zstd compressed)")
+    parser.add_argument("--track-format", choices=TRACK_FORMATS, default=None, help="Also write player observations as columns to player_tracks/ in the output directory: .npy files, Parquet or Arrow IPC (default: off)")
     
     args = parser.parse_args()
     
@@ -787,7 +992,28 @@ def main():
         start_second=args.start_second,
         num_seconds=args.num_seconds,
         frame_step=args.frame_step,
-        max_frames=args.max_frames
+        max_frames=args.max_frames,
+        pipelined=args.pipelined,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        detect_facing=args.detect_facing,
+        headless=args.headless,
+        debug_every=args.debug_every,
+        history_size=args.history_size,
+        mask_scale=args.mask_scale,
+        motion_gate=args.motion_gate,
+        keyframe_interval=args.keyframe_interval,
+        track_homography=args.track_homography,
+        drift_bound=args.drift_bound,
+        extraction_workers=args.extraction_workers,
+        homography_solver=args.homography_solver,
+        homography_interpolation=args.homography_interpolation,
+        homography_smoothing=args.homography_smoothing,
+        smoothing_lag=args.smoothing_lag,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+        output_format=args.output_format,
+        track_format=args.track_format
     )
 
 
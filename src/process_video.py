@@ -2,11 +2,49 @@ import cv2
 import numpy as np
 import os
 import argparse
+import itertools
 import time
 from pathlib import Path
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional, Iterator
 
-from player_tracker import PlayerTracker
+from checkpoint import RunCheckpoint
+from player_tracker import PlayerTracker, NumpyEncoder
+from segmentation_processor import parse_mask_scale
+from tracking_io import FrameRecordWriter, OUTPUT_FORMATS
+from track_columns import PlayerTrackColumns, TRACK_FORMATS, check_track_format
+
+
+def iter_video_frames(
+    cap: cv2.VideoCapture,
+    start_frame: int,
+    end_frame: int,
+    frame_step: int
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Read the frames of a video that should be processed.
+    
+    Args:
+        cap: Video capture already positioned at start_frame
+        start_frame: First frame to read
+        end_frame: Frame at which to stop reading
+        frame_step: Yield every nth frame
+        
+    Yields:
+        (frame_count, frame) pairs
+    """
+    frame_count = start_frame
+    
+    while cap.isOpened() and frame_count < end_frame:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        
+        # Process every frame_step frames
+        if (frame_count - start_frame) % frame_step == 0:
+            print(f"Processing frame {frame_count}/{end_frame} ({(frame_count - start_frame) / (end_frame - start_frame) * 100:.1f}%)")
+            yield frame_count, frame
+        
+        frame_count += 1
 
 
 def process_video(
@@ -21,7 +59,24 @@ def process_video(
     end_frame: int = None,
     frame_step: int = 1,
     visualize: bool = True,
-    save_tracking_data: bool = True
+    save_tracking_data: bool = True,
+    batch_size: int = 1,
+    headless: bool = False,
+    debug_every: int = 0,
+    history_size: Optional[int] = None,
+    history_spill: bool = False,
+    mask_scale: Optional[Any] = None,
+    motion_gate: Optional[float] = None,
+    keyframe_interval: int = 30,
+    track_homography: bool = False,
+    drift_bound: float = 3.0,
+    extraction_workers: int = 0,
+    homography_solver: str = "ransac",
+    homography_smoothing: Optional[str] = None,
+    checkpoint_every: int = 0,
+    resume: bool = False,
+    output_format: str = "json",
+    track_format: Optional[str] = None
 ) -> None:
     """
     Process a video file to track hockey players.
@@ -39,7 +94,38 @@ def process_video(
         frame_step: Process every nth frame (default: 1)
         visualize: Whether to create visualizations (default: True)
         save_tracking_data: Whether to save tracking data (default: True)
+        batch_size: Number of frames per segmentation/detection forward pass (default: 1)
+        headless: Skip detector visualization, display and per-frame debug images (default: False)
+        debug_every: With headless, save every Nth detector visualization in the background (default: 0)
+        history_size: Number of most recent frames the tracker keeps in memory (default: None, keep all)
+        history_spill: With history_size, spill older frames to output_dir/tracking_history.jsonl
+            instead of dropping them, so they are still saved (default: False)
+        mask_scale: Resolution segmentation masks are processed at: "native", a fraction of the
+            frame size, or None for full frame size (default: None)
+        motion_gate: Skip segmentation while the camera moves less than this many pixels per frame (default: None)
+        keyframe_interval: With motion_gate or track_homography, run segmentation at least every this many frames (default: 30)
+        track_homography: Skip segmentation between keyframes by tracking the camera frame to frame (default: False)
+        drift_bound: With track_homography, accumulated tracking error in pixels that triggers segmentation (default: 3.0)
+        extraction_workers: Threads extracting segmentation features in parallel, 0 for sequential (default: 0)
+        homography_solver: "ransac", or "dlt" to try a weighted least-squares fit before RANSAC (default: "ransac")
+        homography_smoothing: None, or "causal" to filter homography jitter as frames are processed; "fixed_lag"
+            needs the second pass of process_clip.py (default: None)
+        checkpoint_every: Append frames to output_dir/checkpoint.jsonl and snapshot the tracker every
+            this many frames, 0 to disable (default: 0)
+        resume: Continue from the checkpoint in output_dir; visualization videos then only cover the
+            resumed part (default: False)
+        output_format: "json" to save tracking_data.json at the end, or "jsonl", "jsonl.gz" or "jsonl.zst"
+            to stream one compact line per frame to tracking_data.<format> as frames finish (default: "json")
+        track_format: Also write player observations as columns to output_dir/player_tracks, as "npy"
+            files, "parquet" or "arrow" (both need pyarrow), with the homographies alongside (default: None)
     """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}, got {output_format!r}")
+    if track_format is not None:
+        check_track_format(track_format)
+    if homography_smoothing not in (None, "causal"):
+        raise ValueError(f"process_video only supports causal homography smoothing, got {homography_smoothing!r}")
+    
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
@@ -78,7 +164,19 @@ def process_video(
         detection_model_path=detection_model_path,
         orientation_model_path=orientation_model_path,
         rink_coordinates_path=rink_coordinates_path,
-        output_dir=output_dir
+        output_dir=output_dir,
+        headless=headless,
+        debug_every=debug_every,
+        history_size=history_size,
+        history_spill_path=os.path.join(output_dir, "tracking_history.jsonl") if history_spill else None,
+        mask_scale=mask_scale,
+        motion_gate=motion_gate,
+        keyframe_interval=keyframe_interval,
+        track_homography=track_homography,
+        drift_bound=drift_bound,
+        extraction_workers=extraction_workers,
+        homography_solver=homography_solver,
+        homography_smoothing=homography_smoothing
     )
     
     # Initialize video writers if visualizing
@@ -115,67 +213,111 @@ def process_video(
             )
     
     # Process frames
-    frame_count = 0
     processed_count = 0
+    first_frame = start_frame
     
-    # Set video to start frame
-    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-    frame_count = start_frame
+    # Append frames to a checkpoint and pick up after its last snapshot when resuming
+    checkpoint = None
+    resumed_count = 0
+    if checkpoint_every > 0 or resume:
+        checkpoint = RunCheckpoint(
+            os.path.join(output_dir, "checkpoint.jsonl"),
+            {"video_path": video_path, "start_frame": start_frame, "end_frame": end_frame, "frame_step": frame_step},
+            interval=checkpoint_every or 100,
+            resume=resume,
+            json_encoder=NumpyEncoder
+        )
+        if checkpoint.state is not None:
+            resumed_count = checkpoint.frame_count
+            tracker.restore_checkpoint_state(
+                checkpoint.state,
+                ({"frame_idx": frame_id, **frame} for frame_id, frame in checkpoint.iter_frames())
+            )
+            first_frame = checkpoint.last_frame + frame_step
+            print(f"Resuming after frame {checkpoint.last_frame} ({resumed_count} frames already processed)")
+    
+    # Stream frames to JSON Lines as they finish (frames from before a resume come from the checkpoint)
+    frame_writer = None
+    if save_tracking_data and output_format != "json":
+        frame_writer = FrameRecordWriter(os.path.join(output_dir, f"tracking_data.{output_format}"))
+        if resumed_count:
+            frame_writer.write_all(frame for _, frame in itertools.islice(checkpoint.iter_frames(), resumed_count))
+    
+    # Collect player observations as columns (frames from before a resume only have the saved fields)
+    track_columns = None
+    if track_format is not None:
+        track_columns = PlayerTrackColumns()
+        if resumed_count:
+            for _, frame in itertools.islice(checkpoint.iter_frames(), resumed_count):
+                track_columns.add_frame(frame)
+    
+    # Set video to the first frame to process
+    cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
     
     # Start timing
     start_time = time.time()
     
-    while cap.isOpened() and frame_count < end_frame:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    frames = iter_video_frames(cap, first_frame, end_frame, frame_step)
+    if batch_size > 1:
+        print(f"Using batched inference (batch size {batch_size})")
+        frame_results = tracker.process_frames_batched(frames, batch_size)
+    else:
+        frame_results = (
+            (frame_count, frame, tracker.process_frame(frame, frame_count))
+            for frame_count, frame in frames
+        )
+    
+    for frame_count, frame, frame_data in frame_results:
+        processed_count += 1
         
-        # Process every frame_step frames
-        if (frame_count - start_frame) % frame_step == 0:
-            print(f"Processing frame {frame_count}/{end_frame} ({(frame_count - start_frame) / (end_frame - start_frame) * 100:.1f}%)")
+        if track_columns is not None:
+            track_columns.add_frame(frame_data)
+        
+        if checkpoint is not None or frame_writer is not None:
+            serializable_frame = tracker.serializable_frame(frame_data)
+            if frame_writer is not None:
+                frame_writer.write(serializable_frame)
+            if checkpoint is not None:
+                checkpoint.add_frame(frame_count, serializable_frame)
+                if checkpoint.snapshot_due and tracker.drained:
+                    checkpoint.save_state(frame_count, tracker.checkpoint_state())
+        
+        # Create visualizations if enabled
+        if visualize:
+            broadcast_vis, rink_vis = tracker.visualize_frame(frame, frame_data, rink_image)
             
-            # Process frame
-            frame_data = tracker.process_frame(frame, frame_count)
-            processed_count += 1
+            # Write broadcast visualization
+            if broadcast_writer is not None:
+                broadcast_writer.write(broadcast_vis)
             
-            # Create visualizations if enabled
-            if visualize:
-                broadcast_vis, rink_vis = tracker.visualize_frame(frame, frame_data, rink_image)
+            # Write rink visualization if successful
+            if rink_vis is not None and rink_writer is not None:
+                rink_writer.write(rink_vis)
+            
+            # Create and write side-by-side visualization
+            if side_by_side_writer is not None and rink_vis is not None:
+                # Create a blank canvas for side-by-side visualization
+                side_by_side = np.zeros(
+                    (max(height, rink_image.shape[0]), width + rink_image.shape[1], 3),
+                    dtype=np.uint8
+                )
                 
-                # Write broadcast visualization
-                if broadcast_writer is not None:
-                    broadcast_writer.write(broadcast_vis)
+                # Add broadcast visualization
+                side_by_side[:height, :width] = broadcast_vis
                 
-                # Write rink visualization if successful
-                if rink_vis is not None and rink_writer is not None:
-                    rink_writer.write(rink_vis)
+                # Add rink visualization
+                side_by_side[:rink_image.shape[0], width:] = rink_vis
                 
-                # Create and write side-by-side visualization
+                # Write side-by-side visualization
+                side_by_side_writer.write(side_by_side)
+            
+            # Save individual frame visualizations
+            if processed_count <= 10:  # Save first 10 frames as images for quick review
+                cv2.imwrite(os.path.join(output_dir, f"broadcast_frame_{frame_count}.jpg"), broadcast_vis)
+                if rink_vis is not None:
+                    cv2.imwrite(os.path.join(output_dir, f"rink_frame_{frame_count}.jpg"), rink_vis)
                 if side_by_side_writer is not None and rink_vis is not None:
-                    # Create a blank canvas for side-by-side visualization
-                    side_by_side = np.zeros(
-                        (max(height, rink_image.shape[0]), width + rink_image.shape[1], 3),
-                        dtype=np.uint8
-                    )
-                    
-                    # Add broadcast visualization
-                    side_by_side[:height, :width] = broadcast_vis
-                    
-                    # Add rink visualization
-                    side_by_side[:rink_image.shape[0], width:] = rink_vis
-                    
-                    # Write side-by-side visualization
-                    side_by_side_writer.write(side_by_side)
-                
-                # Save individual frame visualizations
-                if processed_count <= 10:  # Save first 10 frames as images for quick review
-                    cv2.imwrite(os.path.join(output_dir, f"broadcast_frame_{frame_count}.jpg"), broadcast_vis)
-                    if rink_vis is not None:
-                        cv2.imwrite(os.path.join(output_dir, f"rink_frame_{frame_count}.jpg"), rink_vis)
-                    if side_by_side_writer is not None and rink_vis is not None:
-                        cv2.imwrite(os.path.join(output_dir, f"side_by_side_frame_{frame_count}.jpg"), side_by_side)
-        
-        frame_count += 1
+                    cv2.imwrite(os.path.join(output_dir, f"side_by_side_frame_{frame_count}.jpg"), side_by_side)
     
     # Calculate processing time
     total_time = time.time() - start_time
@@ -183,13 +325,30 @@ def process_video(
     
     print(f"Processed {processed_count} frames in {total_time:.2f} seconds ({fps_processing:.2f} fps)")
     
-    # Save tracking data if enabled
-    if save_tracking_data:
+    # Commit the last frames
+    if checkpoint is not None:
+        if resumed_count + processed_count > checkpoint.frame_count:
+            checkpoint.save_state(frame_count, tracker.checkpoint_state())
+        checkpoint.close()
+    
+    # Save tracking data if enabled (frames from before a resume come from the checkpoint)
+    if frame_writer is not None:
+        frame_writer.close()
+        print(f"Streamed {frame_writer.count} frames to {frame_writer.path}")
+    elif save_tracking_data:
         tracking_output = os.path.join(output_dir, "tracking_data.json")
-        tracker.save_tracking_data(tracking_output)
+        earlier_frames = itertools.islice(checkpoint.iter_frames(), resumed_count) if resumed_count else None
+        tracker.save_tracking_data(tracking_output, earlier_frames)
+    
+    if track_columns is not None:
+        tracks_dir = track_columns.save(
+            os.path.join(output_dir, "player_tracks"), track_format, tracker.homography_store
+        )
+        print(f"Saved {len(track_columns)} player observations to {tracks_dir}")
     
     # Release resources
     cap.release()
+    tracker.close()
     if broadcast_writer is not None:
         broadcast_writer.release()
     if rink_writer is not None:
@@ -218,6 +377,23 @@ def main():
     parser.add_argument("--frame-step", type=int, default=10, help="Process every nth frame")
     parser.add_argument("--no-visualize", action="store_false", dest="visualize", help="Disable visualization generation")
     parser.add_argument("--no-save", action="store_false", dest="save_tracking_data", help="Disable saving tracking data")
+    parser.add_argument("--batch-size", type=int, default=1, help="Number of frames per segmentation/detection forward pass")
+    parser.add_argument("--headless", action="store_true", help="Skip detector visualization, display and per-frame debug images")
+    parser.add_argument("--debug-every", type=int, default=0, help="With --headless, save every Nth detector visualization in the background")
+    parser.add_argument("--history-size", type=int, default=None, help="Number of most recent frames the tracker keeps in memory (default: all)")
+    parser.add_argument("--history-spill", action="store_true", help="With --history-size, spill older frames to disk instead of dropping them")
+    parser.add_argument("--motion-gate", type=float, default=None, help="Reuse the last keyframe's segmentation while the camera moves less than this many pixels per frame")
+    parser.add_argument("--keyframe-interval", type=int, default=30, help="With --motion-gate or --track-homography, run segmentation at least every N frames")
+    parser.add_argument("--track-homography", action="store_true", help="Track the camera between segmentation keyframes and update the homography from the tracked motion")
+    parser.add_argument("--drift-bound", type=float, default=3.0, help="With --track-homography, accumulated tracking error in pixels that triggers a new keyframe")
+    parser.add_argument("--extraction-workers", type=int, default=0, help="Number of threads extracting lines and circles from the segmentation masks (default: sequential)")
+    parser.add_argument("--homography-solver", choices=["ransac", "dlt"], default="ransac", help="Homography solver: RANSAC only, or a weighted least-squares (DLT) fit with RANSAC fallback")
+    parser.add_argument("--homography-smoothing", choices=["causal"], default=None, help="Filter jitter out of the homographies causally as frames are processed (fixed_lag needs process_clip.py's second pass)")
+    parser.add_argument("--mask-scale", type=parse_mask_scale, default=None, help="Process segmentation masks at 'native' model resolution or this fraction of the frame size (default: full frame)")
+    parser.add_argument("--checkpoint-every", type=int, default=0, help="Append frames to checkpoint.jsonl in the output directory and snapshot the tracker every N frames (default: off)")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run from the checkpoint in the output directory")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="json", help="Tracking data format: one indented JSON document written at the end, or compact JSON Lines (optionally gzip or zstd compressed) streamed as frames finish")
+    parser.add_argument("--track-format", choices=TRACK_FORMATS, default=None, help="Also write player observations as columns to player_tracks/ in the output directory: .npy files, Parquet or Arrow IPC (default: off)")
     
     args = parser.parse_args()
     
@@ -233,7 +409,24 @@ def main():
         end_frame=args.end_frame,
         frame_step=args.frame_step,
         visualize=args.visualize,
-        save_tracking_data=args.save_tracking_data
+        save_tracking_data=args.save_tracking_data,
+        batch_size=args.batch_size,
+        headless=args.headless,
+        debug_every=args.debug_every,
+        history_size=args.history_size,
+        history_spill=args.history_spill,
+        mask_scale=args.mask_scale,
+        motion_gate=args.motion_gate,
+        keyframe_interval=args.keyframe_interval,
+        track_homography=args.track_homography,
+        drift_bound=args.drift_bound,
+        extraction_workers=args.extraction_workers,
+        homography_solver=args.homography_solver,
+        homography_smoothing=args.homography_smoothing,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+        output_format=args.output_format,
+        track_format=args.track_format
     )
 
 
@@ -2,8 +2,11 @@ import os
 import cv2
 import numpy as np
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from ultralytics import YOLO
-from typing import Dict, List
+from circle_tracker import CircleTracker
+from feature_geometry import normalize_feature_geometry
+from typing import Dict, List, Optional, Tuple, Union
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,6 +20,97 @@ RINK_CLASS_MAPPING = {
     5: "FaceoffCircle"
 }
 
+# Ways SegmentationProcessor can return the per-class masks
+MASK_OUTPUT_MODES = ("full", "features", "rle", "packed")
+
+# Classes geometry is extracted from (other classes, e.g. Rink, are only kept as masks)
+LINE_CLASSES = ("BlueLine", "RedCenterLine", "GoalLine")
+CIRCLE_CLASSES = ("RedCircle", "FaceoffCircle")
+
+
+def parse_mask_scale(value: str) -> Union[str, float]:
+    """
+    Parse a --mask-scale command-line value ("native" or a fraction in (0, 1]).
+    
+    Args:
+        value: Command-line string
+        
+    Returns:
+        "native" or the scale as a float
+    """
+    if value == "native":
+        return value
+    scale = float(value)
+    if not 0 < scale <= 1:
+        raise ValueError(f"mask scale must be 'native' or in (0, 1], got {value}")
+    return scale
+
+
+def encode_mask_rle(mask: np.ndarray) -> Dict:
+    """
+    Run-length encode a binary mask.
+    
+    Args:
+        mask: 2D boolean mask
+        
+    Returns:
+        Dictionary with the mask "size" (height, width) and "counts", the
+        lengths of alternating runs of False and True pixels in row-major
+        order, starting with a (possibly empty) run of False
+    """
+    flat = np.asarray(mask, dtype=bool).ravel()
+    # Positions where the value changes, plus both ends
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    boundaries = np.concatenate(([0], changes, [flat.size]))
+    counts = np.diff(boundaries)
+    if flat.size and flat[0]:
+        counts = np.concatenate(([0], counts))
+    return {"size": list(mask.shape), "counts": counts.tolist()}
+
+
+def decode_mask_rle(rle: Dict) -> np.ndarray:
+    """
+    Decode a mask produced by encode_mask_rle.
+    
+    Args:
+        rle: Dictionary with "size" and "counts"
+        
+    Returns:
+        2D boolean mask
+    """
+    counts = np.asarray(rle["counts"], dtype=np.int64)
+    values = np.arange(len(counts)) % 2 == 1
+    return np.repeat(values, counts).reshape(rle["size"])
+
+
+def pack_mask(mask: np.ndarray) -> Dict:
+    """
+    Bit-pack a binary mask (one bit per pixel).
+    
+    Args:
+        mask: 2D boolean mask
+        
+    Returns:
+        Dictionary with the mask "size" (height, width) and packed "bits" (uint8 array)
+    """
+    return {"size": list(mask.shape), "bits": np.packbits(np.asarray(mask, dtype=bool))}
+
+
+def unpack_mask(packed: Dict) -> np.ndarray:
+    """
+    Unpack a mask produced by pack_mask.
+    
+    Args:
+        packed: Dictionary with "size" and "bits"
+        
+    Returns:
+        2D boolean mask
+    """
+    height, width = packed["size"]
+    bits = np.unpackbits(np.asarray(packed["bits"], dtype=np.uint8), count=height * width)
+    return bits.reshape(height, width).astype(bool)
+
+
 class SegmentationProcessor:
     """Process frames through a segmentation model."""
     
@@ -25,6 +119,10 @@ class SegmentationProcessor:
         model_path: str,
         confidence_threshold: float = 0.25,
         iou_threshold: float = 0.7,
+        max_tracked_circles: int = 64,
+        mask_output: str = "full",
+        mask_scale: Optional[Union[str, float]] = None,
+        extraction_workers: int = 0,
     ):
         """
         Initialize the SegmentationProcessor.
@@ -33,20 +131,54 @@ class SegmentationProcessor:
             model_path: Path to the segmentation model
             confidence_threshold: Confidence threshold for detection
             iou_threshold: IoU threshold for NMS
+            max_tracked_circles: Maximum number of circles remembered between
+                frames; the least recently seen are forgotten first
+            mask_output: How masks are returned with the features: "full"
+                (colored mask and per-class bool masks), "features" (geometry
+                only, no masks), "rle" (run-length encoded per-class masks) or
+                "packed" (bit-packed per-class masks)
+            mask_scale: Resolution masks are merged and features extracted
+                at: None for full frame size, "native" for the model's mask
+                resolution, or a fraction of the frame size (e.g. 0.5).
+                Extracted geometry is rescaled to frame coordinates.
+            extraction_workers: Number of threads extracting lines and
+                circles from the class masks concurrently (0 or 1 extracts
+                them one class at a time)
         """
+        if mask_output not in MASK_OUTPUT_MODES:
+            raise ValueError(f"mask_output must be one of {MASK_OUTPUT_MODES}, got {mask_output!r}")
+        if mask_scale is not None and mask_scale != "native" and not 0 < float(mask_scale) <= 1:
+            raise ValueError(f"mask_scale must be None, 'native' or in (0, 1], got {mask_scale!r}")
+
         self.model_path = model_path
         self.confidence_threshold = confidence_threshold
         self.iou_threshold = iou_threshold
+        self.mask_output = mask_output
+        self.mask_scale = mask_scale
         
         # Add state for tracking circles between frames
-        self.prev_circles = {}  # Maps circle_id to (x, y, frame_last_seen)
-        self.next_circle_id = 0  # Counter for assigning unique IDs
-        self.max_frames_to_keep = 10  # How many frames to remember circles
-        self.max_dist_for_match = 100  # Maximum pixel distance to consider same circle
+        self.circle_tracker = CircleTracker(
+            max_dist_for_match=100,  # Maximum pixel distance to consider same circle
+            max_frames_to_keep=10,  # How many frames to remember circles
+            max_tracked=max_tracked_circles  # Hard cap on remembered circles
+        )
+        
+        # OpenCV releases the GIL, so class masks can be processed in parallel threads
+        self._extraction_pool = None
+        if extraction_workers > 1:
+            self._extraction_pool = ThreadPoolExecutor(
+                max_workers=extraction_workers, thread_name_prefix="mask-features"
+            )
         
         # Load the model
         self._load_model()
     
+    def close(self) -> None:
+        """Shut down the feature extraction threads, if any."""
+        if self._extraction_pool is not None:
+            self._extraction_pool.shutdown()
+            self._extraction_pool = None
+    
     def _load_model(self):
         """Load the segmentation model."""
         if not os.path.exists(self.model_path):
@@ -60,7 +192,8 @@ class SegmentationProcessor:
             raise
     
     def process_frame(
-        self, frame: np.ndarray, frame_id: int = None, output_dir: str = None
+        self, frame: np.ndarray, frame_id: int = None, output_dir: str = None,
+        mask_output: Optional[str] = None
     ) -> Dict[str, List[Dict]]:
         """
         Process a single frame through the segmentation model.
@@ -69,6 +202,7 @@ class SegmentationProcessor:
             frame: The frame to process
             frame_id: Optional frame identifier for saving debug images
             output_dir: Optional directory to save debug outputs
+            mask_output: Overrides the processor's mask_output for this call
             
         Returns:
             Dictionary containing segmentation results
@@ -81,146 +215,322 @@ class SegmentationProcessor:
             logger.warning("No segmentation results produced")
             return {"segmentation_mask": None, "features": {}}
         
-        result = results[0]
+        return self._process_result(results[0], frame, frame_id, output_dir, mask_output)
+    
+    def process_batch(
+        self, frames: List[np.ndarray], frame_ids: List[int] = None, output_dir: str = None,
+        mask_output: Optional[str] = None
+    ) -> List[Dict[str, List[Dict]]]:
+        """
+        Process several frames through the segmentation model in one forward pass.
+        
+        Results are post-processed in input order, so circle tracking state
+        advances exactly as if each frame had gone through process_frame.
+        
+        Args:
+            frames: The frames to process
+            frame_ids: Optional frame identifiers for saving debug images
+            output_dir: Optional directory to save debug outputs
+            mask_output: Overrides the processor's mask_output for this call
+            
+        Returns:
+            List with one segmentation result per input frame, in the same
+            format as process_frame
+        """
+        if not frames:
+            return []
+        if frame_ids is None:
+            frame_ids = [None] * len(frames)
+        
+        # One result per input image, in input order
+        results = self.model(list(frames))
+        
+        if len(results) != len(frames):
+            logger.warning(
+                f"Segmentation produced {len(results)} results for {len(frames)} frames"
+            )
+        
+        batch_results = []
+        for i, (frame, frame_id) in enumerate(zip(frames, frame_ids)):
+            if i < len(results):
+                batch_results.append(
+                    self._process_result(results[i], frame, frame_id, output_dir, mask_output)
+                )
+            else:
+                batch_results.append({"segmentation_mask": None, "features": {}})
+        
+        return batch_results
+    
+    def _process_result(
+        self, result, frame: np.ndarray, frame_id: int = None, output_dir: str = None,
+        mask_output: Optional[str] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Turn the model output for one frame into class masks and features.
+        
+        Args:
+            result: Segmentation result for a single frame
+            frame: The frame the result belongs to
+            frame_id: Optional frame identifier for saving debug images
+            output_dir: Optional directory to save debug outputs
+            mask_output: Mask output mode (defaults to the processor's mask_output)
+            
+        Returns:
+            Dictionary containing segmentation results
+        """
+        mask_output = mask_output or self.mask_output
         features = {}
         
         if hasattr(result, 'masks') and result.masks is not None:
             masks = result.masks.data
             if len(masks) > 0:
                 # Extract classes from results
-                classes = result.boxes.cls.cpu().numpy()
+                classes = result.boxes.cls.cpu().numpy().astype(int)
+                
+                # Move every instance mask to the CPU in one transfer
+                mask_array = masks.cpu().numpy()
+                
+                # Resolution the masks are merged and processed at
+                frame_h, frame_w = frame.shape[:2]
+                work_h, work_w = self._working_size((frame_h, frame_w), tuple(mask_array.shape[1:]))
+                scale = (frame_w / work_w, frame_h / work_h)
                 
-                # Create mask by class
+                # Masks leaving this method are always at frame size
+                needs_masks = mask_output != "features" or (output_dir and frame_id is not None)
+                
+                # Create mask by class: reduce each class's instances, then resize once
+                # (classes are visited in order of first appearance, like the instances)
                 mask_by_class = {}
                 
-                for i, mask in enumerate(masks):
-                    class_idx = int(classes[i])
+                class_indices, first_seen = np.unique(classes, return_index=True)
+                for class_idx in class_indices[np.argsort(first_seen)]:
+                    class_name = self._class_name(int(class_idx))
                     
-                    # Convert class index to name using mapping if possible
-                    if hasattr(self.model, 'names') and self.model.names:
-                        class_name = self.model.names.get(
-                            class_idx, f"class_{class_idx}"
-                        )
-                    else:
-                        # Use hardcoded mapping if model doesn't provide names
-                        class_name = RINK_CLASS_MAPPING.get(
-                            class_idx, f"class_{class_idx}"
-                        )
+                    # Classes without geometry (the large Rink mask) are only needed as masks
+                    if not needs_masks and class_name not in LINE_CLASSES + CIRCLE_CLASSES:
+                        continue
                     
-                    # Create or update mask for this class
-                    if class_name not in mask_by_class:
-                        mask_by_class[class_name] = np.zeros(
-                            (frame.shape[0], frame.shape[1]), dtype=bool
-                        )
+                    class_mask = mask_array[classes == class_idx].max(axis=0).astype(np.uint8)
+                    if class_mask.shape != (work_h, work_w):
+                        class_mask = cv2.resize(class_mask, (work_w, work_h))
                     
-                    # Convert mask tensor to numpy and add to class mask
-                    numpy_mask = mask.cpu().numpy()
-                    resized_mask = cv2.resize(
-                        numpy_mask.astype(np.uint8),
-                        (frame.shape[1], frame.shape[0])
-                    )
-                    mask_by_class[class_name] = np.logical_or(
-                        mask_by_class[class_name], 
-                        resized_mask > 0
-                    )
+                    if class_name in mask_by_class:
+                        mask_by_class[class_name] |= class_mask > 0
+                    else:
+                        mask_by_class[class_name] = class_mask > 0
                 
                 # Extract features from segmentation masks
-                features = self._extract_features_from_segmentation(mask_by_class)
+                features = self._extract_features_from_segmentation(mask_by_class, scale)
                 
-                # Create colored segmentation mask for visualization
-                colored_mask = np.zeros((*frame.shape[:2], 3), dtype=np.uint8)
-                
-                # Color mapping for different classes
-                color_map = {
-                    "Rink": (0, 200, 0),       # Green
-                    "BlueLine": (255, 0, 0),   # Blue
-                    "RedCenterLine": (0, 0, 255),  # Red
-                    "GoalLine": (255, 0, 255),  # Magenta
-                    "RedCircle": (0, 255, 255),  # Yellow
-                    "FaceoffCircle": (255, 255, 0)  # Cyan
-                }
-                
-                # Apply colors to the mask
-                for class_name, mask in mask_by_class.items():
-                    if class_name in color_map:
-                        color = color_map[class_name]
-                        colored_mask[mask] = color
+                if needs_masks and (work_h, work_w) != (frame_h, frame_w):
+                    mask_by_class = {
+                        class_name: cv2.resize(
+                            mask.astype(np.uint8), (frame_w, frame_h), interpolation=cv2.INTER_NEAREST
+                        ) > 0
+                        for class_name, mask in mask_by_class.items()
+                    }
                 
                 # Save debug visualizations if requested
+                vis_img = None
                 if output_dir and frame_id is not None:
                     vis_img = self._save_debug_visualizations(
                         frame, mask_by_class, features, output_dir, frame_id
                     )
                 
-                # Return colored mask with features and overlay visualization
-                return {
-                    "segmentation_mask": colored_mask,
+                segmentation_result = {
+                    "segmentation_mask": None,
                     "features": features,
-                    "raw_masks": mask_by_class,
-                    "overlay_visualization": (
-                        vis_img if output_dir and frame_id is not None else None
-                    )
+                    # Feature points as arrays, parsed once for the homography calculator
+                    "geometry": normalize_feature_geometry(features),
+                    "overlay_visualization": None
                 }
+                
+                if mask_output == "full":
+                    # Colored mask, raw per-class masks and overlay visualization
+                    segmentation_result["segmentation_mask"] = self._colorize_masks(mask_by_class, frame.shape)
+                    segmentation_result["raw_masks"] = mask_by_class
+                    segmentation_result["overlay_visualization"] = vis_img
+                elif mask_output == "rle":
+                    segmentation_result["raw_masks"] = {
+                        class_name: encode_mask_rle(mask) for class_name, mask in mask_by_class.items()
+                    }
+                elif mask_output == "packed":
+                    segmentation_result["raw_masks"] = {
+                        class_name: pack_mask(mask) for class_name, mask in mask_by_class.items()
+                    }
+                
+                return segmentation_result
         
         # If we didn't get any masks, return empty results
         return {"segmentation_mask": None, "features": {}}
 
+    def _class_name(self, class_idx: int) -> str:
+        """Map a model class index to a rink class name."""
+        # Convert class index to name using mapping if possible
+        if hasattr(self.model, 'names') and self.model.names:
+            return self.model.names.get(class_idx, f"class_{class_idx}")
+        # Use hardcoded mapping if model doesn't provide names
+        return RINK_CLASS_MAPPING.get(class_idx, f"class_{class_idx}")
+    
+    def _working_size(self, frame_size: Tuple[int, int], mask_size: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Get the (height, width) masks are merged and processed at.
+        
+        Args:
+            frame_size: (height, width) of the frame
+            mask_size: (height, width) of the model's instance masks
+            
+        Returns:
+            (height, width) of the working resolution
+        """
+        if self.mask_scale is None:
+            return frame_size
+        if self.mask_scale == "native":
+            return mask_size
+        scale = float(self.mask_scale)
+        return max(1, int(round(frame_size[0] * scale))), max(1, int(round(frame_size[1] * scale)))
+    
+    def _colorize_masks(self, mask_by_class: Dict[str, np.ndarray], frame_shape: tuple) -> np.ndarray:
+        """
+        Create a colored segmentation mask for visualization.
+        
+        Args:
+            mask_by_class: Dictionary mapping class names to mask arrays
+            frame_shape: Shape of the frame the masks belong to
+            
+        Returns:
+            BGR image with each class painted in its color
+        """
+        colored_mask = np.zeros((*frame_shape[:2], 3), dtype=np.uint8)
+        
+        # Color mapping for different classes
+        color_map = {
+            "Rink": (0, 200, 0),       # Green
+            "BlueLine": (255, 0, 0),   # Blue
+            "RedCenterLine": (0, 0, 255),  # Red
+            "GoalLine": (255, 0, 255),  # Magenta
+            "RedCircle": (0, 255, 255),  # Yellow
+            "FaceoffCircle": (255, 255, 0)  # Cyan
+        }
+        
+        # Apply colors to the mask
+        for class_name, mask in mask_by_class.items():
+            if class_name in color_map:
+                color = color_map[class_name]
+                colored_mask[mask] = color
+        
+        return colored_mask
+    
     def _extract_features_from_segmentation(
-        self, mask_by_class: Dict[str, np.ndarray]
+        self, mask_by_class: Dict[str, np.ndarray], scale: Tuple[float, float] = (1.0, 1.0)
     ) -> Dict[str, List[Dict]]:
         """
         Extract features from segmentation masks.
         
         Args:
             mask_by_class: Dictionary mapping class names to mask arrays
+            scale: (x, y) factors from mask coordinates to frame coordinates
             
         Returns:
-            Dictionary containing extracted features
+            Dictionary containing extracted features, in frame coordinates
         """
         features = {}
         
-        # Process each class mask
-        for class_name, mask in mask_by_class.items():
-            # Convert mask to uint8 for contour detection (0-255)
-            mask_uint8 = (mask * 255).astype(np.uint8)
-            
+        # Contours and ellipse fits are independent per class, so they can run
+        # in parallel; circle tracking is stateful and runs afterwards in mask order
+        class_masks = [
+            (class_name, mask) for class_name, mask in mask_by_class.items()
+            if class_name in LINE_CLASSES + CIRCLE_CLASSES
+        ]
+        if self._extraction_pool is not None and len(class_masks) > 1:
+            geometry = list(self._extraction_pool.map(
+                lambda item: self._extract_class_geometry(item[0], item[1], scale), class_masks
+            ))
+        else:
+            geometry = [self._extract_class_geometry(class_name, mask, scale) for class_name, mask in class_masks]
+        
+        # Merge in mask order so the output does not depend on thread timing
+        for (class_name, _), class_geometry in zip(class_masks, geometry):
             # Skip masks with no content
-            mask_sum = np.sum(mask_uint8)
-            if mask_sum == 0:
+            if class_geometry is None:
                 continue
             
-            # Add debug logging for BlueLine class
-            if class_name == "BlueLine":
-                logger.info(f"BlueLine mask sum: {mask_sum}")
-                logger.info(f"BlueLine mask unique values: {np.unique(mask_uint8)}")
-            
-            # Log which classes are being processed
-            logger.info(f"Processing mask for class: {class_name}")
-            
-            # Extract appropriate features based on class name
-            if class_name in ["BlueLine", "RedCenterLine", "GoalLine"]:
-                # For lines, extract line segments
-                features[class_name] = self._extract_line_segments(mask_uint8, class_name)
-            elif class_name in ["RedCircle", "FaceoffCircle"]:
-                # For circles, extract ellipses
-                if class_name == "RedCircle":
-                    # Treat RedCircle as FaceoffCircle since that's what they actually are
-                    circle_features = self._extract_circles(mask_uint8)
-                    if circle_features:
-                        if "FaceoffCircle" not in features:
-                            features["FaceoffCircle"] = []
-                        features["FaceoffCircle"].extend(circle_features)
-                        logger.info(f"Converted {len(circle_features)} RedCircle features to FaceoffCircle")
-                else:
-                    features[class_name] = self._extract_circles(mask_uint8)
+            if class_name in LINE_CLASSES:
+                features[class_name] = class_geometry
+            elif class_name == "RedCircle":
+                # Treat RedCircle as FaceoffCircle since that's what they actually are
+                circle_features = self._track_circles(class_geometry)
+                if circle_features:
+                    if "FaceoffCircle" not in features:
+                        features["FaceoffCircle"] = []
+                    features["FaceoffCircle"].extend(circle_features)
+                    logger.info(f"Converted {len(circle_features)} RedCircle features to FaceoffCircle")
+            else:
+                features[class_name] = self._track_circles(class_geometry)
         
         # Remove the synthetic faceoff circle code since we're using the detected ones
         # If no faceoff circles were detected, we're fine with that
         
         return features
 
-    def _extract_line_segments(self, binary_mask, class_name=None):
-        """Extract line segments from binary mask."""
+    def _extract_class_geometry(
+        self, class_name: str, mask: np.ndarray, scale: Tuple[float, float]
+    ) -> Optional[List[Dict]]:
+        """
+        Extract the geometry of one class mask without touching tracking state.
+        
+        Safe to run for several classes at once from worker threads.
+        
+        Args:
+            class_name: Class of the mask (a line or circle class)
+            mask: Boolean class mask
+            scale: (x, y) factors from mask coordinates to frame coordinates
+            
+        Returns:
+            Line features in frame coordinates for line classes, untracked
+            ellipses (see _fit_ellipses) for circle classes, or None if the
+            mask is empty
+        """
+        # Convert mask to uint8 for contour detection (0-255)
+        mask_uint8 = (mask * 255).astype(np.uint8)
+        
+        # Skip masks with no content
+        mask_sum = np.sum(mask_uint8)
+        if mask_sum == 0:
+            return None
+        
+        # Add debug logging for BlueLine class
+        if class_name == "BlueLine":
+            logger.info(f"BlueLine mask sum: {mask_sum}")
+            logger.info(f"BlueLine mask unique values: {np.unique(mask_uint8)}")
+        
+        # Log which classes are being processed
+        logger.info(f"Processing mask for class: {class_name}")
+        
+        if class_name in LINE_CLASSES:
+            # For lines, extract line segments
+            return self._rescale_line_features(
+                self._extract_line_segments(mask_uint8, class_name, scale), scale
+            )
+        # For circles, fit ellipses
+        return self._fit_ellipses(mask_uint8, scale=scale)
+    
+    def _rescale_line_features(self, line_features: List[Dict], scale: Tuple[float, float]) -> List[Dict]:
+        """Scale line feature points from mask coordinates to frame coordinates."""
+        sx, sy = scale
+        if sx == 1.0 and sy == 1.0:
+            return line_features
+        for feature in line_features:
+            feature['points'] = [
+                {"x": int(round(p["x"] * sx)), "y": int(round(p["y"] * sy))}
+                for p in feature['points']
+            ]
+        return line_features
+    
+    def _extract_line_segments(self, binary_mask, class_name=None, scale=(1.0, 1.0)):
+        """Extract line segments from binary mask (scale maps mask pixels to frame pixels)."""
+        # Area thresholds are given in frame pixels
+        area_scale = scale[0] * scale[1]
         # Special handling for blue lines to ensure proper separation
         if class_name == "BlueLine":
             # Get the center line position
@@ -248,7 +558,7 @@ class SegmentationProcessor:
             )
             
             # Filter and process contours
-            min_area = 200
+            min_area = 200 / area_scale
             all_points = []  # Single list for all points
             
             # Process left contours
@@ -288,7 +598,7 @@ class SegmentationProcessor:
         )
 
         # Filter out very small contours (noise)
-        min_area = 200  # Increased from 100
+        min_area = 200 / area_scale  # Increased from 100
         contours = [cnt for cnt in contours if cv2.contourArea(cnt) > min_area]
         
         # Special handling for goal lines to connect broken segments
@@ -363,27 +673,44 @@ class SegmentationProcessor:
         
         return [{'points': points}]
 
-    def _extract_circles(self, mask: np.ndarray, min_radius: int = 10) -> List[Dict]:
+    def _extract_circles(self, mask: np.ndarray, min_radius: int = 10, scale: Tuple[float, float] = (1.0, 1.0)) -> List[Dict]:
         """
         Extract elliptical shapes from a binary mask and maintain consistent labeling.
         
         Args:
             mask: Binary mask containing circle/ellipse objects
-            min_radius: Minimum equivalent radius for shapes to be considered
+            min_radius: Minimum equivalent radius for shapes to be considered (frame pixels)
+            scale: (x, y) factors from mask coordinates to frame coordinates;
+                ellipses are converted to frame coordinates before matching
             
         Returns:
             List of dictionaries containing ellipse information with consistent IDs
         """
+        return self._track_circles(self._fit_ellipses(mask, min_radius, scale))
+    
+    def _fit_ellipses(self, mask: np.ndarray, min_radius: int = 10, scale: Tuple[float, float] = (1.0, 1.0)) -> List[Dict]:
+        """
+        Fit ellipses to the shapes in a binary mask (no tracking state is used).
+        
+        Args:
+            mask: Binary mask containing circle/ellipse objects
+            min_radius: Minimum equivalent radius for shapes to be considered (frame pixels)
+            scale: (x, y) factors from mask coordinates to frame coordinates
+            
+        Returns:
+            List of ellipses in frame coordinates, without circle IDs
+        """
         # Find contours in the mask
         contours, _ = cv2.findContours(
             mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
         )
         
         # Extract circles without IDs first
+        sx, sy = scale
         current_circles = []
         for contour in contours:
-            # Get the area of the contour
-            area = cv2.contourArea(contour)
+            # Get the area of the contour (in frame pixels)
+            area = cv2.contourArea(contour) * sx * sy
             
             # Skip small contours
             if area < np.pi * min_radius ** 2:
@@ -398,6 +725,12 @@ class SegmentationProcessor:
                 ellipse = cv2.fitEllipse(contour)
                 (x, y), (major_axis, minor_axis), angle = ellipse
                 
+                # Map the ellipse to frame coordinates
+                if sx != 1.0 or sy != 1.0:
+                    (x, y), (major_axis, minor_axis), angle = self._rescale_ellipse(
+                        (x, y), (major_axis, minor_axis), angle, sx, sy
+                    )
+                
                 # Calculate equivalent radius (geometric mean of semi-axes)
                 equivalent_radius = np.sqrt(major_axis * minor_axis) / 2
                 
@@ -415,46 +748,24 @@ class SegmentationProcessor:
             except cv2.error:
                 continue
         
-        # Remove old circles from tracking
-        current_frame = getattr(self, 'current_frame', 0)
-        self.prev_circles = {
-            circle_id: info for circle_id, info in self.prev_circles.items()
-            if current_frame - info[2] <= self.max_frames_to_keep
-        }
-        
-        # Match current circles with previous circles
-        matched_circles = []
-        used_prev_circles = set()
+        return current_circles
+    
+    def _track_circles(self, current_circles: List[Dict]) -> List[Dict]:
+        """
+        Assign consistent IDs to this frame's ellipses by matching earlier frames.
         
+        Args:
+            current_circles: Ellipses from _fit_ellipses
+            
+        Returns:
+            List of dictionaries containing ellipse information with consistent IDs
+        """
         # Sort circles by x-coordinate for more stable matching
         current_circles.sort(key=lambda c: c['x'])
+        circle_ids = self.circle_tracker.update([(c['x'], c['y']) for c in current_circles])
         
-        for circle in current_circles:
-            best_match_id = None
-            best_match_dist = float('inf')
-            
-            # Find the closest previous circle
-            for circle_id, (prev_x, prev_y, _) in self.prev_circles.items():
-                if circle_id in used_prev_circles:
-                    continue
-                    
-                dist = np.sqrt((circle['x'] - prev_x)**2 + (circle['y'] - prev_y)**2)
-                if dist < self.max_dist_for_match and dist < best_match_dist:
-                    best_match_id = circle_id
-                    best_match_dist = dist
-            
-            if best_match_id is not None:
-                # Update existing circle
-                circle_id = best_match_id
-                used_prev_circles.add(circle_id)
-            else:
-                # Create new circle ID
-                circle_id = self.next_circle_id
-                self.next_circle_id += 1
-            
-            # Update tracking state
-            self.prev_circles[circle_id] = (circle['x'], circle['y'], current_frame)
-            
+        matched_circles = []
+        for circle, circle_id in zip(current_circles, circle_ids):
             # Create final circle dict with consistent ID
             circle_dict = {
                 "points": [{"x": int(circle['x']), "y": int(circle['y'])}],
@@ -466,11 +777,22 @@ class SegmentationProcessor:
             }
             matched_circles.append(circle_dict)
         
-        # Increment frame counter
-        setattr(self, 'current_frame', current_frame + 1)
-        
         return matched_circles
 
+    def _rescale_ellipse(self, center, axes, angle, sx, sy):
+        """
+        Approximate an ellipse under a non-uniform (sx, sy) scaling.
+        
+        Each axis is stretched by the scale along its own direction and the
+        angle follows the first axis; exact for uniform scaling.
+        """
+        theta = np.radians(angle)
+        cos_t, sin_t = np.cos(theta), np.sin(theta)
+        axis_0 = axes[0] * np.hypot(sx * cos_t, sy * sin_t)
+        axis_1 = axes[1] * np.hypot(sx * sin_t, sy * cos_t)
+        new_angle = np.degrees(np.arctan2(sy * sin_t, sx * cos_t)) % 180.0
+        return (center[0] * sx, center[1] * sy), (axis_0, axis_1), new_angle
+    
     def _save_debug_visualizations(self, frame: np.ndarray, mask_by_class: Dict[str, np.ndarray], 
                                   features: Dict[str, List[Dict]], output_dir: str, frame_id: int) -> np.ndarray:
         """
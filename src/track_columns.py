@@ -0,0 +1,220 @@
+import os
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+from homography_store import HomographyStore
+
+
+# Formats the track table can be written in; parquet and arrow need pyarrow
+TRACK_FORMATS = ("npy", "parquet", "arrow")
+
+# Per-observation float columns (NaN where a value is missing)
+FLOAT_COLUMNS = (
+    "bbox_x1", "bbox_y1", "bbox_x2", "bbox_y2",
+    "ref_x", "ref_y",
+    "rink_x", "rink_y",
+    "speed", "acceleration", "orientation", "confidence"
+)
+
+# File names inside a track directory
+TRACKS_FILES = {"parquet": "tracks.parquet", "arrow": "tracks.arrow"}
+HOMOGRAPHY_FILES = {
+    "matrices": "homographies.npy",
+    "frame_ids": "homography_frame_ids.npy",
+    "sources": "homography_sources.npy"
+}
+
+
+def _xy(value: Any) -> Tuple[float, float]:
+    """Get (x, y) from a point stored as a {"x", "y"} dict or an [x, y] sequence."""
+    if value is None or len(value) == 0:
+        return np.nan, np.nan
+    if isinstance(value, dict):
+        return value.get("x", np.nan), value.get("y", np.nan)
+    return value[0], value[1]
+
+
+def check_track_format(fmt: str) -> None:
+    """
+    Check that tracks can be written in a format, before any frames are processed.
+
+    Args:
+        fmt: One of TRACK_FORMATS
+
+    Raises:
+        ValueError: If the format is unknown
+        ImportError: If the format needs pyarrow and it is not installed
+    """
+    if fmt not in TRACK_FORMATS:
+        raise ValueError(f"track format must be one of {TRACK_FORMATS}, got {fmt!r}")
+    if fmt != "npy":
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError(f"Writing {fmt} tracks requires the pyarrow package (pip install pyarrow)")
+
+
+def _float(value: Any) -> float:
+    return np.nan if value is None else float(value)
+
+
+class PlayerTrackColumns:
+    """
+    Columnar table of player observations, one row per player per frame.
+
+    Rows are appended as frames finish into growable NumPy columns (float
+    columns share one (N, 12) array), so no per-row dicts are kept. The table
+    is saved to a directory, either as one memory-mappable .npy file per
+    column or, when pyarrow is installed, as a Parquet or Arrow IPC file.
+    The clip's homographies are saved next to it as an (N, 3, 3) array with
+    their frame ids and HomographySource codes. load_player_tracks reads
+    any of these layouts back into NumPy arrays.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        """
+        Initialize an empty table.
+
+        Args:
+            capacity: Number of rows to allocate room for up front; the
+                arrays grow by doubling when full
+        """
+        capacity = max(1, capacity)
+        self._frame_ids = np.zeros(capacity, dtype=np.int64)
+        self._values = np.full((capacity, len(FLOAT_COLUMNS)), np.nan)
+        self._track_ids = []
+        self._classes = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._frame_ids)
+        self._frame_ids = np.resize(self._frame_ids, capacity)
+        values = np.full((capacity, len(FLOAT_COLUMNS)), np.nan)
+        values[:self._size] = self._values[:self._size]
+        self._values = values
+
+    def add_frame(self, frame_data: Dict) -> None:
+        """
+        Append one row per player of a frame record.
+
+        Args:
+            frame_data: Frame record with "frame_id" (or "frame_idx") and "players"
+        """
+        frame_id = frame_data.get("frame_id", frame_data.get("frame_idx"))
+        for player in frame_data.get("players", []):
+            if self._size == len(self._frame_ids):
+                self._grow()
+            row = self._size
+            bbox = player.get("bbox")
+            if bbox is None:
+                bbox = [np.nan] * 4
+            self._frame_ids[row] = frame_id
+            self._values[row] = (
+                *bbox[:4],
+                *_xy(player.get("reference_point")),
+                *_xy(player.get("rink_position")),
+                _float(player.get("speed")),
+                _float(player.get("acceleration")),
+                _float(player.get("orientation")),
+                _float(player.get("confidence"))
+            )
+            self._track_ids.append(str(player.get("player_id", "")))
+            self._classes.append(str(player.get("type", "")))
+            self._size += 1
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        Get the table as NumPy columns.
+
+        Returns:
+            Dictionary of (N,) arrays: frame_id, track_id and class (unicode
+            strings), then the float columns in FLOAT_COLUMNS order
+        """
+        columns = {
+            "frame_id": self._frame_ids[:self._size],
+            "track_id": np.array(self._track_ids, dtype=str),
+            "class": np.array(self._classes, dtype=str)
+        }
+        for i, name in enumerate(FLOAT_COLUMNS):
+            columns[name] = self._values[:self._size, i]
+        return columns
+
+    def save(self, directory: str, fmt: str = "npy", homography_store: Optional[HomographyStore] = None) -> str:
+        """
+        Write the table (and optionally the homographies) to a directory.
+
+        Args:
+            directory: Output directory (created if needed; existing files are replaced)
+            fmt: "npy" for one .npy file per column, or "parquet" or "arrow" (need pyarrow)
+            homography_store: Store whose matrices, frame ids and sources are written alongside
+
+        Returns:
+            The output directory
+        """
+        check_track_format(fmt)
+        os.makedirs(directory, exist_ok=True)
+
+        # A table file left by an earlier save would shadow .npy columns on load
+        for other_fmt, file_name in TRACKS_FILES.items():
+            if other_fmt != fmt and os.path.exists(os.path.join(directory, file_name)):
+                os.remove(os.path.join(directory, file_name))
+
+        columns = self.columns()
+        if fmt == "npy":
+            for name, values in columns.items():
+                np.save(os.path.join(directory, f"{name}.npy"), values)
+        else:
+            import pyarrow as pa
+            table = pa.table(columns)
+            path = os.path.join(directory, TRACKS_FILES[fmt])
+            if fmt == "parquet":
+                import pyarrow.parquet as pq
+                pq.write_table(table, path)
+            else:
+                import pyarrow.feather as feather
+                feather.write_feather(table, path, compression="uncompressed")
+
+        if homography_store is not None:
+            np.save(os.path.join(directory, HOMOGRAPHY_FILES["matrices"]), homography_store.matrices)
+            np.save(os.path.join(directory, HOMOGRAPHY_FILES["frame_ids"]), homography_store.frame_ids)
+            np.save(os.path.join(directory, HOMOGRAPHY_FILES["sources"]), homography_store.sources)
+        return directory
+
+
+def load_player_tracks(directory: str, mmap: bool = True) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Load a track directory written by PlayerTrackColumns.save.
+
+    Args:
+        directory: Track directory
+        mmap: Memory-map .npy and Arrow IPC files instead of reading them into memory
+
+    Returns:
+        (tracks, homographies): column name to (N,) array, and "matrices"
+        (M, 3, 3), "frame_ids" and "sources" (M,) arrays (empty if no
+        homographies were saved)
+    """
+    mmap_mode = "r" if mmap else None
+    parquet_path = os.path.join(directory, TRACKS_FILES["parquet"])
+    arrow_path = os.path.join(directory, TRACKS_FILES["arrow"])
+    if os.path.exists(parquet_path) or os.path.exists(arrow_path):
+        if os.path.exists(parquet_path):
+            import pyarrow.parquet as pq
+            table = pq.read_table(parquet_path)
+        else:
+            import pyarrow.feather as feather
+            table = feather.read_table(arrow_path, memory_map=mmap)
+        tracks = {name: table.column(name).to_numpy() for name in table.column_names}
+    else:
+        names = ("frame_id", "track_id", "class") + FLOAT_COLUMNS
+        tracks = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in names}
+
+    homographies = {}
+    for key, file_name in HOMOGRAPHY_FILES.items():
+        path = os.path.join(directory, file_name)
+        if os.path.exists(path):
+            homographies[key] = np.load(path, mmap_mode=mmap_mode)
+    return tracks, homographies
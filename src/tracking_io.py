@@ -0,0 +1,157 @@
+import io
+import json
+import gzip
+from datetime import datetime
+from typing import IO, Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+
+# Suffixes of the streaming JSON Lines formats; compression follows the suffix
+JSONL_SUFFIXES = (".jsonl", ".jsonl.gz", ".jsonl.zst")
+
+# Choices for the --output-format flags (json is the indented single document)
+OUTPUT_FORMATS = ("json", "jsonl", "jsonl.gz", "jsonl.zst")
+
+
+def is_jsonl_path(path: str) -> bool:
+    """Whether a path names a (possibly compressed) JSON Lines file."""
+    return str(path).endswith(JSONL_SUFFIXES)
+
+
+def _json_default(obj: Any) -> Any:
+    """Convert the NumPy and datetime values found in tracking records."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _open_text(path: str, mode: str) -> IO[str]:
+    """Open a JSON Lines file for text reading ("r") or writing ("w"), compressed according to its suffix."""
+    path = str(path)
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading or writing .zst files requires the zstandard package (pip install zstandard)")
+        return io.TextIOWrapper(zstandard.open(path, mode + "b"), encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class FrameRecordWriter:
+    """
+    Streaming writer of tracking results as JSON Lines.
+
+    Each record (normally one frame) is written as one compact JSON line as
+    soon as it is passed in, so no whole-run document is built in memory.
+    Files ending in .gz are gzip-compressed and files ending in .zst are
+    zstd-compressed (needs the optional zstandard package). NumPy arrays and
+    scalars are converted on the way out.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open the output file (any existing file is replaced).
+
+        Args:
+            path: Output path ending in .jsonl, .jsonl.gz or .jsonl.zst
+        """
+        self.path = path
+        self.count = 0
+        self._file = _open_text(path, "w")
+
+    def write(self, record: Dict) -> None:
+        """
+        Append one record.
+
+        Args:
+            record: JSON-serializable dictionary (NumPy values allowed)
+        """
+        self._file.write(json.dumps(record, separators=(",", ":"), default=_json_default))
+        self._file.write("\n")
+        self.count += 1
+
+    def write_all(self, records: Iterable[Dict]) -> None:
+        """Append every record from an iterable."""
+        for record in records:
+            self.write(record)
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "FrameRecordWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_frame_records(path: str) -> Iterator[Dict]:
+    """
+    Stream the records of a JSON Lines file written by FrameRecordWriter.
+
+    Args:
+        path: Path ending in .jsonl, .jsonl.gz or .jsonl.zst
+
+    Yields:
+        One dictionary per line (blank lines are skipped)
+    """
+    with _open_text(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def frames_from_json(data: Any) -> List[Dict]:
+    """
+    Get the frame records out of a tracking results JSON document.
+
+    Handles both layouts: process_clip's {"frames": [...], ...} and
+    save_tracking_data's {frame_id: frame, ...}.
+
+    Args:
+        data: Parsed JSON document
+
+    Returns:
+        List of frame dictionaries, each with a "frame_id"
+    """
+    if isinstance(data, dict) and isinstance(data.get("frames"), list):
+        return data["frames"]
+    return [dict(frame, frame_id=frame.get("frame_id", frame_id)) for frame_id, frame in data.items()]
+
+
+def iter_tracking_frames(path: str) -> Iterator[Dict]:
+    """
+    Iterate over the frames of a tracking results file in any supported format.
+
+    JSON Lines files are streamed one frame at a time; their run summary
+    record ({"run": ...}) is skipped. Plain JSON files are loaded in full.
+
+    Args:
+        path: Tracking results file (.json, .jsonl, .jsonl.gz or .jsonl.zst)
+
+    Yields:
+        Frame dictionaries, each with a "frame_id"
+    """
+    if is_jsonl_path(path):
+        for record in read_frame_records(path):
+            if "run" not in record:
+                yield record
+        return
+
+    with open(path, "r") as f:
+        data = json.load(f)
+    yield from frames_from_json(data)